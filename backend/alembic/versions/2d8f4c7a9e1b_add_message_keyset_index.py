@@ -0,0 +1,29 @@
+"""Add keyset pagination index for messages
+
+Revision ID: 2d8f4c7a9e1b
+Revises: 9a1f6b3e8c4d
+Create Date: 2025-11-15 14:21:09.574213
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '2d8f4c7a9e1b'
+down_revision: Union[str, Sequence[str], None] = '9a1f6b3e8c4d'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # メッセージ履歴のページ取得（Phase指定なし）: WHERE project_id = ? AND (created_at, id) < (?, ?)
+    op.create_index('ix_messages_project_id_created_at_id', 'messages', ['project_id', 'created_at', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_messages_project_id_created_at_id', table_name='messages')
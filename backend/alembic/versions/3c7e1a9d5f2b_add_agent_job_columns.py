@@ -0,0 +1,47 @@
+"""Add agent job columns to phase_executions
+
+Revision ID: 3c7e1a9d5f2b
+Revises: 8f3a6c2e4b1d
+Create Date: 2025-11-19 13:27:05.846193
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3c7e1a9d5f2b'
+down_revision: Union[str, Sequence[str], None] = '8f3a6c2e4b1d'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('phase_executions', sa.Column('user_id', sa.String(), nullable=True))
+    op.add_column('phase_executions', sa.Column('task', sa.JSON(), nullable=True))
+    op.add_column('phase_executions', sa.Column('output', sa.Text(), nullable=True))
+    op.add_column('phase_executions', sa.Column('attempts', sa.Integer(), nullable=False, server_default='0'))
+    op.add_column('phase_executions', sa.Column('updated_at', sa.DateTime(), nullable=True))
+    op.create_foreign_key(
+        'fk_phase_executions_user_id_users', 'phase_executions', 'users', ['user_id'], ['id']
+    )
+
+    # 次に実行するジョブ: WHERE status = 'pending' ORDER BY created_at
+    op.create_index('ix_phase_executions_status_created_at', 'phase_executions', ['status', 'created_at'], unique=False)
+    # ジョブ一覧: WHERE user_id = ? ORDER BY created_at DESC
+    op.create_index('ix_phase_executions_user_id_created_at', 'phase_executions', ['user_id', 'created_at'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_phase_executions_user_id_created_at', table_name='phase_executions')
+    op.drop_index('ix_phase_executions_status_created_at', table_name='phase_executions')
+    op.drop_constraint('fk_phase_executions_user_id_users', 'phase_executions', type_='foreignkey')
+    op.drop_column('phase_executions', 'updated_at')
+    op.drop_column('phase_executions', 'attempts')
+    op.drop_column('phase_executions', 'output')
+    op.drop_column('phase_executions', 'task')
+    op.drop_column('phase_executions', 'user_id')
@@ -0,0 +1,59 @@
+"""Add composite indexes for hot queries
+
+Revision ID: 4b7e2a9c1d3f
+Revises: e2fdef69fc03
+Create Date: 2025-11-12 10:15:32.481920
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '4b7e2a9c1d3f'
+down_revision: Union[str, Sequence[str], None] = 'e2fdef69fc03'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # チャット履歴: WHERE project_id = ? AND phase = ? ORDER BY created_at
+    op.create_index('ix_messages_project_id_phase_created_at', 'messages', ['project_id', 'phase', 'created_at'], unique=False)
+
+    # プロジェクト一覧: WHERE owner_id = ?
+    op.create_index('ix_projects_owner_id', 'projects', ['owner_id'], unique=False)
+
+    # ファイル操作: WHERE project_id = ? AND file_path = ?
+    # 一意制約を付ける前に、同じパスの重複行は最新の1件だけを残す
+    op.execute("""
+        DELETE FROM project_files
+        WHERE id IN (
+            SELECT id FROM (
+                SELECT id, ROW_NUMBER() OVER (
+                    PARTITION BY project_id, file_path
+                    ORDER BY COALESCE(updated_at, created_at) DESC, id DESC
+                ) AS rn
+                FROM project_files
+            ) ranked
+            WHERE ranked.rn > 1
+        )
+    """)
+    op.create_unique_constraint('uq_project_files_project_id_file_path', 'project_files', ['project_id', 'file_path'])
+
+    # 利用状況ダッシュボード: ユーザー別・期間別・Phase別の集計
+    op.create_index('ix_api_logs_user_id_created_at', 'api_logs', ['user_id', 'created_at'], unique=False)
+    op.create_index('ix_api_logs_created_at', 'api_logs', ['created_at'], unique=False)
+    op.create_index('ix_api_logs_phase_created_at', 'api_logs', ['phase', 'created_at'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_api_logs_phase_created_at', table_name='api_logs')
+    op.drop_index('ix_api_logs_created_at', table_name='api_logs')
+    op.drop_index('ix_api_logs_user_id_created_at', table_name='api_logs')
+    op.drop_constraint('uq_project_files_project_id_file_path', 'project_files', type_='unique')
+    op.drop_index('ix_projects_owner_id', table_name='projects')
+    op.drop_index('ix_messages_project_id_phase_created_at', table_name='messages')
@@ -0,0 +1,57 @@
+"""Add daily api usage rollup table
+
+Revision ID: 5e2b8d6f3a7c
+Revises: 2d8f4c7a9e1b
+Create Date: 2025-11-17 16:48:33.905127
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5e2b8d6f3a7c'
+down_revision: Union[str, Sequence[str], None] = '2d8f4c7a9e1b'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'api_usage_daily',
+        sa.Column('bucket_start', sa.DateTime(), nullable=False),
+        sa.Column('user_id', sa.String(), nullable=False),
+        sa.Column('phase', sa.Integer(), nullable=False),
+        sa.Column('cached', sa.Boolean(), nullable=False),
+        sa.Column('requests', sa.Integer(), nullable=False),
+        sa.Column('input_tokens', sa.BigInteger(), nullable=False),
+        sa.Column('output_tokens', sa.BigInteger(), nullable=False),
+        sa.Column('total_tokens', sa.BigInteger(), nullable=False),
+        sa.Column('cost', sa.Numeric(20, 6), nullable=False),
+        sa.Column('cache_creation_tokens', sa.BigInteger(), nullable=False),
+        sa.Column('cache_read_tokens', sa.BigInteger(), nullable=False),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id']),
+        sa.PrimaryKeyConstraint('bucket_start', 'user_id', 'phase', 'cached'),
+    )
+
+    # 既存の api_logs から集計を作成（この時点のログにはプロンプトキャッシュのトークン数がないため0）
+    if op.get_bind().dialect.name == 'sqlite':
+        bucket = "strftime('%Y-%m-%d 00:00:00', created_at)"
+    else:
+        bucket = "date_trunc('day', created_at)"
+    op.execute(f"""
+        INSERT INTO api_usage_daily (bucket_start, user_id, phase, cached, requests, input_tokens, output_tokens,
+                                     total_tokens, cost, cache_creation_tokens, cache_read_tokens)
+        SELECT {bucket}, user_id, COALESCE(phase, 0), cached,
+               COUNT(*), SUM(input_tokens), SUM(output_tokens), SUM(total_tokens), SUM(cost), 0, 0
+        FROM api_logs
+        GROUP BY {bucket}, user_id, COALESCE(phase, 0), cached
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('api_usage_daily')
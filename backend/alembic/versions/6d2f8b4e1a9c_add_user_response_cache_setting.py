@@ -0,0 +1,29 @@
+"""Add response cache setting to users
+
+Revision ID: 6d2f8b4e1a9c
+Revises: 3c7e1a9d5f2b
+Create Date: 2025-11-21 10:42:18.503117
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '6d2f8b4e1a9c'
+down_revision: Union[str, Sequence[str], None] = '3c7e1a9d5f2b'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Claude APIの応答キャッシュを使うか（既存ユーザーは有効）
+    op.add_column('users', sa.Column('response_cache_enabled', sa.Boolean(), nullable=False, server_default=sa.true()))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('users', 'response_cache_enabled')
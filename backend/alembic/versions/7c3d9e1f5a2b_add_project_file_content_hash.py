@@ -0,0 +1,29 @@
+"""Add content_hash to project_files
+
+Revision ID: 7c3d9e1f5a2b
+Revises: 4b7e2a9c1d3f
+Create Date: 2025-11-13 09:42:10.118034
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7c3d9e1f5a2b'
+down_revision: Union[str, Sequence[str], None] = '4b7e2a9c1d3f'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # 既存行はNULLのまま（次回の一括保存時にハッシュ差分ありとして更新される）
+    op.add_column('project_files', sa.Column('content_hash', sa.String(length=64), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('project_files', 'content_hash')
@@ -0,0 +1,32 @@
+"""Add indexes for admin user list
+
+Revision ID: 8f3a6c2e4b1d
+Revises: 5e2b8d6f3a7c
+Create Date: 2025-11-18 11:02:47.310582
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8f3a6c2e4b1d'
+down_revision: Union[str, Sequence[str], None] = '5e2b8d6f3a7c'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # 管理画面のユーザー一覧: ORDER BY created_at DESC, id DESC LIMIT ? OFFSET ?
+    op.create_index('ix_users_created_at_id', 'users', ['created_at', 'id'], unique=False)
+    # ステータスで絞り込んだ一覧: WHERE status = ? ORDER BY created_at DESC, id DESC
+    op.create_index('ix_users_status_created_at_id', 'users', ['status', 'created_at', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_users_status_created_at_id', table_name='users')
+    op.drop_index('ix_users_created_at_id', table_name='users')
@@ -0,0 +1,124 @@
+"""Move project file contents into content-addressed file_blobs
+
+Revision ID: 9a1f6b3e8c4d
+Revises: 7c3d9e1f5a2b
+Create Date: 2025-11-14 11:05:47.302615
+
+"""
+import hashlib
+from datetime import datetime
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9a1f6b3e8c4d'
+down_revision: Union[str, Sequence[str], None] = '7c3d9e1f5a2b'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+BATCH_SIZE = 1000
+
+project_files = sa.table(
+    'project_files',
+    sa.column('id', sa.String),
+    sa.column('content', sa.Text),
+    sa.column('content_hash', sa.String),
+)
+file_blobs = sa.table(
+    'file_blobs',
+    sa.column('hash', sa.String),
+    sa.column('data', sa.LargeBinary),
+    sa.column('compression', sa.String),
+    sa.column('size', sa.Integer),
+    sa.column('ref_count', sa.Integer),
+    sa.column('created_at', sa.DateTime),
+)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'file_blobs',
+        sa.Column('hash', sa.String(length=64), nullable=False),
+        sa.Column('data', sa.LargeBinary(), nullable=False),
+        sa.Column('compression', sa.String(), nullable=True),
+        sa.Column('size', sa.Integer(), nullable=False),
+        sa.Column('ref_count', sa.Integer(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('hash'),
+    )
+    op.alter_column('project_files', 'content', existing_type=sa.Text(), nullable=True)
+
+    # 既存のインライン内容をblobへ移す（移行時は無圧縮。圧縮は新規保存分から）
+    conn = op.get_bind()
+    ref_counts = {}
+    while True:
+        rows = conn.execute(
+            sa.select(project_files.c.id, project_files.c.content)
+            .where(project_files.c.content.isnot(None))
+            .limit(BATCH_SIZE)
+        ).all()
+        if not rows:
+            break
+
+        new_blobs = {}
+        for file_id, content in rows:
+            raw = content.encode('utf-8')
+            content_hash = hashlib.sha256(raw).hexdigest()
+            if content_hash not in ref_counts:
+                new_blobs[content_hash] = raw
+            ref_counts[content_hash] = ref_counts.get(content_hash, 0) + 1
+            conn.execute(
+                project_files.update()
+                .where(project_files.c.id == file_id)
+                .values(content=None, content_hash=content_hash)
+            )
+
+        if new_blobs:
+            conn.execute(file_blobs.insert(), [
+                {
+                    'hash': content_hash,
+                    'data': raw,
+                    'compression': None,
+                    'size': len(raw),
+                    'ref_count': 0,
+                    'created_at': datetime.utcnow(),
+                }
+                for content_hash, raw in new_blobs.items()
+            ])
+
+    for content_hash, count in ref_counts.items():
+        conn.execute(
+            file_blobs.update()
+            .where(file_blobs.c.hash == content_hash)
+            .values(ref_count=count)
+        )
+
+    op.create_foreign_key(
+        'fk_project_files_content_hash_file_blobs', 'project_files', 'file_blobs',
+        ['content_hash'], ['hash'],
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_constraint('fk_project_files_content_hash_file_blobs', 'project_files', type_='foreignkey')
+
+    # blobの内容をインラインに戻す（zstd圧縮分の展開には zstandard が必要）
+    conn = op.get_bind()
+    blobs = conn.execute(sa.select(file_blobs.c.hash, file_blobs.c.data, file_blobs.c.compression)).all()
+    for content_hash, data, compression in blobs:
+        if compression == 'zstd':
+            import zstandard
+            data = zstandard.ZstdDecompressor().decompress(data)
+        conn.execute(
+            project_files.update()
+            .where(project_files.c.content_hash == content_hash)
+            .values(content=data.decode('utf-8'))
+        )
+
+    op.alter_column('project_files', 'content', existing_type=sa.Text(), nullable=False)
+    op.drop_table('file_blobs')
@@ -0,0 +1,31 @@
+"""Add prompt cache token columns to api logs
+
+Revision ID: a4e9c2d7b5f1
+Revises: 6d2f8b4e1a9c
+Create Date: 2025-11-22 14:06:51.218734
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a4e9c2d7b5f1'
+down_revision: Union[str, Sequence[str], None] = '6d2f8b4e1a9c'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # プロンプトキャッシュの書き込み・読み込みトークン（既存のログは0）
+    op.add_column('api_logs', sa.Column('cache_creation_tokens', sa.Integer(), nullable=False, server_default='0'))
+    op.add_column('api_logs', sa.Column('cache_read_tokens', sa.Integer(), nullable=False, server_default='0'))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('api_logs', 'cache_read_tokens')
+    op.drop_column('api_logs', 'cache_creation_tokens')
@@ -0,0 +1,40 @@
+"""Add dedupe key to phase_executions
+
+Revision ID: b7d1e5a3c8f2
+Revises: a4e9c2d7b5f1
+Create Date: 2025-11-24 11:15:37.402816
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b7d1e5a3c8f2'
+down_revision: Union[str, Sequence[str], None] = 'a4e9c2d7b5f1'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+IN_FLIGHT = sa.text("status IN ('pending', 'in_progress')")
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('phase_executions', sa.Column('dedupe_key', sa.String(length=64), nullable=True))
+    # 同じ依頼の実行中ジョブは1つだけ（完了・失敗したジョブは対象外）
+    op.create_index(
+        'uq_phase_executions_dedupe_key_in_flight',
+        'phase_executions',
+        ['dedupe_key'],
+        unique=True,
+        postgresql_where=IN_FLIGHT,
+        sqlite_where=IN_FLIGHT,
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('uq_phase_executions_dedupe_key_in_flight', table_name='phase_executions')
+    op.drop_column('phase_executions', 'dedupe_key')
@@ -0,0 +1,32 @@
+"""Store api log costs in fractional yen
+
+Revision ID: c3f8a1d6e9b4
+Revises: b7d1e5a3c8f2
+Create Date: 2025-11-24 16:42:09.318254
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c3f8a1d6e9b4'
+down_revision: Union[str, Sequence[str], None] = 'b7d1e5a3c8f2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # 1回の呼び出しは1円未満のことが多いため、円単位に丸めずに保存・加算する（既存の値はそのまま）
+    op.alter_column('api_logs', 'cost', type_=sa.Numeric(14, 6), existing_type=sa.Integer(), existing_nullable=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.alter_column(
+        'api_logs', 'cost', type_=sa.Integer(), existing_type=sa.Numeric(14, 6), existing_nullable=False,
+        postgresql_using='round(cost)::integer',
+    )
@@ -20,64 +20,50 @@ from app.agents.extended_phase_agents import (
 )
 
 
-def initialize_agents():
-    """
-    全エージェントを登録（Phase 1-14）
-    """
+# 登録名 → エージェントクラス（Phase 1-14 + オーケストレーター）
+AGENT_CLASSES = {
     # オーケストレーター
-    orchestrator = OrchestratorAgent()
-    AgentRegistry.register("orchestrator", orchestrator)
-
+    "orchestrator": OrchestratorAgent,
     # Phase 1-4 エージェント（MVP）
-    phase1 = Phase1RequirementsAgent()
-    AgentRegistry.register("phase1", phase1)
-
-    phase2 = Phase2CodeGenerationAgent()
-    AgentRegistry.register("phase2", phase2)
-
-    phase3 = Phase3DeploymentAgent()
-    AgentRegistry.register("phase3", phase3)
-
-    phase4 = Phase4SelfImprovementAgent()
-    AgentRegistry.register("phase4", phase4)
-
+    "phase1": Phase1RequirementsAgent,
+    "phase2": Phase2CodeGenerationAgent,
+    "phase3": Phase3DeploymentAgent,
+    "phase4": Phase4SelfImprovementAgent,
     # Phase 5-14 エージェント（拡張機能）
-    phase5 = Phase5TestGenerationAgent()
-    AgentRegistry.register("phase5", phase5)
-
-    phase6 = Phase6DocumentationAgent()
-    AgentRegistry.register("phase6", phase6)
+    "phase5": Phase5TestGenerationAgent,
+    "phase6": Phase6DocumentationAgent,
+    "phase7": Phase7DebugAgent,
+    "phase8": Phase8PerformanceAgent,
+    "phase9": Phase9SecurityAgent,
+    "phase10": Phase10DatabaseAgent,
+    "phase11": Phase11APIDesignAgent,
+    "phase12": Phase12UXAgent,
+    "phase13": Phase13RefactoringAgent,
+    "phase14": Phase14MonitoringAgent,
+}
+
+# ファクトリはインポート時に登録し、生成は初回取得時まで遅延する
+for _name, _agent_class in AGENT_CLASSES.items():
+    AgentRegistry.register_factory(_name, _agent_class)
 
-    phase7 = Phase7DebugAgent()
-    AgentRegistry.register("phase7", phase7)
 
-    phase8 = Phase8PerformanceAgent()
-    AgentRegistry.register("phase8", phase8)
-
-    phase9 = Phase9SecurityAgent()
-    AgentRegistry.register("phase9", phase9)
-
-    phase10 = Phase10DatabaseAgent()
-    AgentRegistry.register("phase10", phase10)
-
-    phase11 = Phase11APIDesignAgent()
-    AgentRegistry.register("phase11", phase11)
-
-    phase12 = Phase12UXAgent()
-    AgentRegistry.register("phase12", phase12)
-
-    phase13 = Phase13RefactoringAgent()
-    AgentRegistry.register("phase13", phase13)
-
-    phase14 = Phase14MonitoringAgent()
-    AgentRegistry.register("phase14", phase14)
+def initialize_agents():
+    """
+    全エージェントを生成してレジストリを温める（Phase 1-14）
+    起動時に呼び出し、リクエスト時の生成コストをなくす
+    """
+    report = AgentRegistry.warm_up()
 
     print("✓ エージェントを初期化しました")
     print(f"  - 登録エージェント数: {len(AgentRegistry.get_all_agents())}")
+    print(f"  - 生成時間合計: {sum(report.values()) * 1000:.1f}ms")
+    for name, seconds in sorted(report.items(), key=lambda item: item[1], reverse=True):
+        print(f"    {name}: {seconds * 1000:.2f}ms")
 
 
 __all__ = [
     "initialize_agents",
+    "AGENT_CLASSES",
     "AgentRegistry",
     "OrchestratorAgent",
     "Phase1RequirementsAgent",
@@ -1,7 +1,11 @@
+import asyncio
+import threading
+import time
 from abc import ABC, abstractmethod
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, AsyncGenerator, Callable
 from pydantic import BaseModel
 from enum import Enum
+from app.agents.claude_client import delta_sink
 
 
 class AgentLevel(str, Enum):
@@ -58,6 +62,51 @@ class BaseAgent(ABC):
         """
         pass
 
+    async def execute_stream(self, task: Dict[str, Any]) -> AsyncGenerator[Dict[str, Any], None]:
+        """
+        タスクを実行し、モデルの生成途中のテキストを逐次返す
+
+        Yields:
+            {"type": "delta", "content": "..."}  モデルが生成したテキスト差分
+            {"type": "result", "result": {...}}  execute() と同じ最終結果（最後に1回）
+
+        Claude APIを経由しない場合（モックモード等）は、最終応答を1つのdeltaとして返す。
+        ジェネレーターが途中で閉じられた場合は、実行中のタスクをキャンセルする。
+        """
+        queue: asyncio.Queue = asyncio.Queue()
+
+        # create_task はコンテキストをコピーするため、実行タスクだけが差分の受け取り先を持つ
+        token = delta_sink.set(queue.put_nowait)
+        try:
+            runner = asyncio.create_task(self.execute(task))
+        finally:
+            delta_sink.reset(token)
+
+        streamed = False
+        try:
+            while not runner.done():
+                getter = asyncio.ensure_future(queue.get())
+                done, _ = await asyncio.wait({getter, runner}, return_when=asyncio.FIRST_COMPLETED)
+                if getter in done:
+                    streamed = True
+                    yield {"type": "delta", "content": getter.result()}
+                else:
+                    getter.cancel()
+
+            # 実行完了までに溜まった差分を送り切る
+            while not queue.empty():
+                streamed = True
+                yield {"type": "delta", "content": queue.get_nowait()}
+
+            result = runner.result()
+            if not streamed and result.get("response"):
+                yield {"type": "delta", "content": result["response"]}
+
+            yield {"type": "result", "result": result}
+        finally:
+            if not runner.done():
+                runner.cancel()
+
     async def delegate(self, task: Dict[str, Any], to_agent: 'BaseAgent') -> Dict[str, Any]:
         """
         タスクを部下エージェントに委譲
@@ -96,22 +145,56 @@ class AgentRegistry:
     """
     エージェント登録・管理クラス
     Phase 4で新しいエージェントを動的に追加可能
+
+    エージェントはファクトリとして登録し、初回取得時に1度だけ生成する（スレッドセーフ）。
+    起動時に warm_up() で全エージェントを生成しておけば、リクエスト時は辞書の参照のみになる。
     """
     _agents: Dict[str, BaseAgent] = {}
+    _factories: Dict[str, Callable[[], BaseAgent]] = {}
+    _construction_times: Dict[str, float] = {}  # 生成にかかった時間（秒）
+    _lock = threading.Lock()
 
     @classmethod
     def register(cls, name: str, agent: BaseAgent):
         """
         エージェントを登録
         """
-        cls._agents[name] = agent
+        with cls._lock:
+            cls._agents[name] = agent
+
+    @classmethod
+    def register_factory(cls, name: str, factory: Callable[[], BaseAgent]):
+        """
+        エージェントのファクトリを登録（生成は初回取得時まで遅延）
+        """
+        with cls._lock:
+            cls._factories[name] = factory
 
     @classmethod
     def get_agent(cls, name: str) -> Optional[BaseAgent]:
         """
-        エージェントを取得
+        エージェントを取得（未生成ならファクトリから生成）
         """
-        return cls._agents.get(name)
+        agent = cls._agents.get(name)
+        if agent is not None:
+            return agent
+
+        with cls._lock:
+            # ロック待ちの間に他のスレッドが生成した場合はそれを使う
+            agent = cls._agents.get(name)
+            if agent is None and name in cls._factories:
+                start = time.perf_counter()
+                agent = cls._factories[name]()
+                cls._construction_times[name] = time.perf_counter() - start
+                cls._agents[name] = agent
+            return agent
+
+    @classmethod
+    def get_phase_agent(cls, phase: int) -> Optional[BaseAgent]:
+        """
+        Phase番号からエージェントを取得（登録名: "phase{N}"）
+        """
+        return cls.get_agent(f"phase{phase}")
 
     @classmethod
     def get_all_agents(cls) -> Dict[str, BaseAgent]:
@@ -120,6 +203,22 @@ class AgentRegistry:
         """
         return cls._agents.copy()
 
+    @classmethod
+    def warm_up(cls) -> Dict[str, float]:
+        """
+        登録済みのファクトリから全エージェントを生成し、生成時間を返す
+        """
+        for name in list(cls._factories):
+            cls.get_agent(name)
+        return cls.get_construction_report()
+
+    @classmethod
+    def get_construction_report(cls) -> Dict[str, float]:
+        """
+        エージェントごとの生成時間（秒）を取得
+        """
+        return cls._construction_times.copy()
+
     @classmethod
     def add_new_agent(cls, agent_code: str, name: str):
         """
@@ -3,39 +3,97 @@ Anthropic Claude API クライアント
 プロンプトキャッシングを活用してコストを削減
 """
 import os
-from typing import Dict, Any, List, Optional
-from anthropic import Anthropic
-import json
+from contextvars import ContextVar
+from typing import Callable, Dict, Any, List, Optional
+import httpx
+from anthropic import AsyncAnthropic, NOT_GIVEN
+from app.core.config import settings
+from app.agents.prompt_layout import build_prompt_request
+from app.services.api_log_service import record_usage, usage_context
+from app.services.claude_client_pool import get_claude_client_pool
+from app.services.response_cache_service import CachedResponse, get_response_cache
+
+
+# ストリーミング実行中のエージェントが設定する、生成途中のテキスト差分の受け取り先
+# （BaseAgent.execute_stream が設定し、generate_text がストリーミングAPIに切り替える）
+delta_sink: ContextVar[Optional[Callable[[str], None]]] = ContextVar("claude_delta_sink", default=None)
 
 
 class ClaudeClient:
     """
     Anthropic Claude API のラッパークラス
     プロンプトキャッシング、ストリーミング、エラーハンドリングを提供
+
+    AsyncAnthropic + 共有コネクションプールで動作するため、
+    API呼び出し中もイベントループをブロックしない。
+    呼び出し元のタスクがキャンセルされた場合は、HTTPリクエストも中断される。
+    usage_context にユーザー独自のAPIキーがあれば、そのキーのクライアント（ClaudeClientPool）で呼び出す。
     """
 
-    def __init__(self, api_key: Optional[str] = None):
+    def __init__(
+        self,
+        api_key: Optional[str] = None,
+        http_client: Optional[httpx.AsyncClient] = None,
+    ):
         """
         Claude APIクライアントを初期化
 
         Args:
             api_key: AnthropicのAPIキー（Noneの場合は環境変数またはconfigから取得）
+            http_client: 共有するHTTPクライアント（Noneの場合は設定値からプールを作成）
         """
         # APIキーの取得優先順位: 引数 > 環境変数(ANTHROPIC_API_KEY) > config(CLAUDE_API_KEY)
-        self.api_key = api_key or os.getenv("ANTHROPIC_API_KEY") or os.getenv("CLAUDE_API_KEY")
-        if not self.api_key:
-            try:
-                from app.core.config import settings
-                self.api_key = settings.CLAUDE_API_KEY
-            except:
-                pass
+        self.api_key = (
+            api_key
+            or os.getenv("ANTHROPIC_API_KEY")
+            or os.getenv("CLAUDE_API_KEY")
+            or settings.CLAUDE_API_KEY
+        )
 
         if not self.api_key:
             raise ValueError("CLAUDE_API_KEY が設定されていません")
 
-        self.client = Anthropic(api_key=self.api_key)
+        self.timeout = settings.CLAUDE_TIMEOUT_SECONDS
+
+        # 全エージェントで共有するコネクションプール（TLSハンドシェイクを使い回す）
+        # 渡されたHTTPクライアントは呼び出し元のもの（aclose では閉じない）
+        self._owns_http_client = http_client is None
+        self.http_client = http_client or httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=settings.CLAUDE_MAX_CONNECTIONS,
+                max_keepalive_connections=settings.CLAUDE_MAX_KEEPALIVE_CONNECTIONS,
+            ),
+            timeout=httpx.Timeout(self.timeout, connect=10.0),
+        )
+
+        self.client = AsyncAnthropic(
+            api_key=self.api_key,
+            http_client=self.http_client,
+            timeout=self.timeout,
+            max_retries=settings.CLAUDE_MAX_RETRIES,
+        )
         self.model = "claude-sonnet-4-20250514"  # 最新のSonnet 4モデル
 
+    async def aclose(self):
+        """
+        コネクションプールを解放（アプリケーション終了時に呼び出す）
+
+        共有のHTTPクライアントを渡された場合は、その持ち主（ClaudeClientPool等）が閉じる。
+        """
+        if self._owns_http_client:
+            await self.client.close()
+
+    def _client_for_context(self) -> AsyncAnthropic:
+        """
+        実行中のユーザーに独自のAPIキーがあればプールからそのキーのクライアントを、なければ共通のクライアントを返す
+        """
+        context = usage_context.get()
+        if context is not None and context.api_key:
+            client = get_claude_client_pool().get(context.api_key)
+            if client is not None:
+                return client
+        return self.client
+
     async def generate_text(
         self,
         messages: List[Dict[str, str]],
@@ -43,6 +101,8 @@ class ClaudeClient:
         max_tokens: int = 4096,
         temperature: float = 0.7,
         use_cache: bool = True,
+        timeout: Optional[float] = None,
+        stable_context: Optional[str] = None,
     ) -> Dict[str, Any]:
         """
         Claude APIを使用してテキストを生成
@@ -53,6 +113,9 @@ class ClaudeClient:
             max_tokens: 最大生成トークン数
             temperature: 生成の多様性（0.0-1.0）
             use_cache: プロンプトキャッシングを使用するか
+            timeout: この呼び出しのタイムアウト秒数（Noneの場合はCLAUDE_TIMEOUT_SECONDS）
+            stable_context: 同じプロジェクトの呼び出しで変わらないコンテキスト（要件サマリー等）。
+                システムプロンプトの後ろに置き、プロンプトキャッシュの対象にする
 
         Returns:
             {
@@ -67,37 +130,69 @@ class ClaudeClient:
             }
         """
         try:
-            # プロンプトキャッシングを使用する場合、system promptを cache_control で指定
-            system_blocks = []
-            if system_prompt and use_cache:
-                system_blocks = [
-                    {
-                        "type": "text",
-                        "text": system_prompt,
-                        "cache_control": {"type": "ephemeral"}  # 5分間キャッシュ
-                    }
-                ]
-            elif system_prompt:
-                system_blocks = [{"type": "text", "text": system_prompt}]
-
-            # API呼び出し
-            response = self.client.messages.create(
+            # 変わりにくい順（システムプロンプト → 固定コンテキスト → 会話履歴）に並べ、
+            # キャッシュされる長さに届いた位置にブレークポイントを置く
+            layout = build_prompt_request(system_prompt, messages, stable_context=stable_context, use_cache=use_cache)
+
+            request = dict(
                 model=self.model,
                 max_tokens=max_tokens,
                 temperature=temperature,
-                system=system_blocks if system_blocks else None,
-                messages=messages
+                system=layout.system if layout.system else NOT_GIVEN,
+                messages=layout.messages,
+                timeout=timeout or self.timeout,
             )
 
+            # 応答キャッシュ: 同じ入力の応答があればAPIを呼ばずに返す
+            cache = get_response_cache()
+            cache_key = None
+            context = usage_context.get()
+            if cache.enabled and context is not None and not context.response_cache:
+                cache.record_bypass()
+            elif cache.enabled:
+                cache_key = cache.make_key(
+                    self.model,
+                    "\n\n".join(filter(None, (system_prompt, stable_context))),
+                    messages,
+                    temperature,
+                    max_tokens,
+                    phase=context.phase if context else None,
+                    user_id=context.user_id if context else None,
+                )
+                cached = cache.get(cache_key)
+                if cached is not None:
+                    return self._cached_result(cached)
+
+            client = self._client_for_context()
+            sink = delta_sink.get()
+            if sink is not None:
+                # ストリーミング: 差分を受け取り先に流しつつ、最終メッセージを組み立てる
+                async with client.messages.stream(**request) as stream:
+                    async for text in stream.text_stream:
+                        sink(text)
+                    response = await stream.get_final_message()
+            else:
+                # API呼び出し（非同期）
+                response = await client.messages.create(**request)
+
+            usage = {
+                "input_tokens": response.usage.input_tokens,
+                "output_tokens": response.usage.output_tokens,
+                "cache_creation_input_tokens": getattr(response.usage, "cache_creation_input_tokens", 0) or 0,
+                "cache_read_input_tokens": getattr(response.usage, "cache_read_input_tokens", 0) or 0,
+            }
+            # 使用量をAPIログのキューに積む（DB書き込みはバックグラウンド）
+            record_usage(usage, response.model, estimate_cost(usage))
+
+            content = response.content[0].text
+            # 途中で打ち切られた応答は再利用しない
+            if cache_key is not None and response.stop_reason == "end_turn":
+                cache.set(cache_key, CachedResponse(content, response.model, response.stop_reason))
+
             # レスポンスを整形
             return {
-                "content": response.content[0].text,
-                "usage": {
-                    "input_tokens": response.usage.input_tokens,
-                    "output_tokens": response.usage.output_tokens,
-                    "cache_creation_input_tokens": getattr(response.usage, "cache_creation_input_tokens", 0),
-                    "cache_read_input_tokens": getattr(response.usage, "cache_read_input_tokens", 0),
-                },
+                "content": content,
+                "usage": usage,
                 "model": response.model,
                 "stop_reason": response.stop_reason,
             }
@@ -110,12 +205,36 @@ class ClaudeClient:
                 "usage": None
             }
 
+    def _cached_result(self, cached: CachedResponse) -> Dict[str, Any]:
+        """応答キャッシュのヒット: 使用量0・cached としてログを記録し、generate_text と同じ形式で返す"""
+        usage = {
+            "input_tokens": 0,
+            "output_tokens": 0,
+            "cache_creation_input_tokens": 0,
+            "cache_read_input_tokens": 0,
+        }
+        record_usage(usage, cached.model, estimate_cost(usage), response_cached=True)
+
+        # ストリーミング中は応答全体を1つの差分として流す
+        sink = delta_sink.get()
+        if sink is not None:
+            sink(cached.content)
+
+        return {
+            "content": cached.content,
+            "usage": usage,
+            "model": cached.model,
+            "stop_reason": cached.stop_reason,
+            "cached": True,
+        }
+
     async def generate_with_tools(
         self,
         messages: List[Dict[str, str]],
         tools: List[Dict[str, Any]],
         system_prompt: Optional[str] = None,
         max_tokens: int = 4096,
+        timeout: Optional[float] = None,
     ) -> Dict[str, Any]:
         """
         Function Calling（Tools）を使用してテキストを生成
@@ -125,6 +244,7 @@ class ClaudeClient:
             tools: 利用可能なツール定義
             system_prompt: システムプロンプト
             max_tokens: 最大生成トークン数
+            timeout: この呼び出しのタイムアウト秒数（Noneの場合はCLAUDE_TIMEOUT_SECONDS）
 
         Returns:
             {
@@ -134,22 +254,15 @@ class ClaudeClient:
             }
         """
         try:
-            system_blocks = []
-            if system_prompt:
-                system_blocks = [
-                    {
-                        "type": "text",
-                        "text": system_prompt,
-                        "cache_control": {"type": "ephemeral"}
-                    }
-                ]
-
-            response = self.client.messages.create(
+            layout = build_prompt_request(system_prompt, messages)
+
+            response = await self._client_for_context().messages.create(
                 model=self.model,
                 max_tokens=max_tokens,
-                system=system_blocks if system_blocks else None,
-                messages=messages,
-                tools=tools
+                system=layout.system if layout.system else NOT_GIVEN,
+                messages=layout.messages,
+                tools=tools,
+                timeout=timeout or self.timeout,
             )
 
             # ツール呼び出しの抽出
@@ -166,15 +279,18 @@ class ClaudeClient:
                         "input": content_block.input
                     })
 
+            usage = {
+                "input_tokens": response.usage.input_tokens,
+                "output_tokens": response.usage.output_tokens,
+                "cache_creation_input_tokens": getattr(response.usage, "cache_creation_input_tokens", 0) or 0,
+                "cache_read_input_tokens": getattr(response.usage, "cache_read_input_tokens", 0) or 0,
+            }
+            record_usage(usage, response.model, estimate_cost(usage))
+
             return {
                 "content": text_content,
                 "tool_calls": tool_calls,
-                "usage": {
-                    "input_tokens": response.usage.input_tokens,
-                    "output_tokens": response.usage.output_tokens,
-                    "cache_creation_input_tokens": getattr(response.usage, "cache_creation_input_tokens", 0),
-                    "cache_read_input_tokens": getattr(response.usage, "cache_read_input_tokens", 0),
-                },
+                "usage": usage,
                 "model": response.model,
             }
 
@@ -188,44 +304,51 @@ class ClaudeClient:
 
     def estimate_cost(self, usage: Dict[str, int]) -> Dict[str, float]:
         """
-        API使用量からコストを推定
-
-        Args:
-            usage: API使用量（input_tokens, output_tokensなど）
-
-        Returns:
-            {
-                "input_cost": 0.003,  # USD
-                "output_cost": 0.015,
-                "cache_write_cost": 0.00375,
-                "cache_read_cost": 0.0003,
-                "total_cost": 0.01905
-            }
+        API使用量からコストを推定（estimate_cost 関数を参照）
         """
-        # Sonnet 4.5の料金（2025年1月時点）
-        # $3/MTok (input), $15/MTok (output)
-        # キャッシュ書き込み: 1.25x, キャッシュ読み取り: 0.1x
+        return estimate_cost(usage)
 
-        input_tokens = usage.get("input_tokens", 0)
-        output_tokens = usage.get("output_tokens", 0)
-        cache_creation = usage.get("cache_creation_input_tokens", 0)
-        cache_read = usage.get("cache_read_input_tokens", 0)
 
-        input_cost = (input_tokens / 1_000_000) * 3.0
-        output_cost = (output_tokens / 1_000_000) * 15.0
-        cache_write_cost = (cache_creation / 1_000_000) * 3.0 * 1.25
-        cache_read_cost = (cache_read / 1_000_000) * 3.0 * 0.1
+def estimate_cost(usage: Dict[str, int]) -> Dict[str, float]:
+    """
+    API使用量からコストを推定
 
-        total_cost = input_cost + output_cost + cache_write_cost + cache_read_cost
+    Args:
+        usage: API使用量（input_tokens, output_tokensなど）
 
-        return {
-            "input_cost": round(input_cost, 6),
-            "output_cost": round(output_cost, 6),
-            "cache_write_cost": round(cache_write_cost, 6),
-            "cache_read_cost": round(cache_read_cost, 6),
-            "total_cost": round(total_cost, 6),
-            "currency": "USD"
+    Returns:
+        {
+            "input_cost": 0.003,  # USD
+            "output_cost": 0.015,
+            "cache_write_cost": 0.00375,
+            "cache_read_cost": 0.0003,
+            "total_cost": 0.01905
         }
+    """
+    # Sonnet 4.5の料金（2025年1月時点）
+    # $3/MTok (input), $15/MTok (output)
+    # キャッシュ書き込み: 1.25x, キャッシュ読み取り: 0.1x
+
+    input_tokens = usage.get("input_tokens", 0)
+    output_tokens = usage.get("output_tokens", 0)
+    cache_creation = usage.get("cache_creation_input_tokens", 0)
+    cache_read = usage.get("cache_read_input_tokens", 0)
+
+    input_cost = (input_tokens / 1_000_000) * 3.0
+    output_cost = (output_tokens / 1_000_000) * 15.0
+    cache_write_cost = (cache_creation / 1_000_000) * 3.0 * 1.25
+    cache_read_cost = (cache_read / 1_000_000) * 3.0 * 0.1
+
+    total_cost = input_cost + output_cost + cache_write_cost + cache_read_cost
+
+    return {
+        "input_cost": round(input_cost, 6),
+        "output_cost": round(output_cost, 6),
+        "cache_write_cost": round(cache_write_cost, 6),
+        "cache_read_cost": round(cache_read_cost, 6),
+        "total_cost": round(total_cost, 6),
+        "currency": "USD"
+    }
 
 
 # シングルトンインスタンス
@@ -240,3 +363,13 @@ def get_claude_client() -> ClaudeClient:
     if _claude_client is None:
         _claude_client = ClaudeClient()
     return _claude_client
+
+
+async def close_claude_client():
+    """
+    シングルトンのコネクションプールを閉じる（lifespanのシャットダウン時）
+    """
+    global _claude_client
+    if _claude_client is not None:
+        await _claude_client.aclose()
+        _claude_client = None
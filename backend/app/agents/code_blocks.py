@@ -0,0 +1,225 @@
+"""
+生成コードのコードブロックパーサー
+
+Phase 2 / 3 / 5 のエージェントは、Claude APIの応答に次の形式でファイルを書かせる。
+
+    ```filepath
+    frontend/src/App.tsx
+    ```
+    ```typescript
+    コード内容
+    ```
+
+応答テキストを1行ずつ状態遷移で読み、ブロックが閉じた時点で (filepath, language, code) を返す。
+- 生成途中の差分をそのまま渡せる（行の途中で分割されていてもよい）
+- 全文に正規表現を当て直さないため、応答の長さに比例した時間で終わる
+- stream_code_blocks() の中では、Claude APIの差分から逐次パースし、
+  閉じたブロックを code_block_sink（設定されている場合）に渡す
+"""
+import re
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Dict, Iterable, Iterator, List, NamedTuple, Optional
+from app.agents.claude_client import delta_sink
+
+
+class CodeBlock(NamedTuple):
+    """応答から取り出した1ファイル"""
+    filepath: str
+    language: str
+    code: str
+
+
+# 生成中に閉じたコードブロックの受け取り先（ジョブの実行中にファイルを保存する場合などに設定）
+code_block_sink: ContextVar[Optional[Callable[[CodeBlock], None]]] = ContextVar("code_block_sink", default=None)
+
+FRONTEND_EXTENSIONS = (".tsx", ".ts", ".jsx", ".js", ".html", ".json")
+
+_LANGUAGE_FENCE = re.compile(r"```(\w+)")
+
+# パーサーの状態
+_TEXT = 0  # ブロックの外
+_FILEPATH = 1  # ```filepath の中
+_AFTER_FILEPATH = 2  # ファイルパスのブロックが閉じ、コードのブロックを待っている
+_CODE = 3  # コードのブロックの中
+
+
+class CodeBlockParser:
+    """
+    コードブロックの逐次パーサー
+
+    使い方:
+        parser = CodeBlockParser()
+        for delta in deltas:
+            for block in parser.feed(delta):
+                ...
+        parser.close()
+        parser.blocks  # 取り出した全ブロック
+    """
+
+    def __init__(self):
+        self.blocks: List[CodeBlock] = []
+        self.fed = False  # 1回でも差分を受け取ったか
+        self._partial: List[str] = []  # 改行がまだ来ていない行の断片
+        self._state = _TEXT
+        self._path_lines: List[str] = []
+        self._language = ""
+        self._code_lines: List[str] = []
+
+    def feed(self, text: str) -> List[CodeBlock]:
+        """
+        差分を追加し、この差分で閉じたブロックを返す
+        """
+        if not text:
+            return []
+        self.fed = True
+        if "\n" not in text:
+            self._partial.append(text)
+            return []
+
+        lines = text.split("\n")
+        if self._partial:
+            self._partial.append(lines[0])
+            lines[0] = "".join(self._partial)
+        rest = lines.pop()
+        self._partial = [rest] if rest else []
+
+        closed: List[CodeBlock] = []
+        for line in lines:
+            block = self._process_line(line)
+            if block is not None:
+                closed.append(block)
+        return closed
+
+    def close(self) -> List[CodeBlock]:
+        """
+        応答の終わり: 改行で終わっていない最後の行を処理し、閉じたブロックを返す
+        （閉じていないブロックは捨てる）
+        """
+        closed: List[CodeBlock] = []
+        if self._partial:
+            line = "".join(self._partial)
+            self._partial = []
+            block = self._process_line(line)
+            if block is not None:
+                closed.append(block)
+        self._state = _TEXT
+        return closed
+
+    def finish(self, response_text: str) -> List[CodeBlock]:
+        """
+        応答全体を受け取った後に呼び出し、全ブロックを返す
+
+        差分を1度も受け取っていない場合（ストリーミングしなかった場合）は応答全体をパースする。
+        """
+        if not self.fed:
+            self.feed(response_text or "")
+        self.close()
+        return self.blocks
+
+    def _process_line(self, line: str) -> Optional[CodeBlock]:
+        """1行を処理し、ブロックが閉じた場合はそれを返す"""
+        state = self._state
+
+        if state == _CODE:
+            if not line.startswith("```"):
+                self._code_lines.append(line)
+                return None
+            block = CodeBlock(
+                filepath="\n".join(self._path_lines).strip(),
+                language=self._language,
+                code="\n".join(self._code_lines).strip(),
+            )
+            self._code_lines = []
+            self._state = _TEXT
+            self.blocks.append(block)
+            return block
+
+        stripped = line.strip()
+        if state == _FILEPATH:
+            if stripped == "```":
+                self._state = _AFTER_FILEPATH if self._path_lines else _TEXT
+                return None
+            if not stripped.startswith("```"):
+                if stripped:
+                    self._path_lines.append(stripped)
+                return None
+            # ファイルパスのブロックが閉じられなかった: ブロックの外として読み直す
+            self._state = _TEXT
+
+        if state == _AFTER_FILEPATH:
+            if not stripped:
+                return None
+            language = _LANGUAGE_FENCE.fullmatch(stripped)
+            if language is not None and language.group(1) != "filepath":
+                self._language = language.group(1)
+                self._state = _CODE
+                return None
+            # コードのブロックが続かなかった: ブロックの外として読み直す
+            self._state = _TEXT
+
+        if stripped.startswith("```filepath") and not stripped[len("```filepath"):].strip():
+            self._path_lines = []
+            self._state = _FILEPATH
+        return None
+
+
+def parse_code_blocks(response_text: str) -> List[CodeBlock]:
+    """応答全体からコードブロックを取り出す"""
+    return CodeBlockParser().finish(response_text)
+
+
+def to_file_map(blocks: Iterable[CodeBlock]) -> Dict[str, str]:
+    """{ファイルパス: コード}（同じパスは後のブロックを優先）"""
+    return {block.filepath: block.code for block in blocks}
+
+
+def group_generated_files(blocks: Iterable[CodeBlock]) -> Dict[str, Dict[str, str]]:
+    """
+    Phase 2 の生成コードを {"frontend": {...}, "backend": {...}} に振り分ける
+
+    "frontend/" "backend/" で始まるパスはプレフィックスを除き、
+    プレフィックスがない場合は拡張子で判定する。
+    """
+    files: Dict[str, Dict[str, str]] = {"frontend": {}, "backend": {}}
+    for block in blocks:
+        filepath = block.filepath
+        if filepath.startswith("frontend/"):
+            files["frontend"][filepath.replace("frontend/", "")] = block.code
+        elif filepath.startswith("backend/"):
+            files["backend"][filepath.replace("backend/", "")] = block.code
+        elif filepath.endswith(FRONTEND_EXTENSIONS):
+            files["frontend"][filepath] = block.code
+        else:
+            files["backend"][filepath] = block.code
+    return files
+
+
+@contextmanager
+def stream_code_blocks() -> Iterator[CodeBlockParser]:
+    """
+    この中で行うClaude API呼び出しの差分をパーサーに流す
+
+    元の差分の受け取り先（execute_stream 等）にはそのまま転送し、
+    閉じたブロックは code_block_sink に渡す。呼び出し後は parser.finish(応答全体) で全ブロックを得る。
+    どちらの受け取り先もない場合はストリーミングに切り替えず、finish で応答全体をパースする。
+    """
+    parser = CodeBlockParser()
+    forward = delta_sink.get()
+    block_sink = code_block_sink.get()
+    if forward is None and block_sink is None:
+        yield parser
+        return
+
+    def sink(text: str):
+        if forward is not None:
+            forward(text)
+        for block in parser.feed(text):
+            if block_sink is not None:
+                block_sink(block)
+
+    token = delta_sink.set(sink)
+    try:
+        yield parser
+    finally:
+        delta_sink.reset(token)
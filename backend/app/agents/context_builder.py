@@ -0,0 +1,237 @@
+"""
+会話コンテキストビルダー
+
+会話履歴をトークン予算内に収めてClaude APIのmessages形式に変換する。
+- 予算を超える古いターンは要約（ユーザー発言の抜粋）にまとめ、要約にも収まらない分は捨てる
+- 切り捨て位置は一定のメッセージ数単位で動かし、履歴の接頭辞を複数ターンにわたって固定する
+- 固定された接頭辞（要約・直前までの履歴）に cache_control のブレークポイントを置く
+"""
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+from app.core.config import settings
+
+
+SUMMARY_HEADER = "【これまでの会話の要約】"
+CACHE_CONTROL = {"type": "ephemeral"}
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    テキストのトークン数を概算
+
+    APIを呼ばずに見積もるための近似。日本語などの非ASCII文字は1文字≒1トークン、
+    ASCII文字は4文字≒1トークンとして数える（実際より多めに見積もる）。
+    """
+    if not text:
+        return 0
+    non_ascii = sum(1 for char in text if ord(char) > 127)
+    ascii_chars = len(text) - non_ascii
+    return non_ascii + (ascii_chars + 3) // 4
+
+
+def _message_tokens(message: Dict[str, str]) -> int:
+    # ロール・区切りのオーバーヘッド分を加算
+    return estimate_tokens(message.get("content", "")) + 4
+
+
+@dataclass
+class ConversationContext:
+    """ビルド結果"""
+    messages: List[Dict[str, Any]]
+    estimated_tokens: int
+    summarized_count: int = 0  # 要約にまとめたメッセージ数
+    dropped_count: int = 0  # 要約にも入らず捨てたメッセージ数
+    kept: List[Dict[str, str]] = field(default_factory=list)  # 原文のまま残した履歴
+
+
+class ConversationContextBuilder:
+    """
+    トークン予算付きの会話コンテキストビルダー
+    """
+
+    def __init__(
+        self,
+        max_tokens: Optional[int] = None,
+        summary_max_tokens: Optional[int] = None,
+        trim_step: Optional[int] = None,
+    ):
+        """
+        Args:
+            max_tokens: 履歴（要約・今回のメッセージを含む）に使うトークン数の上限
+            summary_max_tokens: 古いターンの要約に使うトークン数の上限
+            trim_step: 古い履歴を切り捨てるメッセージ数の単位
+        """
+        self.max_tokens = max_tokens or settings.CONTEXT_MAX_TOKENS
+        self.summary_max_tokens = (
+            summary_max_tokens if summary_max_tokens is not None else settings.CONTEXT_SUMMARY_MAX_TOKENS
+        )
+        self.trim_step = max(1, trim_step or settings.CONTEXT_TRIM_STEP_MESSAGES)
+
+    def build(
+        self,
+        history: List[Dict[str, str]],
+        user_message: str,
+        use_cache: bool = True,
+        history_offset: int = 0,
+    ) -> ConversationContext:
+        """
+        履歴と今回のユーザーメッセージからmessagesを構築
+
+        Args:
+            history: 古い順の会話履歴（今回のメッセージは含まない）
+            user_message: 今回のユーザーメッセージ
+            use_cache: cache_controlのブレークポイントを付けるか
+            history_offset: historyより前にある（読み込んでいない）メッセージ数。
+                切り捨て位置を会話全体での位置で揃えるために使う
+
+        Returns:
+            ConversationContext
+        """
+        history = self._normalize(history)
+        current = {"role": "user", "content": user_message}
+        budget = self.max_tokens - _message_tokens(current)
+
+        cut = self._cut_index(history, budget - self.summary_max_tokens, history_offset)
+        kept = history[cut:]
+        # messagesはuserから始める
+        while kept and kept[0]["role"] != "user":
+            kept = kept[1:]
+            cut += 1
+
+        summary, summarized_count = self._summarize(history[:cut])
+
+        messages: List[Dict[str, Any]] = [dict(message) for message in kept]
+        if messages and messages[-1]["role"] == "user":
+            # 直前のユーザー発言に応答がない（エラー等）場合は今回の発言とまとめる
+            current = {"role": "user", "content": messages.pop()["content"] + "\n\n" + user_message}
+        messages.append(current)
+
+        if summary:
+            first = messages[0]
+            first["content"] = [
+                self._block(summary, use_cache),
+                {"type": "text", "text": first["content"]},
+            ]
+        if use_cache and len(messages) >= 2:
+            # 今回の発言の直前までは次のターンでも同じ接頭辞になる
+            previous = messages[-2]
+            if isinstance(previous["content"], str):
+                previous["content"] = [self._block(previous["content"], True)]
+            else:
+                previous["content"][-1] = {**previous["content"][-1], "cache_control": CACHE_CONTROL}
+
+        estimated = (
+            estimate_tokens(summary)
+            + sum(_message_tokens(message) for message in kept)
+            + _message_tokens({"content": user_message})
+        )
+        return ConversationContext(
+            messages=messages,
+            estimated_tokens=estimated,
+            summarized_count=summarized_count,
+            dropped_count=cut - summarized_count,
+            kept=kept,
+        )
+
+    def _cut_index(self, history: List[Dict[str, str]], budget: int, offset: int = 0) -> int:
+        """
+        原文のまま残す履歴の開始位置を決める
+
+        予算に収まる最小の位置を trim_step 単位に切り上げる。
+        履歴が伸びても次の単位に達するまで開始位置（＝キャッシュされる接頭辞）は変わらない。
+        """
+        total = 0
+        cut = len(history)
+        for index in range(len(history) - 1, -1, -1):
+            total += _message_tokens(history[index])
+            if total > budget:
+                break
+            cut = index
+        if cut == 0:
+            return 0
+        aligned = -(-(offset + cut) // self.trim_step) * self.trim_step
+        return min(len(history), aligned - offset)
+
+    def _summarize(self, old: List[Dict[str, str]]):
+        """
+        切り捨てる古いターンを要約（ユーザー発言の抜粋、新しいものを優先）
+
+        Returns:
+            (要約テキスト, 要約に含めたメッセージ数)
+        """
+        if not old or self.summary_max_tokens <= 0:
+            return "", 0
+
+        lines: List[str] = []
+        total = estimate_tokens(SUMMARY_HEADER)
+        summarized_from = len(old)
+        for index in range(len(old) - 1, -1, -1):
+            message = old[index]
+            if message["role"] != "user":
+                continue
+            line = "- " + " ".join(message["content"].split())[:settings.CONTEXT_SUMMARY_LINE_CHARS]
+            tokens = estimate_tokens(line)
+            if total + tokens > self.summary_max_tokens:
+                break
+            lines.append(line)
+            total += tokens
+            summarized_from = index
+
+        if not lines:
+            return "", 0
+        lines.reverse()
+        return SUMMARY_HEADER + "\n" + "\n".join(lines), len(old) - summarized_from
+
+    @staticmethod
+    def _normalize(history: List[Dict[str, str]]) -> List[Dict[str, str]]:
+        """user/assistant以外を除き、同じロールが続く場合は1つにまとめる"""
+        normalized: List[Dict[str, str]] = []
+        for message in history:
+            role = message.get("role")
+            content = message.get("content") or ""
+            if role not in ("user", "assistant") or not content:
+                continue
+            if normalized and normalized[-1]["role"] == role:
+                normalized[-1] = {"role": role, "content": normalized[-1]["content"] + "\n\n" + content}
+            else:
+                normalized.append({"role": role, "content": content})
+        return normalized
+
+    @staticmethod
+    def _block(text: str, use_cache: bool) -> Dict[str, Any]:
+        block: Dict[str, Any] = {"type": "text", "text": text}
+        if use_cache:
+            block["cache_control"] = CACHE_CONTROL
+        return block
+
+
+def select_recent_user_turns(history: List[Dict[str, str]], max_tokens: Optional[int] = None) -> List[str]:
+    """
+    トークン予算内に収まる範囲で、新しい順にユーザー発言を集める（古い順で返す）
+
+    要件サマリーなど、会話をそのまま渡さずに発言だけを使う場合に使う。
+    """
+    budget = max_tokens or settings.CONTEXT_REQUIREMENTS_MAX_TOKENS
+    selected: List[str] = []
+    total = 0
+    for message in reversed(history):
+        if message.get("role") != "user" or not message.get("content"):
+            continue
+        tokens = estimate_tokens(message["content"])
+        if total + tokens > budget:
+            break
+        selected.append(message["content"])
+        total += tokens
+    selected.reverse()
+    return selected
+
+
+_context_builder: Optional[ConversationContextBuilder] = None
+
+
+def get_context_builder() -> ConversationContextBuilder:
+    """ConversationContextBuilderのシングルトンインスタンスを取得"""
+    global _context_builder
+    if _context_builder is None:
+        _context_builder = ConversationContextBuilder()
+    return _context_builder
@@ -7,6 +7,7 @@ import os
 from typing import Dict, Any
 from app.agents.base import BaseAgent, AgentLevel
 from app.agents.claude_client import get_claude_client
+from app.agents.code_blocks import parse_code_blocks, stream_code_blocks, to_file_map
 
 
 class Phase5TestGenerationAgent(BaseAgent):
@@ -157,13 +158,14 @@ tests/test_example.py
 4. 正常系・異常系・境界値テストを含める
 """
 
-        result = await self.claude.generate_text(
-            messages=[{"role": "user", "content": test_prompt}],
-            system_prompt=self.system_prompt,
-            max_tokens=4096,
-            temperature=0.2,
-            use_cache=True
-        )
+        with stream_code_blocks() as parser:
+            result = await self.claude.generate_text(
+                messages=[{"role": "user", "content": test_prompt}],
+                system_prompt=self.system_prompt,
+                max_tokens=4096,
+                temperature=0.2,
+                use_cache=True
+            )
 
         if "error" in result:
             return {
@@ -175,7 +177,7 @@ tests/test_example.py
         response_text = result["content"]
 
         # 生成されたテストコードをパース
-        test_files = self._parse_test_code(response_text)
+        test_files = to_file_map(parser.finish(response_text))
 
         return {
             "status": "success",
@@ -188,16 +190,7 @@ tests/test_example.py
 
     def _parse_test_code(self, response_text: str) -> Dict[str, str]:
         """生成されたテストコードをパース"""
-        import re
-
-        test_files = {}
-        pattern = r'```filepath\s*\n(.+?)\s*\n```\s*\n```(\w+)\s*\n(.+?)\n```'
-        matches = re.findall(pattern, response_text, re.DOTALL)
-
-        for filepath, language, code in matches:
-            test_files[filepath.strip()] = code.strip()
-
-        return test_files
+        return to_file_map(parse_code_blocks(response_text))
 
 
 class Phase6DocumentationAgent(BaseAgent):
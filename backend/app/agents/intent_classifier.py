@@ -0,0 +1,152 @@
+"""
+ユーザーメッセージの意図分類
+
+Phaseエージェントがそれぞれ行っていたキーワード判定（プロジェクトタイプ・画面・改善タイプ）を
+1つの正規表現にまとめ、メッセージを1回だけ小文字化・走査して全ての分類結果を返す。
+- 判定は従来どおり部分一致（キーワードが他の語の一部に含まれていても一致とみなす）
+- 一致した位置の次の文字から探し直すことで、重なり合うキーワードも取りこぼさない
+  （同じ位置で始まる短いキーワードは、最長一致したキーワードのラベルに含めておく）
+- 分類の優先順位は各テーブルの並び順（先に書いたラベルを優先）
+"""
+import re
+from dataclasses import dataclass
+from typing import Dict, FrozenSet, Optional, Tuple
+
+
+# プロジェクトタイプ（Phase 1）: 該当なしは "general"
+PROJECT_TYPE_KEYWORDS: Tuple[Tuple[str, Tuple[str, ...]], ...] = (
+    ("ecommerce", ("ec", "ecommerce", "ショップ", "通販")),
+    ("social", ("sns", "ソーシャル", "コミュニティ")),
+    ("dashboard", ("dashboard", "ダッシュボード", "管理", "管理画面")),
+)
+
+# 生成する画面（Phase 2 のモックテンプレート）: 該当なしは全画面
+FEATURE_KEYWORDS: Tuple[Tuple[str, Tuple[str, ...]], ...] = (
+    ("list", ("一覧", "リスト", "list")),
+    ("detail", ("詳細", "detail")),
+    ("dashboard", ("ダッシュボード", "dashboard")),
+)
+
+# 改善タイプ（Phase 4）: 該当なしは "general"
+IMPROVEMENT_TYPE_KEYWORDS: Tuple[Tuple[str, Tuple[str, ...]], ...] = (
+    ("security", ("セキュリティ", "脆弱性", "security", "vulnerability", "スキャン", "scan")),
+    ("rollback", ("ロールバック", "rollback", "戻す", "revert")),
+    ("performance", ("遅い", "重い", "パフォーマンス", "速度", "performance", "slow")),
+    ("feature", ("機能", "追加", "新しい", "feature", "add")),
+    ("bug_fix", ("バグ", "エラー", "不具合", "bug", "error", "fix")),
+)
+
+DEFAULT_FEATURES = ("dashboard", "list", "detail")
+
+_TABLES = {
+    "project_type": PROJECT_TYPE_KEYWORDS,
+    "feature": FEATURE_KEYWORDS,
+    "improvement_type": IMPROVEMENT_TYPE_KEYWORDS,
+}
+
+
+@dataclass(frozen=True)
+class Intent:
+    """分類結果"""
+    project_type: str  # "ecommerce" / "social" / "dashboard" / "general"
+    features: Tuple[str, ...]  # 言及された画面（FEATURE_KEYWORDS の順。なければ空）
+    improvement_type: str  # "security" / "rollback" / "performance" / "feature" / "bug_fix" / "general"
+
+    @property
+    def features_or_default(self) -> Tuple[str, ...]:
+        """言及された画面（なければ全画面）"""
+        return self.features or DEFAULT_FEATURES
+
+
+class IntentClassifier:
+    """
+    キーワードテーブルを1つの正規表現にコンパイルした分類器
+    """
+
+    def __init__(self, tables: Optional[Dict[str, Tuple[Tuple[str, Tuple[str, ...]], ...]]] = None):
+        """
+        Args:
+            tables: 分類名 → ((ラベル, キーワード), ...) のテーブル（省略時は既定のテーブル）
+        """
+        self.tables = tables or _TABLES
+
+        # キーワード → そのキーワードで一致する (分類名, ラベル)
+        labels: Dict[str, set] = {}
+        for table, entries in self.tables.items():
+            for label, keywords in entries:
+                for keyword in keywords:
+                    labels.setdefault(keyword.lower(), set()).add((table, label))
+
+        # 最長一致したキーワードには、その位置から始まる短いキーワードのラベルも含める
+        self._labels: Dict[str, FrozenSet[Tuple[str, str]]] = {
+            keyword: frozenset(
+                label
+                for other, other_labels in labels.items()
+                if keyword.startswith(other)
+                for label in other_labels
+            )
+            for keyword in labels
+        }
+
+        # 同じ位置では最長のキーワードに一致させる（短いキーワードは上のラベルで補う）
+        alternatives = "|".join(re.escape(keyword) for keyword in sorted(labels, key=len, reverse=True))
+        self._pattern = re.compile(alternatives)
+
+        self._priority = {
+            table: [label for label, _ in entries]
+            for table, entries in self.tables.items()
+        }
+
+    def match(self, text: str) -> Dict[str, set]:
+        """テキストに含まれるラベルを分類ごとに返す"""
+        text = text.lower()
+        search = self._pattern.search
+        keywords = set()
+        pos = 0
+        # 一致した位置の次の文字から探し直し、重なり合うキーワードも見つける
+        while True:
+            matched = search(text, pos)
+            if matched is None:
+                break
+            keywords.add(matched.group())
+            pos = matched.start() + 1
+
+        found: Dict[str, set] = {table: set() for table in self.tables}
+        for keyword in keywords:
+            for table, label in self._labels[keyword]:
+                found[table].add(label)
+        return found
+
+    def classify(self, text: str) -> Intent:
+        """
+        プロジェクトタイプ・画面・改善タイプを1回の走査で判定
+        """
+        found = self.match(text or "")
+        return Intent(
+            project_type=self._first(found, "project_type"),
+            features=tuple(label for label in self._priority["feature"] if label in found["feature"]),
+            improvement_type=self._first(found, "improvement_type"),
+        )
+
+    def _first(self, found: Dict[str, set], table: str) -> str:
+        """優先順位の最も高いラベル（なければ "general"）"""
+        for label in self._priority[table]:
+            if label in found[table]:
+                return label
+        return "general"
+
+
+_intent_classifier: Optional[IntentClassifier] = None
+
+
+def get_intent_classifier() -> IntentClassifier:
+    """IntentClassifierのシングルトンインスタンスを取得"""
+    global _intent_classifier
+    if _intent_classifier is None:
+        _intent_classifier = IntentClassifier()
+    return _intent_classifier
+
+
+def classify_intent(text: str) -> Intent:
+    """メッセージの意図を分類（シングルトンの分類器を使用）"""
+    return get_intent_classifier().classify(text)
@@ -1,7 +1,15 @@
+import asyncio
 import os
-from typing import Dict, Any, List
-from app.agents.base import BaseAgent, AgentLevel
-from app.agents.claude_client import get_claude_client
+import time
+from dataclasses import replace
+from typing import Dict, Any, List, Optional, Tuple
+from app.agents.base import BaseAgent, AgentLevel, AgentRegistry
+from app.agents.claude_client import delta_sink, get_claude_client
+from app.core.config import settings
+from app.services.api_log_service import usage_context
+from app.agents.context_builder import get_context_builder, select_recent_user_turns
+from app.agents.code_blocks import group_generated_files, parse_code_blocks, stream_code_blocks, to_file_map
+from app.agents.intent_classifier import classify_intent
 
 
 class Phase1RequirementsAgent(BaseAgent):
@@ -54,17 +62,11 @@ class Phase1RequirementsAgent(BaseAgent):
         user_message = task.get("user_message", "")
         project_context = task.get("project_context", {})
 
+        # プロジェクトタイプを推定
+        project_type = classify_intent(user_message).project_type
+
         if not use_real_ai:
             # モックモード: テンプレートベースで要件定義
-            # プロジェクトタイプを推定
-            project_type = "general"
-            if any(kw in user_message.lower() for kw in ["ec", "ecommerce", "ショップ", "通販"]):
-                project_type = "ecommerce"
-            elif any(kw in user_message.lower() for kw in ["sns", "ソーシャル", "コミュニティ"]):
-                project_type = "social"
-            elif any(kw in user_message.lower() for kw in ["dashboard", "ダッシュボード", "管理", "管理画面"]):
-                project_type = "dashboard"
-
             response_message = f"""✅ **プロジェクトの要件をヒアリングさせていただきます！**
 
 ## 現在の理解
@@ -99,23 +101,16 @@ class Phase1RequirementsAgent(BaseAgent):
         # リアルAIモード: Claude API使用
         conversation_history = task.get("conversation_history", [])
 
-        # 会話履歴を構築
-        messages = []
-        for msg in conversation_history:
-            messages.append({
-                "role": msg.get("role", "user"),
-                "content": msg.get("content", "")
-            })
-
-        # 現在のユーザーメッセージを追加
-        messages.append({
-            "role": "user",
-            "content": user_message
-        })
+        # 会話履歴をトークン予算内に収めて構築（古いターンは要約、固定された接頭辞はキャッシュ）
+        context = get_context_builder().build(
+            conversation_history,
+            user_message,
+            history_offset=task.get("history_offset", 0),
+        )
 
         # Claude APIで要件を引き出す
         result = await self.claude.generate_text(
-            messages=messages,
+            messages=context.messages,
             system_prompt=self.system_prompt,
             max_tokens=2048,
             temperature=0.7,
@@ -132,15 +127,6 @@ class Phase1RequirementsAgent(BaseAgent):
         # レスポンスから要件を抽出（簡易版）
         response_text = result["content"]
 
-        # プロジェクトタイプを推定
-        project_type = "general"
-        if any(kw in user_message.lower() for kw in ["ec", "ecommerce", "ショップ", "通販"]):
-            project_type = "ecommerce"
-        elif any(kw in user_message.lower() for kw in ["sns", "ソーシャル", "コミュニティ"]):
-            project_type = "social"
-        elif any(kw in user_message.lower() for kw in ["dashboard", "ダッシュボード", "管理"]):
-            project_type = "dashboard"
-
         requirements = {
             "project_type": project_type,
             "features": [],  # 後で会話から抽出
@@ -279,13 +265,15 @@ class Phase2CodeGenerationAgent(BaseAgent):
         # 会話履歴から要件を抽出
         requirements_summary = self._extract_requirements_from_history(conversation_history)
 
-        # コード生成プロンプトを構築
-        code_generation_prompt = f"""Phase 1の要件定義に基づいて、フルスタックアプリケーションのコードを生成してください。
-
-**プロジェクト名**: {project_context.get('project_name', 'My App')}
+        # プロジェクト名と要件サマリーは同じプロジェクトの生成で変わらないので、
+        # システムプロンプトの後ろに固定コンテキストとして置き、プロンプトキャッシュの対象にする
+        project_prompt = f"""**プロジェクト名**: {project_context.get('project_name', 'My App')}
 
 **要件サマリー**:
-{requirements_summary}
+{requirements_summary}"""
+
+        # コード生成プロンプトを構築
+        code_generation_prompt = f"""Phase 1の要件定義（プロジェクト情報の要件サマリー）に基づいて、フルスタックアプリケーションのコードを生成してください。
 
 **ユーザーの追加指示**:
 {user_message}
@@ -293,14 +281,16 @@ class Phase2CodeGenerationAgent(BaseAgent):
 上記の要件を満たす、完全に動作するアプリケーションコードを生成してください。
 フロントエンド（React + TypeScript）とバックエンド（FastAPI）の両方を含めてください。"""
 
-        # Claude APIでコード生成
-        result = await self.claude.generate_text(
-            messages=[{"role": "user", "content": code_generation_prompt}],
-            system_prompt=self.system_prompt,
-            max_tokens=4096,
-            temperature=0.3,  # コード生成なので低めの温度
-            use_cache=True
-        )
+        # Claude APIでコード生成（ストリーミング中は閉じたコードブロックから順に取り出す）
+        with stream_code_blocks() as parser:
+            result = await self.claude.generate_text(
+                messages=[{"role": "user", "content": code_generation_prompt}],
+                system_prompt=self.system_prompt,
+                max_tokens=4096,
+                temperature=0.3,  # コード生成なので低めの温度
+                use_cache=True,
+                stable_context=project_prompt,
+            )
 
         if "error" in result:
             return {
@@ -311,7 +301,7 @@ class Phase2CodeGenerationAgent(BaseAgent):
 
         # 生成されたコードをパース
         response_text = result["content"]
-        generated_files = self._parse_generated_code(response_text)
+        generated_files = group_generated_files(parser.finish(response_text))
 
         # ファイルが生成されなかった場合はモックコードを使用
         if not generated_files or len(generated_files.get("frontend", {})) == 0:
@@ -335,13 +325,8 @@ class Phase2CodeGenerationAgent(BaseAgent):
         if not conversation_history:
             return "要件定義がまだ完了していません。Phase 1で要件を定義してください。"
 
-        # 会話履歴をテキストに変換
-        summary_parts = []
-        for msg in conversation_history[-10:]:  # 最新10件のみ
-            role = msg.get("role", "user")
-            content = msg.get("content", "")
-            if role == "user":
-                summary_parts.append(f"- {content}")
+        # トークン予算に収まる範囲で、新しいユーザー発言から順に使う
+        summary_parts = [f"- {content}" for content in select_recent_user_turns(conversation_history)]
 
         if summary_parts:
             return "\n".join(summary_parts)
@@ -360,33 +345,7 @@ class Phase2CodeGenerationAgent(BaseAgent):
         コード内容
         ```
         """
-        import re
-
-        files = {"frontend": {}, "backend": {}}
-
-        # ファイルパスとコードブロックを抽出
-        pattern = r'```filepath\s*\n(.+?)\s*\n```\s*\n```(\w+)\s*\n(.+?)\n```'
-        matches = re.findall(pattern, response_text, re.DOTALL)
-
-        for filepath, language, code in matches:
-            filepath = filepath.strip()
-            code = code.strip()
-
-            # フロントエンドかバックエンドか判定
-            if filepath.startswith("frontend/"):
-                clean_path = filepath.replace("frontend/", "")
-                files["frontend"][clean_path] = code
-            elif filepath.startswith("backend/"):
-                clean_path = filepath.replace("backend/", "")
-                files["backend"][clean_path] = code
-            else:
-                # プレフィックスがない場合、拡張子で判定
-                if any(filepath.endswith(ext) for ext in [".tsx", ".ts", ".jsx", ".js", ".html", ".json"]):
-                    files["frontend"][filepath] = code
-                else:
-                    files["backend"][filepath] = code
-
-        return files
+        return group_generated_files(parse_code_blocks(response_text))
 
     def _get_mock_files(self) -> Dict[str, Dict[str, str]]:
         """モックファイル（パース失敗時のフォールバック）"""
@@ -590,13 +549,14 @@ class Phase3DeploymentAgent(BaseAgent):
 5. README_DEPLOY.md: デプロイ手順書（日本語）"""
 
         # Claude APIでデプロイスクリプト生成
-        result = await self.claude.generate_text(
-            messages=[{"role": "user", "content": deployment_prompt}],
-            system_prompt=self.system_prompt,
-            max_tokens=4096,
-            temperature=0.2,
-            use_cache=True
-        )
+        with stream_code_blocks() as parser:
+            result = await self.claude.generate_text(
+                messages=[{"role": "user", "content": deployment_prompt}],
+                system_prompt=self.system_prompt,
+                max_tokens=4096,
+                temperature=0.2,
+                use_cache=True
+            )
 
         if "error" in result:
             return {
@@ -606,8 +566,8 @@ class Phase3DeploymentAgent(BaseAgent):
 
         response_text = result["content"]
 
-        # 生成されたスクリプトをパース（Phase 2と同じロジック）
-        deployment_files = self._parse_deployment_scripts(response_text)
+        # 生成されたスクリプトをパース（Phase 2と同じ形式）
+        deployment_files = to_file_map(parser.finish(response_text))
 
         return {
             "status": "success",
@@ -620,16 +580,7 @@ class Phase3DeploymentAgent(BaseAgent):
 
     def _parse_deployment_scripts(self, response_text: str) -> Dict[str, str]:
         """デプロイスクリプトをパース"""
-        import re
-
-        scripts = {}
-        pattern = r'```filepath\s*\n(.+?)\s*\n```\s*\n```(\w+)\s*\n(.+?)\n```'
-        matches = re.findall(pattern, response_text, re.DOTALL)
-
-        for filepath, language, content in matches:
-            scripts[filepath.strip()] = content.strip()
-
-        return scripts
+        return to_file_map(parse_code_blocks(response_text))
 
     def _mock_deployment_response(self, project_name: str) -> Dict[str, Any]:
         """モックデプロイレスポンス（APIトークンが未設定の場合）"""
@@ -872,26 +823,7 @@ class Phase4SelfImprovementAgent(BaseAgent):
 
     def _estimate_improvement_type(self, user_message: str) -> str:
         """ユーザーメッセージから改善タイプを推定"""
-        keywords_performance = ["遅い", "重い", "パフォーマンス", "速度", "performance", "slow"]
-        keywords_feature = ["機能", "追加", "新しい", "feature", "add"]
-        keywords_bug = ["バグ", "エラー", "不具合", "bug", "error", "fix"]
-        keywords_security = ["セキュリティ", "脆弱性", "security", "vulnerability", "スキャン", "scan"]
-        keywords_rollback = ["ロールバック", "rollback", "戻す", "revert"]
-
-        msg_lower = user_message.lower()
-
-        if any(kw in msg_lower for kw in keywords_security):
-            return "security"
-        elif any(kw in msg_lower for kw in keywords_rollback):
-            return "rollback"
-        elif any(kw in msg_lower for kw in keywords_performance):
-            return "performance"
-        elif any(kw in msg_lower for kw in keywords_feature):
-            return "feature"
-        elif any(kw in msg_lower for kw in keywords_bug):
-            return "bug_fix"
-        else:
-            return "general"
+        return classify_intent(user_message).improvement_type
 
     def security_scan(self, project_files: Dict[str, str] = None) -> Dict[str, Any]:
         """
@@ -1644,11 +1576,31 @@ class Phase14MonitoringAgent(BaseAgent):
         }
 
 
+# Phase間の依存関係（Phase → 先に完了している必要があるPhase）
+# Phase 5-14 は Phase 2 の生成コードだけを入力とし、互いには独立している
+PHASE_DEPENDENCIES: Dict[int, Tuple[int, ...]] = {
+    1: (),
+    2: (1,),
+    3: (2,),
+    4: (),
+    **{phase: (2,) for phase in range(5, 15)},
+}
+
+# パイプライン実行の既定: Phase 2 でコードを生成し、Phase 5-14 を並列に実行
+DEFAULT_PIPELINE_PHASES = (2, *range(5, 15))
+
+# パイプライン実行の各Phaseの状態（結果の phases[n]["status"]）
+PHASE_COMPLETED = "completed"
+PHASE_FAILED = "failed"
+PHASE_SKIPPED = "skipped"
+
+
 class OrchestratorAgent(BaseAgent):
     """
     オーケストレーターエージェント
     プロジェクト全体を統括し、適切なPhaseエージェントに委譲
     MVP: 単純なルーティング
+    パイプライン実行: Phaseの依存関係（DAG）に沿って、独立したPhaseを並列に実行
     将来: 複雑な意思決定と階層管理
     """
 
@@ -1662,7 +1614,12 @@ class OrchestratorAgent(BaseAgent):
     async def execute(self, task: Dict[str, Any]) -> Dict[str, Any]:
         """
         プロジェクトを統括し、適切なPhaseエージェントを選択
+
+        task["mode"] が "pipeline" の場合は複数Phaseを依存関係に沿って実行する（execute_pipeline）
         """
+        if task.get("mode") == "pipeline":
+            return await self.execute_pipeline(task)
+
         current_phase = task.get("current_phase", 1)
         user_message = task.get("user_message", "")
 
@@ -1694,3 +1651,157 @@ class OrchestratorAgent(BaseAgent):
             "selected_agent": selected_agent,
             "message": f"Phase {current_phase}エージェントを起動しました",
         }
+
+    async def execute_pipeline(self, task: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        複数Phaseを依存関係に沿って実行（依存の解けたPhaseから並列に、同時実行数は上限付き）
+
+        task:
+            phases: 実行するPhase（省略時は Phase 2 → Phase 5-14）
+            dependencies: 依存関係の上書き {Phase: [先に完了しているPhase]}（省略時は PHASE_DEPENDENCIES）
+            max_concurrency: 同時に実行するPhaseの上限（省略時は設定値）
+            generated_code: Phase 2 を実行しない場合に後続Phaseへ渡す生成コード
+            user_message / project_context / conversation_history: 各Phaseにそのまま渡す
+
+        実行対象に含まれない依存Phaseは完了済みとみなす。依存Phaseが失敗したPhaseは実行しない。
+        進捗（各Phaseの開始・完了）はテキストとして逐次出力する（execute_stream で配信される）。
+        """
+        phases = list(dict.fromkeys(int(phase) for phase in (task.get("phases") or DEFAULT_PIPELINE_PHASES)))
+        dependencies = self.resolve_dependencies(phases, task.get("dependencies"))
+        max_concurrency = max(1, int(task.get("max_concurrency") or settings.ORCHESTRATOR_MAX_CONCURRENCY))
+
+        # 各Phaseのトークン差分は混ざるため転送せず、進捗行だけを出力する
+        progress = delta_sink.get()
+        context = usage_context.get()
+
+        def report(text: str):
+            if progress:
+                progress(text)
+
+        loop = asyncio.get_running_loop()
+        finished = {phase: loop.create_future() for phase in phases}  # 結果: 成功したか
+        semaphore = asyncio.Semaphore(max_concurrency)
+        results: Dict[int, Dict[str, Any]] = {}
+        timeline: Dict[int, Dict[str, Any]] = {}
+        generated_code = {"value": task.get("generated_code") or {}}
+        pipeline_start = time.perf_counter()
+
+        async def run_phase(phase: int):
+            succeeded = False
+            try:
+                upstream = dependencies[phase]
+                if not all(await asyncio.gather(*(finished[dep] for dep in upstream))):
+                    timeline[phase] = {"status": PHASE_SKIPPED, "elapsed": 0.0}
+                    report(f"⏭ Phase {phase}: 依存Phaseが失敗したためスキップしました\n")
+                    return
+
+                async with semaphore:
+                    agent = AgentRegistry.get_phase_agent(phase)
+                    delta_sink.set(None)
+                    if context is not None:
+                        usage_context.set(replace(context, phase=phase, agent_name=agent.name))
+
+                    started = time.perf_counter()
+                    report(f"▶ Phase {phase}（{agent.name}）を開始しました\n")
+                    try:
+                        result = await agent.execute({
+                            "user_message": task.get("user_message", ""),
+                            "project_context": task.get("project_context") or {},
+                            "conversation_history": task.get("conversation_history") or [],
+                            "generated_code": generated_code["value"],
+                            "upstream_results": {dep: results[dep] for dep in upstream if dep in results},
+                        })
+                        succeeded = result.get("status") != "error"
+                    except Exception as e:
+                        result = {"status": "error", "response": f"エラーが発生しました: {str(e)}"}
+                    elapsed = time.perf_counter() - started
+
+                results[phase] = result
+                timeline[phase] = {
+                    "status": PHASE_COMPLETED if succeeded else PHASE_FAILED,
+                    "agent_name": agent.name,
+                    "started_at": started - pipeline_start,
+                    "elapsed": elapsed,
+                }
+                if phase == 2 and succeeded and result.get("generated_code"):
+                    generated_code["value"] = result["generated_code"]
+                mark = "✓" if succeeded else "✗"
+                report(f"{mark} Phase {phase}（{agent.name}）{'完了' if succeeded else '失敗'} {elapsed:.2f}s\n")
+            finally:
+                if not finished[phase].done():
+                    finished[phase].set_result(succeeded)
+
+        await asyncio.gather(*(run_phase(phase) for phase in phases))
+
+        wall_clock = time.perf_counter() - pipeline_start
+        sum_of_phases = sum(entry["elapsed"] for entry in timeline.values())
+        speedup = sum_of_phases / wall_clock if wall_clock > 0 else 1.0
+        failed = [phase for phase in phases if timeline[phase]["status"] != PHASE_COMPLETED]
+
+        lines = [
+            f"## パイプライン実行結果（{len(phases) - len(failed)}/{len(phases)} Phase 完了）",
+            "",
+            "| Phase | エージェント | 状態 | 開始 | 所要時間 |",
+            "|---|---|---|---|---|",
+        ]
+        for phase in phases:
+            entry = timeline[phase]
+            lines.append(
+                f"| {phase} | {entry.get('agent_name', '-')} | {entry['status']} "
+                f"| {entry.get('started_at', 0.0):.2f}s | {entry['elapsed']:.2f}s |"
+            )
+        lines += [
+            "",
+            f"- 実行時間: {wall_clock:.2f}s（各Phaseの合計 {sum_of_phases:.2f}s、{speedup:.1f}倍）",
+            f"- 同時実行数の上限: {max_concurrency}",
+        ]
+
+        return {
+            "status": "error" if failed else "success",
+            "response": "\n".join(lines),
+            "phases": {phase: {**timeline[phase], "result": results.get(phase)} for phase in phases},
+            "generated_code": generated_code["value"],
+            "wall_clock_seconds": wall_clock,
+            "sum_of_phases_seconds": sum_of_phases,
+            "speedup": speedup,
+            "max_concurrency": max_concurrency,
+        }
+
+    @staticmethod
+    def resolve_dependencies(
+        phases: List[int],
+        overrides: Optional[Dict[Any, List[int]]] = None,
+    ) -> Dict[int, Tuple[int, ...]]:
+        """
+        実行対象のPhaseどうしの依存関係を求める（未登録のPhase・循環はValueError）
+        """
+        graph = dict(PHASE_DEPENDENCIES)
+        for phase, upstream in (overrides or {}).items():
+            graph[int(phase)] = tuple(int(dep) for dep in upstream)
+
+        unknown = [phase for phase in phases if AgentRegistry.get_phase_agent(phase) is None]
+        if unknown:
+            raise ValueError(f"無効なPhaseです: {unknown}")
+
+        selected = set(phases)
+        dependencies = {
+            phase: tuple(dep for dep in graph.get(phase, ()) if dep in selected)
+            for phase in phases
+        }
+
+        # 循環の検出（深さ優先探索）
+        state: Dict[int, int] = {}  # 1: 探索中, 2: 探索済み
+
+        def visit(phase: int):
+            if state.get(phase) == 1:
+                raise ValueError(f"Phaseの依存関係が循環しています: Phase {phase}")
+            if state.get(phase) == 2:
+                return
+            state[phase] = 1
+            for dep in dependencies[phase]:
+                visit(dep)
+            state[phase] = 2
+
+        for phase in phases:
+            visit(phase)
+        return dependencies
@@ -0,0 +1,139 @@
+"""
+プロンプトキャッシュを考慮したリクエストの組み立て
+
+Claude APIのプロンプトキャッシュは、cache_control を付けたブロックまでの接頭辞単位で効く。
+変わりにくい順に並べ、それぞれの終わりにブレークポイントを置く。
+1. システムプロンプト（Phaseごとに共通）
+2. プロジェクトの固定コンテキスト（要件サマリー等。同じプロジェクトでは共通）
+3. 固定された会話履歴（ConversationContextBuilder が置いたブレークポイント、または今回の発言の直前）
+- 接頭辞が最小キャッシュ長（CLAUDE_PROMPT_CACHE_MIN_TOKENS）に届かない位置には置かない
+  （キャッシュされずブレークポイントの上限を使うだけのため）
+- ブレークポイントはAPIの上限（4つ）まで。超える場合は会話履歴の古いものから外す
+- 呼び出し元の messages は書き換えない
+"""
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+from app.agents.context_builder import CACHE_CONTROL, estimate_tokens
+from app.core.config import settings
+
+
+MAX_CACHE_BREAKPOINTS = 4
+
+
+@dataclass
+class PromptRequest:
+    """組み立てたリクエスト"""
+    system: List[Dict[str, Any]]  # system に渡すブロック（空ならsystemなし）
+    messages: List[Dict[str, Any]]
+    breakpoints: int  # 置いたブレークポイントの数
+    estimated_prefix_tokens: int  # 最後のブレークポイントまでの推定トークン数（キャッシュ対象）
+
+
+def _block_text(block: Any) -> str:
+    if isinstance(block, dict):
+        return block.get("text", "")
+    return str(block)
+
+
+def _copy_message(message: Dict[str, Any]) -> Dict[str, Any]:
+    """content がブロックのリストならブロックまでコピー"""
+    content = message.get("content", "")
+    if isinstance(content, list):
+        content = [dict(block) if isinstance(block, dict) else block for block in content]
+    return {**message, "content": content}
+
+
+def _mark(message: Dict[str, Any]):
+    """メッセージの最後のブロックにブレークポイントを置く（文字列ならテキストブロックにする）"""
+    content = message["content"]
+    if isinstance(content, str):
+        message["content"] = [{"type": "text", "text": content, "cache_control": CACHE_CONTROL}]
+    elif content:
+        content[-1] = {**content[-1], "cache_control": CACHE_CONTROL}
+
+
+def _unmark(message: Dict[str, Any]):
+    content = message["content"]
+    if isinstance(content, list):
+        message["content"] = [
+            {key: value for key, value in block.items() if key != "cache_control"} if isinstance(block, dict) else block
+            for block in content
+        ]
+
+
+def build_prompt_request(
+    system_prompt: Optional[str],
+    messages: List[Dict[str, Any]],
+    stable_context: Optional[str] = None,
+    use_cache: bool = True,
+    cache_history: bool = False,
+    min_cache_tokens: Optional[int] = None,
+) -> PromptRequest:
+    """
+    system ブロックと messages を組み立てる
+
+    Args:
+        system_prompt: システムプロンプト
+        messages: 会話（ConversationContextBuilder の結果ならブレークポイント付き）
+        stable_context: 同じプロジェクトでは変わらないコンテキスト（システムプロンプトの後ろに置く）
+        use_cache: ブレークポイントを置くか（False の場合は messages のものも外す）
+        cache_history: messages にブレークポイントがない場合、今回の発言の直前までを固定された履歴とみなす
+        min_cache_tokens: キャッシュされる最小の接頭辞トークン数（省略時は CLAUDE_PROMPT_CACHE_MIN_TOKENS）
+    """
+    min_tokens = settings.CLAUDE_PROMPT_CACHE_MIN_TOKENS if min_cache_tokens is None else min_cache_tokens
+
+    system: List[Dict[str, Any]] = []
+    for text in (system_prompt, stable_context):
+        if text:
+            system.append({"type": "text", "text": text})
+    messages = [_copy_message(message) for message in messages]
+
+    if not use_cache:
+        for message in messages:
+            _unmark(message)
+        return PromptRequest(system=system, messages=messages, breakpoints=0, estimated_prefix_tokens=0)
+
+    if cache_history and len(messages) >= 2 and not any(_has_breakpoint(message) for message in messages):
+        _mark(messages[-2])
+
+    # 接頭辞の推定トークン数とブレークポイントの位置（("system", i) / ("message", i)）
+    candidates = []
+    prefix = 0
+    for index, block in enumerate(system):
+        prefix += estimate_tokens(block["text"])
+        candidates.append((("system", index), prefix))
+    for index, message in enumerate(messages):
+        content = message["content"]
+        blocks = content if isinstance(content, list) else [content]
+        prefix += sum(estimate_tokens(_block_text(block)) for block in blocks) + 4
+        if _has_breakpoint(message):
+            candidates.append((("message", index), prefix))
+
+    # 最小キャッシュ長に届かない位置には置かない
+    selected = [(position, tokens) for position, tokens in candidates if tokens >= min_tokens]
+    # 上限を超える場合: 最後の履歴を残し、履歴の古いもの → システム側の順に外す
+    while len(selected) > MAX_CACHE_BREAKPOINTS:
+        history = [item for item in selected[:-1] if item[0][0] == "message"]
+        selected.remove(history[0] if history else selected[0])
+
+    chosen = {position for position, _ in selected}
+    for index, block in enumerate(system):
+        if ("system", index) in chosen:
+            block["cache_control"] = CACHE_CONTROL
+    for index, message in enumerate(messages):
+        if _has_breakpoint(message) and ("message", index) not in chosen:
+            _unmark(message)
+
+    return PromptRequest(
+        system=system,
+        messages=messages,
+        breakpoints=len(selected),
+        estimated_prefix_tokens=selected[-1][1] if selected else 0,
+    )
+
+
+def _has_breakpoint(message: Dict[str, Any]) -> bool:
+    content = message.get("content")
+    return isinstance(content, list) and any(
+        isinstance(block, dict) and "cache_control" in block for block in content
+    )
@@ -3,7 +3,9 @@
 Phase 2で使用する実用的なテンプレート集
 """
 
-from typing import Dict, Any
+from typing import Dict, Any, Tuple
+from app.agents.intent_classifier import classify_intent
+from app.agents.templates.render_cache import cached_render
 
 
 def generate_frontend_templates(project_name: str = "My App", features: list = None) -> Dict[str, str]:
@@ -883,6 +885,16 @@ alembic upgrade head
     return templates
 
 
+def detect_features(user_requirements: str = "") -> Tuple[str, ...]:
+    """
+    ユーザー要件から生成する画面（フィーチャー）を推定（簡易版）
+
+    Returns:
+        フィーチャー名のタプル（該当なしの場合はすべて）
+    """
+    return classify_intent(user_requirements).features_or_default
+
+
 def generate_project_code(project_name: str, user_requirements: str = "") -> Dict[str, Dict[str, str]]:
     """
     プロジェクト全体のコードを生成
@@ -894,21 +906,14 @@ def generate_project_code(project_name: str, user_requirements: str = "") -> Dic
     Returns:
         {"frontend": {...}, "backend": {...}} 形式の辞書
     """
-    # ユーザー要件からフィーチャーを推定（簡易版）
-    features = []
-    if any(kw in user_requirements.lower() for kw in ["一覧", "リスト", "list"]):
-        features.append("list")
-    if any(kw in user_requirements.lower() for kw in ["詳細", "detail"]):
-        features.append("detail")
-    if any(kw in user_requirements.lower() for kw in ["ダッシュボード", "dashboard"]):
-        features.append("dashboard")
-
-    # デフォルトのフィーチャー
-    if not features:
-        features = ["dashboard", "list", "detail"]
+    return _render_project_code(project_name, detect_features(user_requirements))
+
 
-    frontend_code = generate_frontend_templates(project_name, features)
-    backend_code = generate_backend_templates(project_name, features)
+@cached_render(lambda project_name, features: (project_name, features))
+def _render_project_code(project_name: str, features: Tuple[str, ...]) -> Dict[str, Dict[str, str]]:
+    """プロジェクト名とフィーチャーからコードを描画（結果はキャッシュされる）"""
+    frontend_code = generate_frontend_templates(project_name, list(features))
+    backend_code = generate_backend_templates(project_name, list(features))
 
     return {
         "frontend": frontend_code,
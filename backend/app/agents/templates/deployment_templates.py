@@ -4,8 +4,10 @@ Phase 3で使用する実用的なデプロイスクリプト集
 """
 
 from typing import Dict
+from app.agents.templates.render_cache import cached_render, project_name_key
 
 
+@cached_render(project_name_key)
 def generate_deployment_scripts(project_name: str = "My App") -> Dict[str, str]:
     """
     デプロイスクリプトを生成
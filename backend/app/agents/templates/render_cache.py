@@ -0,0 +1,82 @@
+"""
+モックモード用テンプレートのレンダリングキャッシュ
+
+テンプレートの出力はプロジェクト名と検出した機能だけで決まるため、
+その入力をキーに描画結果を保持し、同じ入力では描画を省略する。
+プロジェクト名はそのまま出力に埋め込まれるので、空白の違いも別のキーとして扱う。
+- 件数は上限付き（LRU）
+- 呼び出し元が結果を書き換えてもキャッシュに影響しないよう、辞書はコピーして返す
+
+描画日時を埋め込むテンプレート（extended_templates）は、日時の差し込みが描画と同程度に
+かかりキャッシュしても速くならないため対象外。
+"""
+import functools
+from typing import Any, Callable, Dict, Hashable, Tuple
+from app.core.config import settings
+from app.utils.cache import TTLCache
+
+
+_render_cache: TTLCache[Tuple[dict, bool]] = TTLCache(
+    max_entries=settings.TEMPLATE_RENDER_CACHE_MAX_ENTRIES,
+    ttl=0,
+)
+
+# テンプレートごとのヒット数・ミス数
+_template_stats: Dict[str, Dict[str, int]] = {}
+
+
+def project_name_key(project_name: str = "My App", *args, **kwargs) -> str:
+    """プロジェクト名だけで出力が決まるテンプレートのキャッシュキー"""
+    return project_name
+
+
+def _copy(value: Any, nested: bool) -> Any:
+    """結果の辞書をコピー（{"frontend": {...}, "backend": {...}} のような2階層まで）"""
+    if nested:
+        return {key: dict(item) for key, item in value.items()}
+    return dict(value)
+
+
+def cached_render(key_func: Callable[..., Hashable]):
+    """
+    テンプレート生成関数の描画結果をキャッシュするデコレーター
+
+    Args:
+        key_func: 生成関数と同じ引数を受け取り、出力を決める入力をキャッシュキーとして返す関数
+    """
+    def decorator(func):
+        name = func.__name__
+        stats = _template_stats.setdefault(name, {"hits": 0, "misses": 0})
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            key = (name, key_func(*args, **kwargs))
+            entry = _render_cache.get(key)
+            if entry is None:
+                stats["misses"] += 1
+                value = func(*args, **kwargs)
+                entry = (value, any(isinstance(item, dict) for item in value.values()))
+                _render_cache.set(key, entry)
+            else:
+                stats["hits"] += 1
+            value, nested = entry
+            return _copy(value, nested)
+
+        wrapper.uncached = func
+        return wrapper
+
+    return decorator
+
+
+def clear_render_cache():
+    """キャッシュを空にする（ヒット数・ミス数はそのまま）"""
+    _render_cache.clear()
+
+
+def get_render_cache_stats() -> dict:
+    """キャッシュ全体とテンプレートごとのヒット数・ミス数"""
+    return {
+        **_render_cache.stats(),
+        "max_entries": _render_cache.max_entries,
+        "templates": {name: dict(counts) for name, counts in _template_stats.items()},
+    }
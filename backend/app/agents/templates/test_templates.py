@@ -4,8 +4,10 @@ Phase 5で使用するテストコード生成テンプレート集
 """
 
 from typing import Dict
+from app.agents.templates.render_cache import cached_render, project_name_key
 
 
+@cached_render(project_name_key)
 def generate_test_files(project_name: str = "My App", generated_code: Dict = None) -> Dict[str, str]:
     """
     テストファイルを生成
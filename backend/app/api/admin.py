@@ -1,12 +1,16 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from sqlalchemy import func
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from pydantic import BaseModel
-from typing import List
+from typing import Optional
+from app.core.config import settings
 from app.core.database import get_db
-from app.core.deps import get_current_admin_user
-from app.models.models import User, UserStatus, Project, ApiLog
+from app.core.deps import get_current_admin_user, get_principal_cache_stats, invalidate_user_principal, UserPrincipal
+from app.models.models import User, UserRole, UserStatus
 from app.services.email_service import send_approval_email, send_rejection_email
+from app.services import admin_user_service, usage_rollup_service
+from app.services.response_cache_service import get_response_cache
+from app.agents.templates.render_cache import get_render_cache_stats
 
 router = APIRouter()
 
@@ -22,13 +26,13 @@ class RejectUserRequest(BaseModel):
 
 @router.get("/applications")
 async def get_pending_applications(
-    current_user: User = Depends(get_current_admin_user),
-    db: Session = Depends(get_db)
+    current_user: UserPrincipal = Depends(get_current_admin_user),
+    db: AsyncSession = Depends(get_db)
 ):
     """
     審査待ちの申請一覧を取得
     """
-    pending_users = db.query(User).filter(User.status == UserStatus.pending).all()
+    pending_users = (await db.scalars(select(User).where(User.status == UserStatus.pending))).all()
 
     return [
         {
@@ -46,13 +50,13 @@ async def get_pending_applications(
 @router.put("/applications/{id}/approve")
 async def approve_application(
     id: str,
-    current_user: User = Depends(get_current_admin_user),
-    db: Session = Depends(get_db)
+    current_user: UserPrincipal = Depends(get_current_admin_user),
+    db: AsyncSession = Depends(get_db)
 ):
     """
     申請を承認
     """
-    user = db.query(User).filter(User.id == id).first()
+    user = await db.get(User, id)
 
     if not user:
         raise HTTPException(status_code=404, detail="ユーザーが見つかりません")
@@ -61,7 +65,8 @@ async def approve_application(
         raise HTTPException(status_code=400, detail="このユーザーは既に処理されています")
 
     user.status = UserStatus.approved
-    db.commit()
+    await db.commit()
+    invalidate_user_principal(user.id)
 
     # ユーザーにメール通知を送る
     await send_approval_email(user.email, user.name)
@@ -77,13 +82,13 @@ class RejectApplicationRequest(BaseModel):
 async def reject_application(
     id: str,
     request: RejectApplicationRequest,
-    current_user: User = Depends(get_current_admin_user),
-    db: Session = Depends(get_db)
+    current_user: UserPrincipal = Depends(get_current_admin_user),
+    db: AsyncSession = Depends(get_db)
 ):
     """
     申請を却下
     """
-    user = db.query(User).filter(User.id == id).first()
+    user = await db.get(User, id)
 
     if not user:
         raise HTTPException(status_code=404, detail="ユーザーが見つかりません")
@@ -93,7 +98,8 @@ async def reject_application(
 
     user.status = UserStatus.rejected
     user.rejection_reason = request.reason
-    db.commit()
+    await db.commit()
+    invalidate_user_principal(user.id)
 
     # ユーザーにメール通知を送る
     await send_rejection_email(user.email, user.name, user.rejection_reason)
@@ -103,45 +109,58 @@ async def reject_application(
 
 @router.get("/users")
 async def get_all_users(
-    current_user: User = Depends(get_current_admin_user),
-    db: Session = Depends(get_db)
+    page: int = Query(1, ge=1),
+    limit: Optional[int] = Query(None, ge=1),
+    sort: str = "created_at",
+    order: str = "desc",
+    status: Optional[UserStatus] = None,
+    role: Optional[UserRole] = None,
+    search: Optional[str] = None,
+    current_user: UserPrincipal = Depends(get_current_admin_user),
+    db: AsyncSession = Depends(get_db)
 ):
     """
-    全ユーザー一覧を取得
+    ユーザー一覧をページ単位で取得
+
+    - sort: created_at / last_login_at / name / email / status / project_count
+    - order: asc / desc
+    - status, role: 絞り込み
+    - search: 氏名・メールアドレスの部分一致
     """
-    users = db.query(User).all()
+    limit = min(limit or settings.ADMIN_USERS_PAGE_SIZE, settings.ADMIN_USERS_MAX_PAGE_SIZE)
+    try:
+        users, total = await admin_user_service.list_users(
+            db, page=page, limit=limit, sort=sort, order=order,
+            status=status, role=role, search=search.strip() if search else None,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
-    return [
-        {
-            "id": u.id,
-            "name": u.name,
-            "email": u.email,
-            "role": u.role.value,
-            "status": u.status.value,
-            "projectCount": len(u.projects),
-            "last_login": u.last_login_at.isoformat() if u.last_login_at else None,
-            "created_at": u.created_at.isoformat(),
-        }
-        for u in users
-    ]
+    return {
+        "users": users,
+        "total": total,
+        "page": page,
+        "limit": limit,
+    }
 
 
 @router.post("/users/{user_id}/suspend")
 async def suspend_user(
     user_id: str,
-    current_user: User = Depends(get_current_admin_user),
-    db: Session = Depends(get_db)
+    current_user: UserPrincipal = Depends(get_current_admin_user),
+    db: AsyncSession = Depends(get_db)
 ):
     """
     ユーザーを停止
     """
-    user = db.query(User).filter(User.id == user_id).first()
+    user = await db.get(User, user_id)
 
     if not user:
         raise HTTPException(status_code=404, detail="ユーザーが見つかりません")
 
     user.status = UserStatus.suspended
-    db.commit()
+    await db.commit()
+    invalidate_user_principal(user.id)
 
     return {"message": "ユーザーを停止しました"}
 
@@ -149,138 +168,44 @@ async def suspend_user(
 @router.post("/users/{user_id}/activate")
 async def activate_user(
     user_id: str,
-    current_user: User = Depends(get_current_admin_user),
-    db: Session = Depends(get_db)
+    current_user: UserPrincipal = Depends(get_current_admin_user),
+    db: AsyncSession = Depends(get_db)
 ):
     """
     ユーザーを有効化
     """
-    user = db.query(User).filter(User.id == user_id).first()
+    user = await db.get(User, user_id)
 
     if not user:
         raise HTTPException(status_code=404, detail="ユーザーが見つかりません")
 
     user.status = UserStatus.approved
-    db.commit()
+    await db.commit()
+    invalidate_user_principal(user.id)
 
     return {"message": "ユーザーを有効化しました"}
 
 
 @router.get("/api-stats")
 async def get_api_stats(
-    current_user: User = Depends(get_current_admin_user),
-    db: Session = Depends(get_db)
+    current_user: UserPrincipal = Depends(get_current_admin_user),
+    db: AsyncSession = Depends(get_db)
 ):
     """
-    API使用統計を取得
+    API使用統計を取得（api_logsではなく日別集計テーブルから算出）
     """
-    from datetime import datetime, timezone
-
-    # 総統計
-    total_requests = db.query(func.count(ApiLog.id)).scalar() or 0
-    total_cost = db.query(func.sum(ApiLog.cost)).scalar() or 0
-    total_tokens = db.query(func.sum(ApiLog.total_tokens)).scalar() or 0
-
-    # 今日の統計（UTC基準）
-    today_start = datetime.now(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0)
-    today_requests = db.query(func.count(ApiLog.id)).filter(
-        ApiLog.created_at >= today_start
-    ).scalar() or 0
-    today_cost = db.query(func.sum(ApiLog.cost)).filter(
-        ApiLog.created_at >= today_start
-    ).scalar() or 0
-
-    # トップユーザー（APIコール数でトップ10）
-    top_users_query = db.query(
-        ApiLog.user_id,
-        User.name.label('user_name'),
-        func.count(ApiLog.id).label('total_requests'),
-        func.sum(ApiLog.cost).label('total_cost')
-    ).join(User, ApiLog.user_id == User.id)\
-     .group_by(ApiLog.user_id, User.name)\
-     .order_by(func.count(ApiLog.id).desc())\
-     .limit(10)\
-     .all()
-
-    top_users = [
-        {
-            "user_id": row.user_id,
-            "user_name": row.user_name,
-            "total_requests": row.total_requests,
-            "total_cost": float(row.total_cost) if row.total_cost else 0.0,
-        }
-        for row in top_users_query
-    ]
+    return await usage_rollup_service.get_usage_summary(db)
 
-    # Phase別統計（Phase 1-14）
-    phase_stats_query = db.query(
-        ApiLog.phase,
-        func.count(ApiLog.id).label('total_requests'),
-        func.sum(ApiLog.cost).label('total_cost'),
-        func.sum(ApiLog.total_tokens).label('total_tokens')
-    ).filter(ApiLog.phase.isnot(None))\
-     .group_by(ApiLog.phase)\
-     .order_by(ApiLog.phase)\
-     .all()
-
-    phase_stats = [
-        {
-            "phase": row.phase,
-            "total_requests": row.total_requests,
-            "total_cost": float(row.total_cost) if row.total_cost else 0.0,
-            "total_tokens": int(row.total_tokens) if row.total_tokens else 0,
-        }
-        for row in phase_stats_query
-    ]
-
-    # Phase別の詳細統計（今日のデータ）
-    today_phase_stats_query = db.query(
-        ApiLog.phase,
-        func.count(ApiLog.id).label('requests'),
-        func.sum(ApiLog.cost).label('cost')
-    ).filter(
-        ApiLog.phase.isnot(None),
-        ApiLog.created_at >= today_start
-    ).group_by(ApiLog.phase)\
-     .order_by(ApiLog.phase)\
-     .all()
-
-    today_phase_stats = [
-        {
-            "phase": row.phase,
-            "requests": row.requests,
-            "cost": float(row.cost) if row.cost else 0.0,
-        }
-        for row in today_phase_stats_query
-    ]
-
-    # キャッシュ統計
-    total_cached_requests = db.query(func.count(ApiLog.id)).filter(
-        ApiLog.cached == True
-    ).scalar() or 0
-
-    today_cached_requests = db.query(func.count(ApiLog.id)).filter(
-        ApiLog.cached == True,
-        ApiLog.created_at >= today_start
-    ).scalar() or 0
-
-    # キャッシュヒット率の計算
-    cache_hit_rate = (total_cached_requests / total_requests * 100) if total_requests > 0 else 0.0
-    today_cache_hit_rate = (today_cached_requests / today_requests * 100) if today_requests > 0 else 0.0
 
+@router.get("/cache-stats")
+async def get_cache_stats(
+    current_user: UserPrincipal = Depends(get_current_admin_user),
+):
+    """
+    インプロセスキャッシュのヒット数・ミス数を取得（このプロセスの値）
+    """
     return {
-        "total_requests": total_requests,
-        "total_cost": float(total_cost) if total_cost else 0.0,
-        "total_tokens": int(total_tokens) if total_tokens else 0,
-        "today_requests": today_requests,
-        "today_cost": float(today_cost) if today_cost else 0.0,
-        "top_users": top_users,
-        "phase_stats": phase_stats,
-        "today_phase_stats": today_phase_stats,
-        "cache_stats": {
-            "total_cached_requests": total_cached_requests,
-            "total_cache_hit_rate": round(cache_hit_rate, 2),
-            "today_cached_requests": today_cached_requests,
-            "today_cache_hit_rate": round(today_cache_hit_rate, 2),
-        },
+        "principal": get_principal_cache_stats(),
+        "template_render": get_render_cache_stats(),
+        "response": get_response_cache().stats(),
     }
@@ -1,20 +1,36 @@
 from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from pydantic import BaseModel
 from typing import Optional, List, Dict, Any
 
 from app.core.database import get_db
-from app.core.deps import get_current_approved_user
-from app.models.models import User, Agent
-from app.agents.phase_agents import (
-    Phase1RequirementsAgent,
-    Phase2CodeGenerationAgent,
-    Phase3DeploymentAgent,
-    Phase4SelfImprovementAgent,
+from app.core.deps import get_current_approved_user, UserPrincipal
+from app.models.models import Agent, Project
+from app.agents import AgentRegistry
+from app.agents.phase_agents import DEFAULT_PIPELINE_PHASES, OrchestratorAgent
+from app.services.agent_job_service import (
+    JOB_KIND_AGENT,
+    JOB_KIND_PIPELINE,
+    PIPELINE_JOB_PHASE,
+    get_agent_job_queue,
 )
+from app.services.api_log_service import UsageContext, usage_context
 
 router = APIRouter()
 
+# /execute で実行可能なPhase
+EXECUTABLE_PHASES = (1, 2, 3, 4)
+
+
+class PipelineExecuteRequest(BaseModel):
+    """パイプライン実行リクエスト（Phaseの依存関係に沿って並列実行）"""
+    phases: Optional[List[int]] = None  # 省略時は Phase 2 → Phase 5-14
+    max_concurrency: Optional[int] = None
+    user_message: str = ""
+    project_context: Dict[str, Any]  # project_id が必須
+    conversation_history: Optional[List[Dict[str, str]]] = []
+
 
 class AgentExecuteRequest(BaseModel):
     """エージェント実行リクエスト"""
@@ -26,13 +42,13 @@ class AgentExecuteRequest(BaseModel):
 
 @router.get("/")
 async def get_agents(
-    current_user: User = Depends(get_current_approved_user),
-    db: Session = Depends(get_db)
+    current_user: UserPrincipal = Depends(get_current_approved_user),
+    db: AsyncSession = Depends(get_db)
 ):
     """
     登録されているエージェント一覧を取得
     """
-    agents = db.query(Agent).filter(Agent.is_active == True).all()
+    agents = (await db.scalars(select(Agent).where(Agent.is_active == True))).all()
 
     return [
         {
@@ -51,13 +67,13 @@ async def get_agents(
 @router.get("/{agent_id}")
 async def get_agent(
     agent_id: str,
-    current_user: User = Depends(get_current_approved_user),
-    db: Session = Depends(get_db)
+    current_user: UserPrincipal = Depends(get_current_approved_user),
+    db: AsyncSession = Depends(get_db)
 ):
     """
     エージェント詳細を取得
     """
-    agent = db.query(Agent).filter(Agent.id == agent_id).first()
+    agent = await db.get(Agent, agent_id)
 
     if not agent:
         raise HTTPException(status_code=404, detail="エージェントが見つかりません")
@@ -80,8 +96,8 @@ async def get_agent(
 @router.post("/execute")
 async def execute_agent(
     request: AgentExecuteRequest,
-    current_user: User = Depends(get_current_approved_user),
-    db: Session = Depends(get_db)
+    current_user: UserPrincipal = Depends(get_current_approved_user),
+    db: AsyncSession = Depends(get_db)
 ):
     """
     エージェントを実行
@@ -91,15 +107,10 @@ async def execute_agent(
     Phase 3: デプロイエージェント
     Phase 4: 自己改善エージェント
     """
-    # Phaseに応じてエージェントを選択
-    agent_map = {
-        1: Phase1RequirementsAgent(),
-        2: Phase2CodeGenerationAgent(),
-        3: Phase3DeploymentAgent(),
-        4: Phase4SelfImprovementAgent(),
-    }
-
-    agent = agent_map.get(request.phase)
+    # Phaseに応じてエージェントを選択（起動時に生成済みのシングルトン）
+    agent = None
+    if request.phase in EXECUTABLE_PHASES:
+        agent = AgentRegistry.get_phase_agent(request.phase)
     if not agent:
         raise HTTPException(
             status_code=400,
@@ -114,12 +125,18 @@ async def execute_agent(
         "user_id": current_user.id,
     }
 
-    # エージェントを実行
+    # エージェントを実行（Claude APIの使用量はこのユーザー・Phaseのログとして記録される）
+    token = usage_context.set(UsageContext(
+        user_id=current_user.id,
+        project_id=(request.project_context or {}).get("project_id"),
+        phase=request.phase,
+        agent_name=agent.name,
+        response_cache=current_user.response_cache_enabled,
+        api_key=current_user.custom_claude_api_key,
+    ))
     try:
         result = await agent.execute(task)
 
-        # TODO: 実行ログをデータベースに保存
-
         return {
             "status": "success",
             "phase": request.phase,
@@ -132,3 +149,92 @@ async def execute_agent(
             status_code=500,
             detail=f"エージェント実行エラー: {str(e)}"
         )
+    finally:
+        usage_context.reset(token)
+
+
+async def _get_owned_project_id(db: AsyncSession, project_context: Optional[Dict[str, Any]], user_id: str) -> str:
+    """project_context.project_id が自分のプロジェクトであることを確認"""
+    project_id = (project_context or {}).get("project_id")
+    project = await db.scalar(
+        select(Project.id).where(
+            Project.id == project_id,
+            Project.owner_id == user_id
+        )
+    ) if project_id else None
+    if not project:
+        raise HTTPException(status_code=404, detail="プロジェクトが見つかりません")
+    return project_id
+
+
+@router.post("/jobs", status_code=202)
+async def submit_agent_job(
+    request: AgentExecuteRequest,
+    current_user: UserPrincipal = Depends(get_current_approved_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    エージェントの実行をジョブとして登録（結果は /api/v1/jobs/{job_id} で取得）
+
+    project_context.project_id に自分のプロジェクトの指定が必要
+    """
+    if request.phase not in EXECUTABLE_PHASES or not AgentRegistry.get_phase_agent(request.phase):
+        raise HTTPException(
+            status_code=400,
+            detail=f"無効なPhaseです: {request.phase}"
+        )
+
+    project_id = await _get_owned_project_id(db, request.project_context, current_user.id)
+
+    job = await get_agent_job_queue().enqueue(
+        db,
+        project_id=project_id,
+        user_id=current_user.id,
+        phase=request.phase,
+        task={
+            "kind": JOB_KIND_AGENT,
+            "user_message": request.user_message,
+            "project_context": request.project_context,
+            "conversation_history": request.conversation_history,
+        },
+    )
+
+    return {"job_id": job.id, "status": job.status}
+
+
+@router.post("/pipeline", status_code=202)
+async def submit_pipeline_job(
+    request: PipelineExecuteRequest,
+    current_user: UserPrincipal = Depends(get_current_approved_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    複数Phaseのパイプライン実行をジョブとして登録
+
+    依存関係のないPhase（Phase 2 の後の Phase 5-14 など）は並列に実行される。
+    各Phaseの進捗は /api/v1/jobs/{job_id}/events で受信できる。
+    """
+    phases = request.phases or list(DEFAULT_PIPELINE_PHASES)
+    try:
+        OrchestratorAgent.resolve_dependencies(phases)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    project_id = await _get_owned_project_id(db, request.project_context, current_user.id)
+
+    job = await get_agent_job_queue().enqueue(
+        db,
+        project_id=project_id,
+        user_id=current_user.id,
+        phase=PIPELINE_JOB_PHASE,
+        task={
+            "kind": JOB_KIND_PIPELINE,
+            "phases": phases,
+            "max_concurrency": request.max_concurrency,
+            "user_message": request.user_message,
+            "project_context": request.project_context,
+            "conversation_history": request.conversation_history,
+        },
+    )
+
+    return {"job_id": job.id, "status": job.status}
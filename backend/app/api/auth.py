@@ -1,9 +1,10 @@
 from fastapi import APIRouter, Depends, HTTPException, status, Request
 from fastapi.responses import RedirectResponse
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from pydantic import BaseModel, EmailStr
 from app.core.database import get_db
-from app.core.security import verify_password, get_password_hash, create_access_token
+from app.core.security import PasswordHasherBusy, create_access_token, hash_password, verify_and_update_password
 from app.models.models import User, UserStatus, UserRole
 from app.services.oauth_service import get_oauth_client
 from app.services.email_service import send_admin_notification
@@ -31,22 +32,42 @@ class TokenResponse(BaseModel):
     user: dict
 
 
+def _busy_error() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="ただいま混み合っています。しばらくしてから再度お試しください",
+        headers={"Retry-After": "1"},
+    )
+
+
 @router.post("/login", response_model=TokenResponse)
-async def login(request: LoginRequest, db: Session = Depends(get_db)):
+async def login(request: LoginRequest, db: AsyncSession = Depends(get_db)):
     """
     ログイン
     """
-    user = db.query(User).filter(User.email == request.email).first()
+    user = await db.scalar(select(User).where(User.email == request.email))
 
-    if not user or not verify_password(request.password, user.hashed_password):
+    valid, new_hash = False, None
+    # OAuthで作成したユーザーはパスワードを持たない
+    if user and user.hashed_password:
+        try:
+            valid, new_hash = await verify_and_update_password(request.password, user.hashed_password)
+        except PasswordHasherBusy:
+            raise _busy_error()
+
+    if not valid:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="メールアドレスまたはパスワードが間違っています",
         )
 
+    if new_hash:
+        # コスト係数が変わっていたら新しいハッシュに置き換える
+        user.hashed_password = new_hash
+
     # 最終ログイン日時を更新
     user.last_login_at = datetime.utcnow()
-    db.commit()
+    await db.commit()
 
     # トークンを生成
     access_token = create_access_token(data={"sub": user.id})
@@ -66,12 +87,12 @@ async def login(request: LoginRequest, db: Session = Depends(get_db)):
 
 
 @router.post("/register")
-async def register(request: ApplyRequest, db: Session = Depends(get_db)):
+async def register(request: ApplyRequest, db: AsyncSession = Depends(get_db)):
     """
     新規ユーザー申請
     """
     # メールアドレスの重複チェック
-    existing_user = db.query(User).filter(User.email == request.email).first()
+    existing_user = await db.scalar(select(User).where(User.email == request.email))
     if existing_user:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -93,7 +114,10 @@ async def register(request: ApplyRequest, db: Session = Depends(get_db)):
         )
 
     # ユーザーを作成（ステータスはpending）
-    hashed_password = get_password_hash(request.password)
+    try:
+        hashed_password = await hash_password(request.password)
+    except PasswordHasherBusy:
+        raise _busy_error()
     new_user = User(
         email=request.email,
         name=request.name,
@@ -103,8 +127,8 @@ async def register(request: ApplyRequest, db: Session = Depends(get_db)):
     )
 
     db.add(new_user)
-    db.commit()
-    db.refresh(new_user)
+    await db.commit()
+    await db.refresh(new_user)
 
     # 管理者にメール通知を送る
     await send_admin_notification(new_user.name, new_user.email, request.purpose)
@@ -126,7 +150,7 @@ async def google_oauth_login(request: Request):
 
 
 @router.get("/oauth/google/callback")
-async def google_oauth_callback(request: Request, db: Session = Depends(get_db)):
+async def google_oauth_callback(request: Request, db: AsyncSession = Depends(get_db)):
     """
     Google OAuth認証コールバック
     """
@@ -146,7 +170,7 @@ async def google_oauth_callback(request: Request, db: Session = Depends(get_db))
         google_id = user_info.get('sub')
 
         # ユーザーを検索または作成
-        user = db.query(User).filter(User.email == email).first()
+        user = await db.scalar(select(User).where(User.email == email))
 
         if not user:
             # 新規ユーザーとして作成（OAuth経由は自動承認）
@@ -167,8 +191,8 @@ async def google_oauth_callback(request: Request, db: Session = Depends(get_db))
 
         # 最終ログイン日時を更新
         user.last_login_at = datetime.utcnow()
-        db.commit()
-        db.refresh(user)
+        await db.commit()
+        await db.refresh(user)
 
         # トークンを生成
         access_token = create_access_token(data={"sub": user.id})
@@ -196,7 +220,7 @@ async def github_oauth_login(request: Request):
 
 
 @router.get("/oauth/github/callback")
-async def github_oauth_callback(request: Request, db: Session = Depends(get_db)):
+async def github_oauth_callback(request: Request, db: AsyncSession = Depends(get_db)):
     """
     GitHub OAuth認証コールバック
     """
@@ -231,7 +255,7 @@ async def github_oauth_callback(request: Request, db: Session = Depends(get_db))
         github_id = str(user_info.get('id'))
 
         # ユーザーを検索または作成
-        user = db.query(User).filter(User.email == email).first()
+        user = await db.scalar(select(User).where(User.email == email))
 
         if not user:
             # 新規ユーザーとして作成（OAuth経由は自動承認）
@@ -252,8 +276,8 @@ async def github_oauth_callback(request: Request, db: Session = Depends(get_db))
 
         # 最終ログイン日時を更新
         user.last_login_at = datetime.utcnow()
-        db.commit()
-        db.refresh(user)
+        await db.commit()
+        await db.refresh(user)
 
         # トークンを生成
         access_token = create_access_token(data={"sub": user.id})
@@ -0,0 +1,130 @@
+from fastapi import APIRouter, Depends, Header, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Optional
+from app.core.database import get_db
+from app.core.deps import get_current_approved_user, UserPrincipal
+from app.models.models import PhaseExecution
+from app.services.agent_job_service import JOB_COMPLETED, get_agent_job_queue
+from app.utils.sse import SSEEmitter
+
+router = APIRouter()
+
+
+def job_event_stream(job_id: str, offset: int = 0, attempt: Optional[int] = None):
+    """
+    ジョブの出力をSSEで配信するストリーム
+
+    トークンフレームには送信済みの文字数を id として付けるため、
+    切断後は Last-Event-ID（または ?offset=&attempt=）で続きから受信できる。
+    シャットダウン等でジョブが最初から再実行された場合は reset イベントを送り、
+    受信済みの出力を破棄させて0文字目から送り直す。
+    attempt が分からない再接続（Last-Event-ID のみ）では、受信済みの文字数と
+    出力の長さを比べて再実行を判定する。
+    """
+    async def event_stream():
+        """Server-Sent Eventsストリーム"""
+        emitter = SSEEmitter(offset=offset)
+        finished = {}
+        queue = get_agent_job_queue()
+
+        async def deltas():
+            async for event in queue.subscribe(job_id, offset, current):
+                if event["type"] == "finished":
+                    finished.update(event)
+                elif event["type"] == "reset":
+                    yield {"type": "reset", "jobId": job_id, "attempt": event["attempt"]}
+                else:
+                    yield event["content"]
+
+        try:
+            current = attempt
+            if current is None and offset == 0:
+                # まだ何も受信していなければ、今の実行回から受信する
+                current = await queue.current_attempt(job_id)
+
+            # 開始イベント（offset がどの実行回のものか）
+            yield emitter.event("start", jobId=job_id, attempt=current)
+
+            async for frame in emitter.frames(deltas()):
+                yield frame
+
+            if finished.get("status") == JOB_COMPLETED:
+                # 完了イベント
+                result = finished.get("result") or {}
+                yield emitter.event("end", jobId=job_id, messageId=result.get("message_id"))
+            else:
+                yield emitter.event("error", jobId=job_id, message=finished.get("error") or "エラーが発生しました")
+
+        except Exception as e:
+            # エラーイベント
+            error_msg = f"エラーが発生しました: {str(e)}"
+            yield emitter.event("error", jobId=job_id, message=error_msg)
+
+    return event_stream()
+
+
+async def _get_owned_job(db: AsyncSession, job_id: str, user_id: str) -> PhaseExecution:
+    job = await db.scalar(
+        select(PhaseExecution).where(
+            PhaseExecution.id == job_id,
+            PhaseExecution.user_id == user_id,
+        )
+    )
+    if not job:
+        raise HTTPException(status_code=404, detail="ジョブが見つかりません")
+    return job
+
+
+@router.get("")
+async def get_jobs(
+    limit: int = Query(20, ge=1, le=100),
+    current_user: UserPrincipal = Depends(get_current_approved_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    自分のジョブ一覧を取得（新しい順）
+    """
+    jobs = (await db.scalars(
+        select(PhaseExecution)
+        .where(PhaseExecution.user_id == current_user.id)
+        .order_by(PhaseExecution.created_at.desc())
+        .limit(limit)
+    )).all()
+
+    queue = get_agent_job_queue()
+    return [await queue.get_status(db, job) for job in jobs]
+
+
+@router.get("/{job_id}")
+async def get_job(
+    job_id: str,
+    current_user: UserPrincipal = Depends(get_current_approved_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    ジョブの状態を取得
+    """
+    job = await _get_owned_job(db, job_id, current_user.id)
+    return await get_agent_job_queue().get_status(db, job)
+
+
+@router.get("/{job_id}/events")
+async def get_job_events(
+    job_id: str,
+    offset: Optional[int] = Query(None, ge=0),
+    attempt: Optional[int] = Query(None, ge=1),
+    last_event_id: Optional[str] = Header(None),
+    current_user: UserPrincipal = Depends(get_current_approved_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    ジョブの出力をSSEストリーミングで取得（attempt 回目の実行の offset 文字目から。省略時は Last-Event-ID）
+    """
+    await _get_owned_job(db, job_id, current_user.id)
+
+    if offset is None:
+        offset = int(last_event_id) if last_event_id and last_event_id.isdigit() else 0
+
+    return StreamingResponse(job_event_stream(job_id, offset, attempt), media_type="text/event-stream")
@@ -1,14 +1,16 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
 from fastapi.responses import StreamingResponse
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from pydantic import BaseModel
-from typing import List
-import json
-from datetime import datetime
+from typing import List, Optional
+from app.core.config import settings
 from app.core.database import get_db
-from app.core.deps import get_current_approved_user
-from app.models.models import User, Project, ProjectStatus, Message, ProjectFile
-from app.services.claude_service import get_claude_service
+from app.core.deps import get_current_approved_user, UserPrincipal
+from app.models.models import Project, ProjectStatus, Message, ProjectFile
+from app.services import message_service, project_file_service
+from app.services.agent_job_service import JOB_KIND_MESSAGE, get_agent_job_queue, message_dedupe_key
+from app.api.jobs import job_event_stream
 
 router = APIRouter()
 
@@ -34,13 +36,13 @@ class SendMessageRequest(BaseModel):
 
 @router.get("", response_model=List[ProjectResponse])
 async def get_projects(
-    current_user: User = Depends(get_current_approved_user),
-    db: Session = Depends(get_db)
+    current_user: UserPrincipal = Depends(get_current_approved_user),
+    db: AsyncSession = Depends(get_db)
 ):
     """
     プロジェクト一覧を取得
     """
-    projects = db.query(Project).filter(Project.owner_id == current_user.id).all()
+    projects = (await db.scalars(select(Project).where(Project.owner_id == current_user.id))).all()
 
     return [
         {
@@ -58,8 +60,8 @@ async def get_projects(
 @router.post("", response_model=ProjectResponse)
 async def create_project(
     request: CreateProjectRequest,
-    current_user: User = Depends(get_current_approved_user),
-    db: Session = Depends(get_db)
+    current_user: UserPrincipal = Depends(get_current_approved_user),
+    db: AsyncSession = Depends(get_db)
 ):
     """
     新規プロジェクトを作成
@@ -73,8 +75,8 @@ async def create_project(
     )
 
     db.add(new_project)
-    db.commit()
-    db.refresh(new_project)
+    await db.commit()
+    await db.refresh(new_project)
 
     return {
         "id": new_project.id,
@@ -89,22 +91,28 @@ async def create_project(
 @router.get("/{project_id}")
 async def get_project(
     project_id: str,
-    current_user: User = Depends(get_current_approved_user),
-    db: Session = Depends(get_db)
+    current_user: UserPrincipal = Depends(get_current_approved_user),
+    db: AsyncSession = Depends(get_db)
 ):
     """
     プロジェクト詳細を取得
     """
-    project = db.query(Project).filter(
-        Project.id == project_id,
-        Project.owner_id == current_user.id
-    ).first()
+    project = await db.scalar(
+        select(Project).where(
+            Project.id == project_id,
+            Project.owner_id == current_user.id
+        )
+    )
 
     if not project:
         raise HTTPException(status_code=404, detail="プロジェクトが見つかりません")
 
-    # メッセージ履歴を取得
-    messages = db.query(Message).filter(Message.project_id == project_id).order_by(Message.created_at).all()
+    # Phaseごとの最新ページのみ返す（古い履歴は GET /{project_id}/messages で取得）
+    pages = await message_service.latest_messages_by_phase(db, project_id, settings.MESSAGES_PAGE_SIZE)
+    messages = sorted(
+        (m for page, _ in pages.values() for m in page),
+        key=lambda m: (m.created_at, m.id),
+    )
 
     return {
         "id": project.id,
@@ -113,16 +121,70 @@ async def get_project(
         "status": project.status.value,
         "current_phase": project.current_phase,
         "created_at": project.created_at.isoformat(),
-        "messages": [
-            {
-                "id": m.id,
-                "role": m.role,
-                "content": m.content,
-                "phase": m.phase,
-                "created_at": m.created_at.isoformat(),
+        "messages": [_serialize_message(m) for m in messages],
+        "message_pages": {
+            str(phase): {
+                "has_more": has_more,
+                "before": message_service.message_cursor(page[0]),
             }
-            for m in messages
-        ],
+            for phase, (page, has_more) in pages.items()
+        },
+        "latest_cursor": message_service.message_cursor(messages[-1]) if messages else None,
+    }
+
+
+@router.get("/{project_id}/messages")
+async def get_messages(
+    project_id: str,
+    phase: Optional[int] = None,
+    limit: Optional[int] = Query(None, ge=1),
+    before: Optional[str] = None,
+    since: Optional[str] = None,
+    current_user: UserPrincipal = Depends(get_current_approved_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    メッセージ履歴をページ単位で取得
+
+    - before: このカーソルより古いページ（さかのぼり表示用）
+    - since: このカーソルより新しいメッセージ（差分更新用）
+    """
+    if before and since:
+        raise HTTPException(status_code=400, detail="before と since は同時に指定できません")
+
+    project_exists = await db.scalar(
+        select(Project.id).where(
+            Project.id == project_id,
+            Project.owner_id == current_user.id
+        )
+    )
+
+    if not project_exists:
+        raise HTTPException(status_code=404, detail="プロジェクトが見つかりません")
+
+    limit = min(limit or settings.MESSAGES_PAGE_SIZE, settings.MESSAGES_MAX_PAGE_SIZE)
+    try:
+        messages, has_more = await message_service.list_messages(
+            db, project_id, limit, phase=phase, before=before, since=since
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    return {
+        "messages": [_serialize_message(m) for m in messages],
+        "has_more": has_more,
+        "before": message_service.message_cursor(messages[0]) if messages else before,
+        "latest_cursor": message_service.message_cursor(messages[-1]) if messages else since,
+    }
+
+
+def _serialize_message(message: Message) -> dict:
+    return {
+        "id": message.id,
+        "role": message.role,
+        "content": message.content,
+        "phase": message.phase,
+        "created_at": message.created_at.isoformat(),
     }
 
 
@@ -130,20 +192,32 @@ async def get_project(
 async def send_message(
     project_id: str,
     request: SendMessageRequest,
-    current_user: User = Depends(get_current_approved_user),
-    db: Session = Depends(get_db)
+    current_user: UserPrincipal = Depends(get_current_approved_user),
+    db: AsyncSession = Depends(get_db)
 ):
     """
     プロジェクトにメッセージを送信し、AIからの応答をSSEストリーミングで取得
     """
-    project = db.query(Project).filter(
-        Project.id == project_id,
-        Project.owner_id == current_user.id
-    ).first()
+    project = await db.scalar(
+        select(Project).where(
+            Project.id == project_id,
+            Project.owner_id == current_user.id
+        )
+    )
 
     if not project:
         raise HTTPException(status_code=404, detail="プロジェクトが見つかりません")
 
+    queue = get_agent_job_queue()
+    dedupe_key = None
+    if settings.AGENT_JOB_COALESCE_MESSAGES:
+        # ダブルクリック・再送で同じメッセージが届いた場合は、実行中のジョブの出力を最初から配信する
+        # （メッセージの保存・エージェントの実行・Claude APIの呼び出しは1回だけ）
+        dedupe_key = message_dedupe_key(current_user.id, project_id, request.phase, request.content)
+        job = await queue.find_in_flight(db, dedupe_key)
+        if job is not None:
+            return StreamingResponse(job_event_stream(job.id), media_type="text/event-stream")
+
     # ユーザーのメッセージを保存
     user_message = Message(
         project_id=project_id,
@@ -152,210 +226,49 @@ async def send_message(
         content=request.content,
     )
     db.add(user_message)
-    db.commit()
-    db.refresh(user_message)
-
-    # メッセージ履歴を取得（Claude APIに送信）
-    messages = db.query(Message).filter(
-        Message.project_id == project_id,
-        Message.phase == request.phase
-    ).order_by(Message.created_at).all()
-
-    # Claude API形式に変換
-    claude_messages = [
-        {"role": msg.role, "content": msg.content}
-        for msg in messages
-        if msg.role in ["user", "assistant"]
-    ]
+    await db.flush()
 
-    # プロジェクト情報を事前に取得（DBセッションが閉じる前に）
-    project_name = project.name
-    project_description = project.description
-
-    # SSEストリーミング
-    async def event_stream():
-        """Server-Sent Eventsストリーム"""
-        # 新しいDBセッションを作成
-        from app.core.database import SessionLocal
-        new_db = SessionLocal()
-
-        try:
-            # 開始イベント
-            yield f"data: {json.dumps({'type': 'start'})}\n\n"
-
-            # Phase Agentsのモックロジックを使用（Claude API課金を避けるため）
-            from app.agents.phase_agents import (
-                Phase1RequirementsAgent,
-                Phase2CodeGenerationAgent,
-                Phase3DeploymentAgent,
-                Phase4SelfImprovementAgent
-            )
-            from app.agents.extended_phase_agents import (
-                Phase5TestGenerationAgent,
-                Phase6DocumentationAgent,
-                Phase7DebugAgent,
-                Phase8PerformanceAgent,
-                Phase9SecurityAgent,
-                Phase10DatabaseAgent,
-                Phase11APIDesignAgent,
-                Phase12UXAgent,
-                Phase13RefactoringAgent,
-                Phase14MonitoringAgent
-            )
-
-            # Phaseに応じてエージェントを選択
-            agent_map = {
-                1: Phase1RequirementsAgent(),
-                2: Phase2CodeGenerationAgent(),
-                3: Phase3DeploymentAgent(),
-                4: Phase4SelfImprovementAgent(),
-                5: Phase5TestGenerationAgent(),
-                6: Phase6DocumentationAgent(),
-                7: Phase7DebugAgent(),
-                8: Phase8PerformanceAgent(),
-                9: Phase9SecurityAgent(),
-                10: Phase10DatabaseAgent(),
-                11: Phase11APIDesignAgent(),
-                12: Phase12UXAgent(),
-                13: Phase13RefactoringAgent(),
-                14: Phase14MonitoringAgent(),
-            }
+    # エージェントの実行はジョブとして登録し、ワーカーの出力をSSEで中継する
+    # （接続が切れても実行は続き、/api/v1/jobs/{job_id}/events で続きから受信できる）
+    # 同時に同じメッセージが登録された場合は、このメッセージを破棄して先のジョブに相乗りする
+    job = await queue.enqueue(
+        db,
+        project_id=project_id,
+        user_id=current_user.id,
+        phase=request.phase,
+        task={
+            "kind": JOB_KIND_MESSAGE,
+            "message_id": user_message.id,
+            "project_name": project.name,
+        },
+        dedupe_key=dedupe_key,
+    )
 
-            agent = agent_map.get(request.phase, Phase1RequirementsAgent())
-
-            # エージェントを実行
-            result = await agent.execute({
-                "user_message": request.content,
-                "project_context": {
-                    "project_id": project_id,
-                    "project_name": project_name,
-                },
-            })
-
-            full_response = result.get("response", "応答がありませんでした。")
-
-            # 応答を文字単位でストリーミング（リアルタイム感を出すため）
-            import asyncio
-            for char in full_response:
-                yield f"data: {json.dumps({'type': 'token', 'content': char})}\n\n"
-                await asyncio.sleep(0.01)  # 少し遅延を入れてリアルタイム感を出す
-
-            # AIの応答をDBに保存
-            assistant_message = Message(
-                project_id=project_id,
-                phase=request.phase,
-                role="assistant",
-                content=full_response,
-            )
-            new_db.add(assistant_message)
-            new_db.commit()
-            new_db.refresh(assistant_message)
-
-            # Phase 2の場合、生成されたコードをProjectFileテーブルに自動保存
-            if request.phase == 2 and "generated_code" in result:
-                generated_code = result.get("generated_code", {})
-
-                # フロントエンドコードを保存
-                for file_path, content in generated_code.get("frontend", {}).items():
-                    # 言語を推定
-                    language = None
-                    if file_path.endswith('.tsx') or file_path.endswith('.ts'):
-                        language = 'typescript'
-                    elif file_path.endswith('.jsx') or file_path.endswith('.js'):
-                        language = 'javascript'
-                    elif file_path.endswith('.css'):
-                        language = 'css'
-                    elif file_path.endswith('.json'):
-                        language = 'json'
-                    elif file_path.endswith('.html'):
-                        language = 'html'
-
-                    # 既存ファイルを検索
-                    existing_file = new_db.query(ProjectFile).filter(
-                        ProjectFile.project_id == project_id,
-                        ProjectFile.file_path == f"frontend/{file_path}"
-                    ).first()
-
-                    if existing_file:
-                        # 更新
-                        existing_file.content = content
-                        existing_file.language = language
-                        existing_file.updated_at = datetime.utcnow()
-                    else:
-                        # 新規作成
-                        new_file = ProjectFile(
-                            project_id=project_id,
-                            file_path=f"frontend/{file_path}",
-                            content=content,
-                            language=language,
-                        )
-                        new_db.add(new_file)
-
-                # バックエンドコードを保存
-                for file_path, content in generated_code.get("backend", {}).items():
-                    # 言語を推定
-                    language = None
-                    if file_path.endswith('.py'):
-                        language = 'python'
-                    elif file_path.endswith('.txt'):
-                        language = 'plaintext'
-
-                    # 既存ファイルを検索
-                    existing_file = new_db.query(ProjectFile).filter(
-                        ProjectFile.project_id == project_id,
-                        ProjectFile.file_path == f"backend/{file_path}"
-                    ).first()
-
-                    if existing_file:
-                        # 更新
-                        existing_file.content = content
-                        existing_file.language = language
-                        existing_file.updated_at = datetime.utcnow()
-                    else:
-                        # 新規作成
-                        new_file = ProjectFile(
-                            project_id=project_id,
-                            file_path=f"backend/{file_path}",
-                            content=content,
-                            language=language,
-                        )
-                        new_db.add(new_file)
-
-                new_db.commit()
-
-            # 完了イベント
-            yield f"data: {json.dumps({'type': 'end', 'messageId': assistant_message.id})}\n\n"
-
-        except Exception as e:
-            # エラーイベント
-            error_msg = f"エラーが発生しました: {str(e)}"
-            yield f"data: {json.dumps({'type': 'error', 'message': error_msg})}\n\n"
-        finally:
-            # DBセッションを確実にクローズ
-            new_db.close()
-
-    return StreamingResponse(event_stream(), media_type="text/event-stream")
+    return StreamingResponse(job_event_stream(job.id), media_type="text/event-stream")
 
 
 @router.delete("/{project_id}")
 async def delete_project(
     project_id: str,
-    current_user: User = Depends(get_current_approved_user),
-    db: Session = Depends(get_db)
+    current_user: UserPrincipal = Depends(get_current_approved_user),
+    db: AsyncSession = Depends(get_db)
 ):
     """
     プロジェクトを削除
     """
-    project = db.query(Project).filter(
-        Project.id == project_id,
-        Project.owner_id == current_user.id
-    ).first()
+    project = await db.scalar(
+        select(Project).where(
+            Project.id == project_id,
+            Project.owner_id == current_user.id
+        )
+    )
 
     if not project:
         raise HTTPException(status_code=404, detail="プロジェクトが見つかりません")
 
-    db.delete(project)
-    db.commit()
+    await project_file_service.delete_project_files(db, project_id)
+    await db.delete(project)
+    await db.commit()
 
     return {"message": "プロジェクトを削除しました"}
 
@@ -373,93 +286,76 @@ class SaveFileRequest(BaseModel):
 async def save_file(
     project_id: str,
     request: SaveFileRequest,
-    current_user: User = Depends(get_current_approved_user),
-    db: Session = Depends(get_db)
+    current_user: UserPrincipal = Depends(get_current_approved_user),
+    db: AsyncSession = Depends(get_db)
 ):
     """
     プロジェクトのファイルを保存（新規作成または更新）
     """
     # プロジェクトの所有権確認
-    project = db.query(Project).filter(
-        Project.id == project_id,
-        Project.owner_id == current_user.id
-    ).first()
+    project = await db.scalar(
+        select(Project).where(
+            Project.id == project_id,
+            Project.owner_id == current_user.id
+        )
+    )
 
     if not project:
         raise HTTPException(status_code=404, detail="プロジェクトが見つかりません")
 
-    # 既存ファイルを検索
-    existing_file = db.query(ProjectFile).filter(
-        ProjectFile.project_id == project_id,
-        ProjectFile.file_path == request.file_path
-    ).first()
-
-    if existing_file:
-        # 更新
-        existing_file.content = request.content
-        if request.language:
-            existing_file.language = request.language
-        existing_file.updated_at = datetime.utcnow()
-        db.commit()
-        db.refresh(existing_file)
+    # 内容のハッシュが同じならblobには書き込まない
+    file, created = await project_file_service.save_file(
+        db, project_id, request.file_path, request.content, request.language
+    )
+    await db.commit()
+    await db.refresh(file)
 
+    if created:
         return {
-            "message": "ファイルを更新しました",
+            "message": "ファイルを作成しました",
             "file": {
-                "id": existing_file.id,
-                "file_path": existing_file.file_path,
-                "language": existing_file.language,
-                "updated_at": existing_file.updated_at.isoformat(),
+                "id": file.id,
+                "file_path": file.file_path,
+                "language": file.language,
+                "created_at": file.created_at.isoformat(),
             }
         }
-    else:
-        # 新規作成
-        new_file = ProjectFile(
-            project_id=project_id,
-            file_path=request.file_path,
-            content=request.content,
-            language=request.language,
-        )
-        db.add(new_file)
-        db.commit()
-        db.refresh(new_file)
 
-        return {
-            "message": "ファイルを作成しました",
-            "file": {
-                "id": new_file.id,
-                "file_path": new_file.file_path,
-                "language": new_file.language,
-                "created_at": new_file.created_at.isoformat(),
-            }
+    return {
+        "message": "ファイルを更新しました",
+        "file": {
+            "id": file.id,
+            "file_path": file.file_path,
+            "language": file.language,
+            "updated_at": file.updated_at.isoformat(),
         }
+    }
 
 
 @router.get("/{project_id}/files")
 async def get_files(
     project_id: str,
     file_path: str = None,
-    current_user: User = Depends(get_current_approved_user),
-    db: Session = Depends(get_db)
+    current_user: UserPrincipal = Depends(get_current_approved_user),
+    db: AsyncSession = Depends(get_db)
 ):
     """
     プロジェクトのファイル一覧を取得、またはfile_pathが指定された場合は特定のファイルを取得
     """
     # プロジェクトの所有権確認
-    project = db.query(Project).filter(
-        Project.id == project_id,
-        Project.owner_id == current_user.id
-    ).first()
+    project = await db.scalar(
+        select(Project).where(
+            Project.id == project_id,
+            Project.owner_id == current_user.id
+        )
+    )
 
     if not project:
         raise HTTPException(status_code=404, detail="プロジェクトが見つかりません")
 
     # 特定のファイルを取得
     if file_path:
-        file = db.query(ProjectFile).filter(
-            ProjectFile.project_id == project_id,
-            ProjectFile.file_path == file_path
-        ).first()
+        file = await project_file_service.get_project_file(db, project_id, file_path)
 
         if not file:
             raise HTTPException(status_code=404, detail="ファイルが見つかりません")
@@ -467,14 +363,14 @@ async def get_files(
         return {
             "id": file.id,
             "file_path": file.file_path,
-            "content": file.content,
+            "content": project_file_service.read_content(file),
             "language": file.language,
             "created_at": file.created_at.isoformat(),
             "updated_at": file.updated_at.isoformat(),
         }
 
     # ファイル一覧を取得
-    files = db.query(ProjectFile).filter(ProjectFile.project_id == project_id).all()
+    files = (await db.scalars(select(ProjectFile).where(ProjectFile.project_id == project_id))).all()
 
     return {
         "files": [
@@ -494,26 +390,25 @@ async def get_files(
 async def get_file_by_path(
     project_id: str,
     file_path: str,
-    current_user: User = Depends(get_current_approved_user),
-    db: Session = Depends(get_db)
+    current_user: UserPrincipal = Depends(get_current_approved_user),
+    db: AsyncSession = Depends(get_db)
 ):
     """
     特定のファイル内容を取得（パスパラメータ版）
     """
     # プロジェクトの所有権確認
-    project = db.query(Project).filter(
-        Project.id == project_id,
-        Project.owner_id == current_user.id
-    ).first()
+    project = await db.scalar(
+        select(Project).where(
+            Project.id == project_id,
+            Project.owner_id == current_user.id
+        )
+    )
 
     if not project:
         raise HTTPException(status_code=404, detail="プロジェクトが見つかりません")
 
     # ファイルを取得
-    file = db.query(ProjectFile).filter(
-        ProjectFile.project_id == project_id,
-        ProjectFile.file_path == file_path
-    ).first()
+    file = await project_file_service.get_project_file(db, project_id, file_path)
 
     if not file:
         raise HTTPException(status_code=404, detail="ファイルが見つかりません")
@@ -521,7 +416,7 @@ async def get_file_by_path(
     return {
         "id": file.id,
         "file_path": file.file_path,
-        "content": file.content,
+        "content": project_file_service.read_content(file),
         "language": file.language,
         "created_at": file.created_at.isoformat(),
         "updated_at": file.updated_at.isoformat(),
@@ -532,31 +427,35 @@ async def get_file_by_path(
 async def delete_file(
     project_id: str,
     file_path: str,
-    current_user: User = Depends(get_current_approved_user),
-    db: Session = Depends(get_db)
+    current_user: UserPrincipal = Depends(get_current_approved_user),
+    db: AsyncSession = Depends(get_db)
 ):
     """
     ファイルを削除
     """
     # プロジェクトの所有権確認
-    project = db.query(Project).filter(
-        Project.id == project_id,
-        Project.owner_id == current_user.id
-    ).first()
+    project = await db.scalar(
+        select(Project).where(
+            Project.id == project_id,
+            Project.owner_id == current_user.id
+        )
+    )
 
     if not project:
         raise HTTPException(status_code=404, detail="プロジェクトが見つかりません")
 
     # ファイルを取得
-    file = db.query(ProjectFile).filter(
-        ProjectFile.project_id == project_id,
-        ProjectFile.file_path == file_path
-    ).first()
+    file = await db.scalar(
+        select(ProjectFile).where(
+            ProjectFile.project_id == project_id,
+            ProjectFile.file_path == file_path
+        )
+    )
 
     if not file:
         raise HTTPException(status_code=404, detail="ファイルが見つかりません")
 
-    db.delete(file)
-    db.commit()
+    await project_file_service.delete_file(db, file)
+    await db.commit()
 
     return {"message": "ファイルを削除しました", "file_path": file_path}
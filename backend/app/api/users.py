@@ -1,9 +1,12 @@
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from pydantic import BaseModel
+from datetime import datetime, timezone
+from typing import Optional
 from app.core.database import get_db
-from app.core.deps import get_current_user
+from app.core.deps import get_current_user, get_current_user_model, invalidate_user_principal, UserPrincipal
 from app.models.models import User
+from app.services import usage_query_service
 from app.utils.encryption import encrypt_api_key
 
 router = APIRouter()
@@ -12,10 +15,11 @@ router = APIRouter()
 class UpdateUserRequest(BaseModel):
     name: str | None = None
     custom_claude_api_key: str | None = None
+    response_cache_enabled: bool | None = None
 
 
 @router.get("/me")
-async def get_me(current_user: User = Depends(get_current_user)):
+async def get_me(current_user: User = Depends(get_current_user_model)):
     """
     現在のユーザー情報を取得
     """
@@ -26,6 +30,7 @@ async def get_me(current_user: User = Depends(get_current_user)):
             "name": current_user.name,
             "role": current_user.role.value,
             "status": current_user.status.value,
+            "responseCacheEnabled": current_user.response_cache_enabled,
             "avatar": None,  # TODO: アバター機能実装時に対応
             "createdAt": current_user.created_at.isoformat(),
             "updatedAt": current_user.updated_at.isoformat() if current_user.updated_at else None,
@@ -36,8 +41,8 @@ async def get_me(current_user: User = Depends(get_current_user)):
 @router.put("/me")
 async def update_me(
     request: UpdateUserRequest,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: User = Depends(get_current_user_model),
+    db: AsyncSession = Depends(get_db)
 ):
     """
     ユーザー情報を更新
@@ -49,8 +54,12 @@ async def update_me(
         # APIキーを暗号化して保存
         current_user.custom_claude_api_key = encrypt_api_key(request.custom_claude_api_key)
 
-    db.commit()
-    db.refresh(current_user)
+    if request.response_cache_enabled is not None:
+        current_user.response_cache_enabled = request.response_cache_enabled
+
+    await db.commit()
+    invalidate_user_principal(current_user.id)
+    await db.refresh(current_user)
 
     return {
         "data": {
@@ -59,6 +68,7 @@ async def update_me(
             "name": current_user.name,
             "role": current_user.role.value,
             "status": current_user.status.value,
+            "responseCacheEnabled": current_user.response_cache_enabled,
             "createdAt": current_user.created_at.isoformat(),
             "updatedAt": current_user.updated_at.isoformat() if current_user.updated_at else None,
         },
@@ -68,53 +78,27 @@ async def update_me(
 
 @router.get("/me/api-usage")
 async def get_api_usage(
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    current_user: UserPrincipal = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
 ):
     """
     ユーザーのAPI使用量を取得
+
+    今日・今月に加えて、since（とuntil）を指定するとその期間の使用量も返す（UTC）
     """
-    from app.models.models import ApiLog
-    from sqlalchemy import func
-    from datetime import datetime, timedelta
-
-    # 今日のAPI使用量
-    today = datetime.utcnow().date()
-    today_usage = db.query(
-        func.sum(ApiLog.input_tokens).label("input_tokens"),
-        func.sum(ApiLog.output_tokens).label("output_tokens"),
-        func.sum(ApiLog.cost).label("cost"),
-        func.count(ApiLog.id).label("requests")
-    ).filter(
-        ApiLog.user_id == current_user.id,
-        func.date(ApiLog.created_at) == today
-    ).first()
-
-    # 今月のAPI使用量
-    this_month_start = datetime.utcnow().replace(day=1, hour=0, minute=0, second=0, microsecond=0)
-    month_usage = db.query(
-        func.sum(ApiLog.input_tokens).label("input_tokens"),
-        func.sum(ApiLog.output_tokens).label("output_tokens"),
-        func.sum(ApiLog.cost).label("cost"),
-        func.count(ApiLog.id).label("requests")
-    ).filter(
-        ApiLog.user_id == current_user.id,
-        ApiLog.created_at >= this_month_start
-    ).first()
+    if until is not None and since is None:
+        raise HTTPException(status_code=400, detail="until を指定する場合は since も指定してください")
 
-    return {
-        "data": {
-            "today": {
-                "inputTokens": today_usage.input_tokens or 0,
-                "outputTokens": today_usage.output_tokens or 0,
-                "cost": today_usage.cost or 0,
-                "requests": today_usage.requests or 0,
-            },
-            "thisMonth": {
-                "inputTokens": month_usage.input_tokens or 0,
-                "outputTokens": month_usage.output_tokens or 0,
-                "cost": month_usage.cost or 0,
-                "requests": month_usage.requests or 0,
-            }
-        }
-    }
+    usage = await usage_query_service.get_user_usage(
+        db, current_user.id, since=_as_naive_utc(since), until=_as_naive_utc(until)
+    )
+    return {"data": usage}
+
+
+def _as_naive_utc(moment: Optional[datetime]) -> Optional[datetime]:
+    """タイムゾーン付きの日時をUTCのnaive datetimeに揃える（api_logs.created_at と比較するため）"""
+    if moment is None or moment.tzinfo is None:
+        return moment
+    return moment.astimezone(timezone.utc).replace(tzinfo=None)
@@ -1,23 +1,94 @@
 from sqlalchemy import create_engine
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from app.core.config import settings
 
+# 同期エンジン（Alembic・管理スクリプト用）
 engine = create_engine(settings.DATABASE_URL, echo=settings.DEBUG)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 Base = declarative_base()
 
 
-def get_db():
+def _async_database_url(url: str):
     """
-    データベースセッションを取得する依存関係
+    DATABASE_URL を asyncpg 用のURLに変換
+    （psycopg2 形式の sslmode は asyncpg の ssl に読み替える）
     """
-    db = SessionLocal()
-    try:
+    parsed = make_url(url)
+    if parsed.drivername == "sqlite":
+        # ローカル検証用
+        return parsed.set(drivername="sqlite+aiosqlite")
+    if not parsed.drivername.startswith("postgresql"):
+        return parsed
+
+    query = dict(parsed.query)
+    sslmode = query.pop("sslmode", None)
+    query.pop("channel_binding", None)
+    if sslmode and "ssl" not in query:
+        query["ssl"] = sslmode
+
+    return parsed.set(drivername="postgresql+asyncpg", query=query)
+
+
+def _create_async_engine():
+    """
+    APIリクエスト用の非同期エンジンを作成（asyncpg）
+    """
+    url = _async_database_url(settings.DATABASE_URL)
+    if url.drivername.startswith("sqlite"):
+        # ローカル検証用（SQLiteはプール設定を受け付けない）
+        return create_async_engine(url, echo=settings.DEBUG)
+
+    return create_async_engine(
+        url,
+        echo=settings.DEBUG,
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+        pool_timeout=settings.DB_POOL_TIMEOUT_SECONDS,
+        pool_recycle=settings.DB_POOL_RECYCLE_SECONDS,
+        pool_pre_ping=settings.DB_POOL_PRE_PING,
+        connect_args={
+            # asyncpg側のプリペアドステートメントキャッシュ（PgBouncer経由の場合は0にする）
+            "statement_cache_size": settings.DB_STATEMENT_CACHE_SIZE,
+        },
+    )
+
+
+async_engine = _create_async_engine()
+AsyncSessionLocal = async_sessionmaker(
+    bind=async_engine,
+    class_=AsyncSession,
+    autoflush=False,
+    expire_on_commit=False,  # commit後に属性アクセスで再読み込み（暗黙のI/O）を起こさない
+)
+
+
+async def get_db():
+    """
+    データベースセッションを取得する依存関係（AsyncSession）
+    """
+    async with AsyncSessionLocal() as db:
         yield db
-    finally:
-        db.close()
+
+
+def upsert_insert(db: AsyncSession):
+    """
+    接続先DBに合わせた ON CONFLICT（UPSERT）対応の insert を返す
+    """
+    if db.bind.dialect.name == "sqlite":
+        return sqlite.insert
+    return postgresql.insert
+
+
+async def close_db():
+    """
+    非同期エンジンのコネクションプールを閉じる（lifespanのシャットダウン時）
+    """
+    await async_engine.dispose()
 
 
 def init_db():
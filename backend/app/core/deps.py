@@ -1,20 +1,88 @@
+from dataclasses import dataclass
+from typing import Optional
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.config import settings
 from app.core.database import get_db
 from app.core.security import decode_access_token
-from app.models.models import User, UserRole
+from app.models.models import User, UserRole, UserStatus
+from app.utils.cache import TTLCache
 
 security = HTTPBearer()
 
 
-def get_current_user(
-    credentials: HTTPAuthorizationCredentials = Depends(security),
-    db: Session = Depends(get_db)
-) -> User:
+@dataclass(frozen=True)
+class UserPrincipal:
     """
-    現在のユーザーを取得
+    認証済みユーザーの最小限の情報（認可判定とAPI呼び出しに使う分だけ）
+
+    リクエストごとにusersテーブルを読まないようにインプロセスでキャッシュする。
+    氏名・メールアドレス等が必要なエンドポイントは get_current_user_model を使う。
+    """
+    id: str
+    role: UserRole
+    status: UserStatus
+    custom_claude_api_key: Optional[str] = None  # 暗号化済みのまま保持
+    response_cache_enabled: bool = True
+
+
+# user_id → UserPrincipal
+_principal_cache: TTLCache[UserPrincipal] = TTLCache(
+    max_entries=settings.AUTH_PRINCIPAL_CACHE_MAX_ENTRIES,
+    ttl=settings.AUTH_PRINCIPAL_CACHE_TTL_SECONDS,
+)
+
+# 破棄した回数（読み込み中に破棄された古い内容をキャッシュしないため）
+# ユーザーごとには持たない（破棄はまれなので、どのユーザーの破棄でも読み込み中の内容はキャッシュしない）
+_principal_generation = 0
+
+
+def invalidate_user_principal(user_id: str):
     """
+    キャッシュ済みの認証情報を破棄（ステータス・ロール・APIキー・応答キャッシュ設定を変更したら呼ぶ）
+
+    他のプロセスのキャッシュには届かないため、そちらはTTLで反映される。
+    """
+    global _principal_generation
+    _principal_generation += 1
+    _principal_cache.invalidate(user_id)
+
+
+def get_principal_cache_stats() -> dict:
+    """認証情報キャッシュの件数・ヒット率"""
+    return _principal_cache.stats()
+
+
+async def _load_principal(db: AsyncSession, user_id: str) -> Optional[UserPrincipal]:
+    principal = _principal_cache.get(user_id)
+    if principal is not None:
+        return principal
+
+    generation = _principal_generation
+    row = (await db.execute(
+        select(
+            User.id, User.role, User.status, User.custom_claude_api_key, User.response_cache_enabled
+        ).where(User.id == user_id)
+    )).first()
+    if row is None:
+        return None
+
+    principal = UserPrincipal(
+        id=row.id,
+        role=row.role,
+        status=row.status,
+        custom_claude_api_key=row.custom_claude_api_key,
+        response_cache_enabled=row.response_cache_enabled,
+    )
+    if _principal_generation == generation:
+        # 読み込み中に破棄された場合は、変更前の内容を読んだ可能性があるのでキャッシュしない
+        _principal_cache.set(user_id, principal)
+    return principal
+
+
+def _user_id_from_token(credentials: HTTPAuthorizationCredentials) -> str:
     token = credentials.credentials
     payload = decode_access_token(token)
 
@@ -30,20 +98,48 @@ def get_current_user(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="無効なトークンです",
         )
+    return user_id
 
-    user = db.query(User).filter(User.id == user_id).first()
-    if user is None:
+
+async def get_current_user(
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    db: AsyncSession = Depends(get_db)
+) -> UserPrincipal:
+    """
+    現在のユーザーを取得（キャッシュ済みならDBを読まない）
+    """
+    user_id = _user_id_from_token(credentials)
+
+    principal = await _load_principal(db, user_id)
+    if principal is None:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="ユーザーが見つかりません",
         )
 
-    return user
+    return principal
 
 
-def get_current_approved_user(
-    current_user: User = Depends(get_current_user)
+async def get_current_user_model(
+    current_user: UserPrincipal = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
 ) -> User:
+    """
+    現在のユーザーをモデルとして取得（プロフィールの表示・更新用）
+    """
+    user = await db.get(User, current_user.id)
+    if user is None:
+        invalidate_user_principal(current_user.id)
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="ユーザーが見つかりません",
+        )
+    return user
+
+
+async def get_current_approved_user(
+    current_user: UserPrincipal = Depends(get_current_user)
+) -> UserPrincipal:
     """
     承認済みユーザーを取得
     """
@@ -55,9 +151,9 @@ def get_current_approved_user(
     return current_user
 
 
-def get_current_admin_user(
-    current_user: User = Depends(get_current_approved_user)
-) -> User:
+async def get_current_admin_user(
+    current_user: UserPrincipal = Depends(get_current_approved_user)
+) -> UserPrincipal:
     """
     管理者ユーザーを取得
     """
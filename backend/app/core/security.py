@@ -1,22 +1,88 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import Callable, Optional, Tuple, TypeVar
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 from app.core.config import settings
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+T = TypeVar("T")
+
+# min/max を設定したコストに揃えると、コストの異なる既存ハッシュは needs_update になる
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__rounds=settings.BCRYPT_ROUNDS,
+    bcrypt__min_rounds=settings.BCRYPT_ROUNDS,
+    bcrypt__max_rounds=settings.BCRYPT_ROUNDS,
+)
+
+
+class PasswordHasherBusy(Exception):
+    """パスワードハッシュの待ちが上限に達した（呼び出し側は503を返す）"""
 
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
-    """パスワードを検証"""
+    """パスワードを検証（同期版、スクリプト用）"""
     return pwd_context.verify(plain_password, hashed_password)
 
 
 def get_password_hash(password: str) -> str:
-    """パスワードをハッシュ化"""
+    """パスワードをハッシュ化（同期版、スクリプト用）"""
     return pwd_context.hash(password)
 
 
+# bcryptはCPUを数百ミリ秒使うため、イベントループではなく専用スレッドで実行する
+_hash_executor: Optional[ThreadPoolExecutor] = None
+_hash_pending = 0
+
+
+async def _run_in_hash_pool(func: Callable[..., T], *args) -> T:
+    """
+    専用スレッドプールでbcryptを実行
+
+    同時実行数は PASSWORD_HASH_WORKERS、待機を含めた件数は PASSWORD_HASH_MAX_PENDING まで。
+    上限を超えたら待たせずに PasswordHasherBusy を送出する（ログイン集中時に待ち行列を伸ばさない）。
+    """
+    global _hash_executor, _hash_pending
+    if _hash_pending >= settings.PASSWORD_HASH_MAX_PENDING:
+        raise PasswordHasherBusy()
+    if _hash_executor is None:
+        _hash_executor = ThreadPoolExecutor(
+            max_workers=settings.PASSWORD_HASH_WORKERS,
+            thread_name_prefix="password-hash",
+        )
+
+    _hash_pending += 1
+    try:
+        return await asyncio.get_running_loop().run_in_executor(_hash_executor, func, *args)
+    finally:
+        _hash_pending -= 1
+
+
+async def verify_and_update_password(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    """
+    パスワードを検証し、コスト係数が変わっていれば新しいハッシュも返す
+
+    Returns:
+        (一致したか, 再ハッシュ後の値（不要ならNone）)
+    """
+    return await _run_in_hash_pool(pwd_context.verify_and_update, plain_password, hashed_password)
+
+
+async def hash_password(password: str) -> str:
+    """パスワードをハッシュ化（スレッドプールで実行）"""
+    return await _run_in_hash_pool(pwd_context.hash, password)
+
+
+def shutdown_password_hasher():
+    """スレッドプールを停止（lifespanのシャットダウン時）"""
+    global _hash_executor
+    if _hash_executor is not None:
+        _hash_executor.shutdown(wait=True)
+        _hash_executor = None
+
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
     """JWTトークンを作成"""
     to_encode = data.copy()
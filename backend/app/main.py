@@ -3,8 +3,14 @@ from fastapi.middleware.cors import CORSMiddleware
 from starlette.middleware.sessions import SessionMiddleware
 from contextlib import asynccontextmanager
 from app.core.config import settings
-from app.api import auth, projects, admin, agents, users
+from app.api import auth, projects, admin, agents, users, jobs
 from app.agents import initialize_agents
+from app.agents.claude_client import close_claude_client
+from app.core.database import close_db
+from app.core.security import shutdown_password_hasher
+from app.services.agent_job_service import get_agent_job_queue
+from app.services.api_log_service import get_api_log_writer
+from app.services.claude_client_pool import close_claude_client_pool
 
 
 @asynccontextmanager
@@ -12,10 +18,19 @@ async def lifespan(app: FastAPI):
     # Startup
     print("🚀 マザーAI起動中...")
     initialize_agents()
+    get_api_log_writer().start()
+    get_agent_job_queue().start()
     print("✓ マザーAI起動完了")
     yield
     # Shutdown
     print("🛑 マザーAIシャットダウン")
+    # 実行中のジョブを止め（pendingに戻す）、未書き込みのAPIログを書き込んでからDB接続を閉じる
+    await get_agent_job_queue().stop()
+    await get_api_log_writer().stop()
+    await close_claude_client()
+    await close_claude_client_pool()
+    await close_db()
+    shutdown_password_hasher()
 
 
 app = FastAPI(
@@ -48,6 +63,7 @@ app.include_router(users.router, prefix="/api/v1/users", tags=["ユーザー"])
 app.include_router(projects.router, prefix="/api/v1/projects", tags=["プロジェクト"])
 app.include_router(admin.router, prefix="/api/v1/admin", tags=["管理"])
 app.include_router(agents.router, prefix="/api/v1/agents", tags=["エージェント"])
+app.include_router(jobs.router, prefix="/api/v1/jobs", tags=["ジョブ"])
 
 
 @app.get("/")
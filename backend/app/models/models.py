@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, Integer, DateTime, Text, ForeignKey, Enum, Boolean, JSON
+from sqlalchemy import Column, String, Integer, DateTime, Text, ForeignKey, Enum, Boolean, JSON, Index, UniqueConstraint, LargeBinary, BigInteger, Numeric, text
 from sqlalchemy.orm import relationship
 from datetime import datetime
 import uuid
@@ -36,6 +36,11 @@ class ProjectStatus(enum.Enum):
 
 class User(Base):
     __tablename__ = "users"
+    __table_args__ = (
+        # 管理画面のユーザー一覧: 登録日順（ステータス絞り込みあり・なし）
+        Index("ix_users_created_at_id", "created_at", "id"),
+        Index("ix_users_status_created_at_id", "status", "created_at", "id"),
+    )
 
     id = Column(String, primary_key=True, default=generate_uuid)
     email = Column(String, unique=True, nullable=False, index=True)
@@ -54,6 +59,7 @@ class User(Base):
 
     # API settings
     custom_claude_api_key = Column(String, nullable=True)
+    response_cache_enabled = Column(Boolean, default=True, nullable=False)  # Claude APIの応答キャッシュを使うか
 
     # Self-expansion settings
     self_expansion_mode = Column(
@@ -74,6 +80,9 @@ class User(Base):
 
 class Project(Base):
     __tablename__ = "projects"
+    __table_args__ = (
+        Index("ix_projects_owner_id", "owner_id"),
+    )
 
     id = Column(String, primary_key=True, default=generate_uuid)
     name = Column(String, nullable=False)
@@ -102,6 +111,12 @@ class Project(Base):
 
 class Message(Base):
     __tablename__ = "messages"
+    __table_args__ = (
+        # チャット履歴の取得: project_id + phase で絞り込み、created_at 順
+        Index("ix_messages_project_id_phase_created_at", "project_id", "phase", "created_at"),
+        # Phaseを指定しないページ取得: project_id で絞り込み、(created_at, id) 順
+        Index("ix_messages_project_id_created_at_id", "project_id", "created_at", "id"),
+    )
 
     id = Column(String, primary_key=True, default=generate_uuid)
     project_id = Column(String, ForeignKey("projects.id"), nullable=False)
@@ -117,19 +132,41 @@ class Message(Base):
 
 
 class PhaseExecution(Base):
+    """
+    エージェント実行ジョブ（agent_job_service のキューを兼ねる）
+    """
     __tablename__ = "phase_executions"
+    __table_args__ = (
+        # 次に実行するジョブ: WHERE status = 'pending' ORDER BY created_at
+        Index("ix_phase_executions_status_created_at", "status", "created_at"),
+        Index("ix_phase_executions_user_id_created_at", "user_id", "created_at"),
+        # 同じ依頼の実行中ジョブは1つだけ（完了・失敗したジョブは対象外）
+        Index(
+            "uq_phase_executions_dedupe_key_in_flight",
+            "dedupe_key",
+            unique=True,
+            postgresql_where=text("status IN ('pending', 'in_progress')"),
+            sqlite_where=text("status IN ('pending', 'in_progress')"),
+        ),
+    )
 
     id = Column(String, primary_key=True, default=generate_uuid)
     project_id = Column(String, ForeignKey("projects.id"), nullable=False)
+    user_id = Column(String, ForeignKey("users.id"), nullable=True)  # ジョブを投入したユーザー
     phase = Column(Integer, nullable=False)
     status = Column(String, nullable=False)  # "pending", "in_progress", "completed", "failed"
+    task = Column(JSON, nullable=True)  # ジョブの入力
+    output = Column(Text, nullable=True)  # ストリーミング出力（実行中は一定間隔で書き込む）
     result = Column(JSON, nullable=True)
     error = Column(Text, nullable=True)
+    attempts = Column(Integer, default=0, nullable=False)  # 実行を開始した回数
+    dedupe_key = Column(String(64), nullable=True)  # 同じ依頼（ユーザー・プロジェクト・Phase・内容）の判定キー
 
     # Timestamps
     started_at = Column(DateTime, nullable=True)
     completed_at = Column(DateTime, nullable=True)
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    updated_at = Column(DateTime, default=datetime.utcnow, nullable=True)  # 実行中は生存確認として更新
 
     # Relationships
     project = relationship("Project", back_populates="phase_executions")
@@ -162,6 +199,11 @@ class Agent(Base):
 
 class ApiLog(Base):
     __tablename__ = "api_logs"
+    __table_args__ = (
+        Index("ix_api_logs_user_id_created_at", "user_id", "created_at"),
+        Index("ix_api_logs_created_at", "created_at"),
+        Index("ix_api_logs_phase_created_at", "phase", "created_at"),
+    )
 
     id = Column(String, primary_key=True, default=generate_uuid)
     user_id = Column(String, ForeignKey("users.id"), nullable=False)
@@ -170,8 +212,10 @@ class ApiLog(Base):
     input_tokens = Column(Integer, nullable=False)
     output_tokens = Column(Integer, nullable=False)
     total_tokens = Column(Integer, nullable=False)
-    cost = Column(Integer, nullable=False)  # Cost in yen (円)
-    cached = Column(Boolean, default=False, nullable=False)
+    cost = Column(Numeric(14, 6), nullable=False)  # Cost in yen (円、1円未満の端数を含む)
+    cached = Column(Boolean, default=False, nullable=False)  # 応答キャッシュから返した（API呼び出しなし）
+    cache_creation_tokens = Column(Integer, default=0, nullable=False)  # プロンプトキャッシュに書き込んだ入力トークン
+    cache_read_tokens = Column(Integer, default=0, nullable=False)  # プロンプトキャッシュから読み込んだ入力トークン
     phase = Column(Integer, nullable=True)  # Phase 1-14 (エージェント種別)
     agent_name = Column(String, nullable=True)  # エージェント名 (例: Phase1RequirementsAgent)
 
@@ -182,18 +226,68 @@ class ApiLog(Base):
     user = relationship("User", back_populates="api_logs")
 
 
+class ApiUsageRollupMixin:
+    """
+    api_logs の集計テーブル共通カラム
+    ログの書き込み時に (期間, ユーザー, Phase, キャッシュ有無) ごとに加算する
+    """
+    bucket_start = Column(DateTime, primary_key=True)  # 集計期間の開始（UTC）
+    user_id = Column(String, ForeignKey("users.id"), primary_key=True)
+    phase = Column(Integer, primary_key=True)  # Phase 1-14（不明は0）
+    cached = Column(Boolean, primary_key=True)  # 応答キャッシュから返したか
+
+    requests = Column(Integer, default=0, nullable=False)
+    input_tokens = Column(BigInteger, default=0, nullable=False)
+    output_tokens = Column(BigInteger, default=0, nullable=False)
+    total_tokens = Column(BigInteger, default=0, nullable=False)
+    cost = Column(Numeric(20, 6), default=0, nullable=False)  # Cost in yen (円、端数を丸めずに加算)
+    cache_creation_tokens = Column(BigInteger, default=0, nullable=False)
+    cache_read_tokens = Column(BigInteger, default=0, nullable=False)
+
+
+class ApiUsageDaily(ApiUsageRollupMixin, Base):
+    """API使用量の1日ごとの集計（管理画面の統計はこのテーブルから算出）"""
+    __tablename__ = "api_usage_daily"
+
+
+class FileBlob(Base):
+    """
+    ファイル内容のコンテンツアドレス型ストレージ
+    SHA-256をキーに同一内容を1行にまとめ、ProjectFileから参照する
+    """
+    __tablename__ = "file_blobs"
+
+    hash = Column(String(64), primary_key=True)  # 非圧縮内容のSHA-256
+    data = Column(LargeBinary, nullable=False)  # UTF-8の内容（compressionに応じて圧縮済み）
+    compression = Column(String, nullable=True)  # None or "zstd"
+    size = Column(Integer, nullable=False)  # 非圧縮時のバイト数
+    ref_count = Column(Integer, default=0, nullable=False)  # 参照しているProjectFileの数
+
+    # Timestamps
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+
 class ProjectFile(Base):
     """
     プロジェクトのコードファイル
     Phase 2で生成されたコードやユーザーが編集したコードを保存
+    内容はfile_blobsに保存し、content_hashで参照する
     """
     __tablename__ = "project_files"
+    __table_args__ = (
+        UniqueConstraint("project_id", "file_path", name="uq_project_files_project_id_file_path"),
+    )
 
     id = Column(String, primary_key=True, default=generate_uuid)
     project_id = Column(String, ForeignKey("projects.id"), nullable=False)
     file_path = Column(String, nullable=False)  # e.g., "src/App.tsx"
-    content = Column(Text, nullable=False)
+    legacy_content = Column("content", Text, nullable=True)  # file_blobs移行前のインライン内容
     language = Column(String, nullable=True)  # e.g., "typescript", "python"
+    content_hash = Column(
+        String(64),
+        ForeignKey("file_blobs.hash", name="fk_project_files_content_hash_file_blobs"),
+        nullable=True,
+    )  # file_blobsのキー（内容のSHA-256）
 
     # Timestamps
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
@@ -201,6 +295,8 @@ class ProjectFile(Base):
 
     # Relationships
     project = relationship("Project", back_populates="files")
+    # 内容の読み込みは明示的に joinedload する（一覧取得で本文を読まないため）
+    blob = relationship("FileBlob", lazy="raise")
 
 
 class SystemExpansion(Base):
@@ -0,0 +1,136 @@
+"""
+管理画面のユーザー一覧サービス
+
+ユーザーの絞り込み・並び替え・ページングをDB側で行い、
+プロジェクト数は projects を owner_id でGROUP BYした1つのサブクエリから結合する。
+（ユーザーごとに projects を読み込まない）
+"""
+from typing import Any, Dict, List, Optional, Tuple
+from sqlalchemy import func, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.models.models import Project, User, UserRole, UserStatus
+
+
+# 並び替えに使える列（APIのsortパラメータ → 列）
+SORT_FIELDS = ("created_at", "last_login_at", "name", "email", "status", "project_count")
+
+
+def _filters(
+    status: Optional[UserStatus] = None,
+    role: Optional[UserRole] = None,
+    search: Optional[str] = None,
+) -> list:
+    conditions = []
+    if status is not None:
+        conditions.append(User.status == status)
+    if role is not None:
+        conditions.append(User.role == role)
+    if search:
+        escaped = search.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+        pattern = f"%{escaped}%"
+        conditions.append(or_(
+            User.name.ilike(pattern, escape="\\"),
+            User.email.ilike(pattern, escape="\\"),
+        ))
+    return conditions
+
+
+def _project_counts(owner_ids=None):
+    """
+    ユーザーごとのプロジェクト数の集計（owner_ids を指定するとその所有者だけ集計する）
+
+    Returns:
+        (owner_id と project_count のサブクエリ, プロジェクトがなければ0になる project_count 列)
+    """
+    statement = select(Project.owner_id, func.count(Project.id).label("project_count"))
+    if owner_ids is not None:
+        statement = statement.where(Project.owner_id.in_(owner_ids))
+    project_counts = statement.group_by(Project.owner_id).subquery()
+    return project_counts, func.coalesce(project_counts.c.project_count, 0).label("project_count")
+
+
+async def list_users(
+    db: AsyncSession,
+    page: int = 1,
+    limit: int = 50,
+    sort: str = "created_at",
+    order: str = "desc",
+    status: Optional[UserStatus] = None,
+    role: Optional[UserRole] = None,
+    search: Optional[str] = None,
+) -> Tuple[List[Dict[str, Any]], int]:
+    """
+    ユーザー一覧を1ページ分取得（件数取得と合わせて2クエリ）
+
+    Args:
+        db: DBセッション
+        page: ページ番号（1始まり）
+        limit: 1ページの件数
+        sort: 並び替える列（SORT_FIELDS のいずれか）
+        order: "asc" または "desc"
+        status: ステータスで絞り込み
+        role: ロールで絞り込み
+        search: 氏名・メールアドレスの部分一致
+
+    Returns:
+        (ユーザー一覧, 条件に一致する総件数)
+    """
+    if sort not in SORT_FIELDS:
+        raise ValueError(f"sort には {', '.join(SORT_FIELDS)} のいずれかを指定してください")
+    if order not in ("asc", "desc"):
+        raise ValueError("order には asc または desc を指定してください")
+
+    conditions = _filters(status, role, search)
+
+    total = await db.scalar(select(func.count(User.id)).where(*conditions))
+
+    # 同じ値が並んでもページ間で重複・欠落しないようにIDで順序を確定させる
+    tiebreak = User.id.desc() if order == "desc" else User.id.asc()
+
+    if sort == "project_count":
+        # プロジェクト数で並べる場合は全ユーザー分の件数が必要
+        project_counts, project_count = _project_counts()
+        direction = project_count.desc() if order == "desc" else project_count.asc()
+        statement = (
+            select(User, project_count)
+            .outerjoin(project_counts, project_counts.c.owner_id == User.id)
+            .where(*conditions)
+            .order_by(direction, tiebreak)
+            .offset((page - 1) * limit)
+            .limit(limit)
+        )
+    else:
+        # 先にページ分のユーザーを確定し、その owner_id だけ projects を集計する
+        sort_column = getattr(User, sort)
+        direction = sort_column.desc() if order == "desc" else sort_column.asc()
+        page_users = (
+            select(User.id)
+            .where(*conditions)
+            .order_by(direction, tiebreak)
+            .offset((page - 1) * limit)
+            .limit(limit)
+            .subquery()
+        )
+        project_counts, project_count = _project_counts(select(page_users.c.id))
+        statement = (
+            select(User, project_count)
+            .join(page_users, page_users.c.id == User.id)
+            .outerjoin(project_counts, project_counts.c.owner_id == User.id)
+            .order_by(direction, tiebreak)
+        )
+
+    rows = (await db.execute(statement)).all()
+    users = [
+        {
+            "id": user.id,
+            "name": user.name,
+            "email": user.email,
+            "role": user.role.value,
+            "status": user.status.value,
+            "projectCount": int(count),
+            "last_login": user.last_login_at.isoformat() if user.last_login_at else None,
+            "created_at": user.created_at.isoformat(),
+        }
+        for user, count in rows
+    ]
+    return users, int(total or 0)
@@ -0,0 +1,831 @@
+"""
+エージェント実行ジョブサービス
+
+エージェントの実行をHTTPリクエストから切り離し、バックグラウンドのワーカーで実行する。
+- ジョブは phase_executions に pending で登録し、ディスパッチャーが取り出して実行する
+  （取り出しは UPDATE ... WHERE status = 'pending' で行うため、複数プロセスでも二重に実行しない）
+- 同時実行数は全体・ユーザーごと・Phaseごとに制限する（プロセスごと）
+- 実行中の出力はメモリ上に溜めて購読者に配信し、一定間隔で phase_executions.output に書き込む
+- 一定時間更新のない実行中ジョブ（プロセスが落ちた等）は pending に戻して再実行する
+- Phase 2 のチャットでは、生成中に閉じたコードブロックから順にファイルとして保存する
+- 同じ依頼（dedupe_key）のジョブが実行中なら新しく登録せず、そのジョブに相乗りする
+  （ダブルクリック・再送。判定は部分ユニークインデックスで行うため、複数プロセスでも1つだけ実行する）
+"""
+import asyncio
+import bisect
+import hashlib
+import json
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Any, AsyncGenerator, Dict, List, Optional, Set
+from sqlalchemy import func, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.agents import AgentRegistry
+from app.agents.code_blocks import CodeBlock, code_block_sink, group_generated_files
+from app.agents.phase_agents import PHASE_COMPLETED
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+from app.models.models import Message, PhaseExecution, User
+from app.services import message_service, project_file_service
+from app.services.api_log_service import UsageContext, usage_context
+
+
+JOB_PENDING = "pending"
+JOB_IN_PROGRESS = "in_progress"
+JOB_COMPLETED = "completed"
+JOB_FAILED = "failed"
+FINISHED_STATUSES = (JOB_COMPLETED, JOB_FAILED)
+
+# ジョブの種類（task["kind"]）
+JOB_KIND_MESSAGE = "message"  # プロジェクトのチャット（応答メッセージ・生成ファイルを保存）
+JOB_KIND_AGENT = "agent"  # エージェントの単体実行（結果をそのまま保存）
+JOB_KIND_PIPELINE = "pipeline"  # オーケストレーターによる複数Phaseの一括実行
+
+# パイプライン実行ジョブの phase（複数Phaseにまたがるため 0 とする）
+PIPELINE_JOB_PHASE = 0
+
+
+def message_dedupe_key(user_id: str, project_id: str, phase: int, content: str) -> str:
+    """同じ依頼かどうかの判定キー（ユーザー・プロジェクト・Phase・内容のハッシュ）"""
+    payload = json.dumps([user_id, project_id, phase, content], ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _output_attempt(status: str, attempts: Optional[int]) -> int:
+    """phase_executions.output が何回目の実行の出力か（pending は次の実行を待っている）"""
+    attempts = attempts or 0
+    return attempts + 1 if status == JOB_PENDING else max(attempts, 1)
+
+
+def _restarted(attempt: Optional[int], offset: int, current_attempt: int, length: int) -> bool:
+    """
+    受信済みの出力が前の実行のものか
+
+    実行回が分かっていれば実行回で判定する（同じ実行回のDB上の出力はメモリ上の出力より遅れることがある）。
+    分からなければ、出力が受信済みの文字数より短くなったことで判定する。
+    """
+    if attempt is not None:
+        return current_attempt != attempt
+    return length < offset
+
+
+class JobStream:
+    """
+    実行中ジョブの出力
+
+    出力は追記のみで、購読者は文字数のオフセットで続きを読む。
+    オフセットは実行回（attempt）ごとで、再実行されると出力は空から始まる。
+    """
+
+    def __init__(self, attempt: int = 1):
+        self.attempt = attempt
+        self.chunks: List[str] = []
+        self._starts: List[int] = []  # 各チャンクの開始オフセット
+        self.length = 0
+        self.status = JOB_IN_PROGRESS
+        self.result: Optional[Dict[str, Any]] = None
+        self.error: Optional[str] = None
+        self._changed = asyncio.Event()
+
+    @property
+    def finished(self) -> bool:
+        return self.status in FINISHED_STATUSES
+
+    def append(self, text: str):
+        if not text:
+            return
+        self._starts.append(self.length)
+        self.chunks.append(text)
+        self.length += len(text)
+        self._notify()
+
+    def finish(self, status: str, result: Optional[Dict[str, Any]] = None, error: Optional[str] = None):
+        self.status = status
+        self.result = result
+        self.error = error
+        self._notify()
+
+    def text(self) -> str:
+        return "".join(self.chunks)
+
+    def text_since(self, offset: int) -> str:
+        """offset 文字目以降の出力"""
+        if offset >= self.length:
+            return ""
+        index = max(0, bisect.bisect_right(self._starts, offset) - 1)
+        head = self.chunks[index][offset - self._starts[index]:] if offset > 0 else self.chunks[index]
+        return head + "".join(self.chunks[index + 1:])
+
+    async def wait(self, timeout: Optional[float] = None):
+        """次の追記・完了まで待つ"""
+        changed = self._changed
+        try:
+            await asyncio.wait_for(changed.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+
+    def _notify(self):
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+
+@dataclass
+class _RunningJob:
+    id: str
+    project_id: str
+    user_id: Optional[str]
+    phase: int
+    task: Dict[str, Any]
+    response_cache: bool = True  # ユーザーの応答キャッシュ設定
+    api_key: Optional[str] = field(default=None, repr=False)  # ユーザー独自のAPIキー（暗号化済み）
+    attempt: int = 1  # 何回目の実行か
+
+
+class _GeneratedFileSaver:
+    """
+    生成中に閉じたコードブロックを順に ProjectFile に保存する
+
+    code_block_sink から同期的に受け取り、溜まった分をまとめて1回のUPSERTで書き込む。
+    保存に失敗しても生成は止めない（完了後の一括保存で改めて保存される）。
+    """
+
+    def __init__(self, project_id: str):
+        self.project_id = project_id
+        self.saved = 0
+        self._queue: asyncio.Queue = asyncio.Queue()
+        self._task = asyncio.create_task(self._run())
+
+    def put(self, block: CodeBlock):
+        self._queue.put_nowait(block)
+
+    async def close(self):
+        """受け取り済みのブロックを保存し終えるまで待つ"""
+        self._queue.put_nowait(None)
+        await self._task
+
+    def cancel(self):
+        self._task.cancel()
+
+    async def _run(self):
+        finished = False
+        while not finished:
+            blocks = [await self._queue.get()]
+            while not self._queue.empty():
+                blocks.append(self._queue.get_nowait())
+            finished = None in blocks
+            blocks = [block for block in blocks if block is not None]
+            if not blocks:
+                continue
+            try:
+                async with AsyncSessionLocal() as db:
+                    self.saved += await project_file_service.bulk_save_generated_files(
+                        db, self.project_id, group_generated_files(blocks)
+                    )
+                    await db.commit()
+            except Exception as e:
+                print(f"⚠️ 生成中のファイル保存に失敗しました（project={self.project_id}）: {e}")
+
+
+class AgentJobQueue:
+    """
+    phase_executions をキューとするエージェントジョブのワーカープール
+    """
+
+    def __init__(
+        self,
+        max_workers: Optional[int] = None,
+        max_per_user: Optional[int] = None,
+        max_per_phase: Optional[int] = None,
+        phase_limits: Optional[Dict[int, int]] = None,
+        poll_interval: Optional[float] = None,
+    ):
+        self.max_workers = max_workers or settings.AGENT_JOB_MAX_WORKERS
+        self.max_per_user = max_per_user or settings.AGENT_JOB_MAX_PER_USER
+        self.max_per_phase = max_per_phase or settings.AGENT_JOB_MAX_PER_PHASE
+        self.phase_limits = phase_limits if phase_limits is not None else dict(settings.AGENT_JOB_PHASE_LIMITS)
+        self.poll_interval = poll_interval or settings.AGENT_JOB_POLL_INTERVAL_SECONDS
+
+        self._running: Dict[str, asyncio.Task] = {}
+        self._running_jobs: Dict[str, _RunningJob] = {}
+        self._streams: Dict[str, JobStream] = {}
+        self._wakeup: Optional[asyncio.Event] = None
+        self._streams_changed: Optional[asyncio.Event] = None
+        self._dispatcher: Optional[asyncio.Task] = None
+        self._stopping = False
+        self._next_stale_check = 0.0
+        self.coalesced = 0  # 実行中のジョブに相乗りした依頼の数
+
+    @property
+    def running(self) -> bool:
+        return self._dispatcher is not None and not self._dispatcher.done()
+
+    def start(self):
+        """ディスパッチャーを開始（lifespanの起動時）"""
+        if self.running:
+            return
+        self._wakeup = asyncio.Event()
+        self._streams_changed = asyncio.Event()
+        self._stopping = False
+        self._next_stale_check = 0.0
+        self._dispatcher = asyncio.create_task(self._dispatch_loop())
+
+    async def stop(self):
+        """
+        ディスパッチャーと実行中のジョブを止める（lifespanのシャットダウン時）
+
+        実行中のジョブは pending に戻し、次回起動時（または他のプロセス）で最初から実行し直す。
+        """
+        if self._dispatcher is not None:
+            # 取り出し中のジョブを取りこぼさないよう、キャンセルではなくループを抜けさせる
+            self._stopping = True
+            self._wakeup.set()
+            await asyncio.gather(self._dispatcher, return_exceptions=True)
+            self._dispatcher = None
+        tasks = list(self._running.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    # === 投入・状態 ===
+
+    async def enqueue(
+        self,
+        db: AsyncSession,
+        project_id: str,
+        user_id: str,
+        phase: int,
+        task: Dict[str, Any],
+        dedupe_key: Optional[str] = None,
+    ) -> PhaseExecution:
+        """
+        ジョブを登録（同じセッションに追加済みの変更と一緒にコミットする）
+
+        Args:
+            db: DBセッション
+            project_id: プロジェクトID
+            user_id: 投入したユーザーID
+            phase: Phase番号
+            task: ジョブの入力（"kind" にジョブの種類）
+            dedupe_key: 同じ依頼の判定キー。同じキーのジョブが同時に登録された場合は
+                追加済みの変更を破棄し、先に登録されたジョブを返す
+
+        Returns:
+            登録したPhaseExecution（相乗りした場合は実行中のジョブ）
+        """
+        job = PhaseExecution(
+            project_id=project_id,
+            user_id=user_id,
+            phase=phase,
+            status=JOB_PENDING,
+            task=task,
+            dedupe_key=dedupe_key,
+        )
+        db.add(job)
+        try:
+            await db.commit()
+        except IntegrityError:
+            if dedupe_key is None:
+                raise
+            await db.rollback()
+            existing = await self.find_in_flight(db, dedupe_key)
+            if existing is None:
+                raise
+            return existing
+        await db.refresh(job)
+        if self._wakeup is not None:
+            self._wakeup.set()
+        return job
+
+    async def find_in_flight(self, db: AsyncSession, dedupe_key: str) -> Optional[PhaseExecution]:
+        """
+        同じ依頼の実行待ち・実行中のジョブ（あれば相乗りした数に数える）
+        """
+        job = await db.scalar(
+            select(PhaseExecution).where(
+                PhaseExecution.dedupe_key == dedupe_key,
+                PhaseExecution.status.in_((JOB_PENDING, JOB_IN_PROGRESS)),
+            )
+        )
+        if job is not None:
+            self.coalesced += 1
+        return job
+
+    async def get_status(self, db: AsyncSession, job: PhaseExecution) -> Dict[str, Any]:
+        """
+        ジョブの状態（ポーリング用）
+
+        pending の場合は先に実行待ちのジョブ数、実行中はこのプロセスで実行していれば出力の文字数を返す。
+        """
+        stream = self._streams.get(job.id)
+        status = {
+            "id": job.id,
+            "project_id": job.project_id,
+            "phase": job.phase,
+            "kind": (job.task or {}).get("kind"),
+            "status": stream.status if stream else job.status,
+            "output_length": stream.length if stream else len(job.output or ""),
+            "result": stream.result if stream and stream.finished else job.result,
+            "error": stream.error if stream and stream.finished else job.error,
+            "attempts": job.attempts,
+            "created_at": job.created_at.isoformat(),
+            "started_at": job.started_at.isoformat() if job.started_at else None,
+            "completed_at": job.completed_at.isoformat() if job.completed_at else None,
+        }
+        if status["status"] == JOB_PENDING:
+            status["queue_position"] = await db.scalar(
+                select(func.count(PhaseExecution.id)).where(
+                    PhaseExecution.status == JOB_PENDING,
+                    PhaseExecution.created_at < job.created_at,
+                )
+            )
+        return status
+
+    async def current_attempt(self, job_id: str) -> int:
+        """購読を始めた時点で出力を読む実行回（pending なら次の実行回）"""
+        stream = self._streams.get(job_id)
+        if stream is not None:
+            return stream.attempt
+        async with AsyncSessionLocal() as db:
+            row = (await db.execute(
+                select(PhaseExecution.status, PhaseExecution.attempts).where(PhaseExecution.id == job_id)
+            )).first()
+        return _output_attempt(row.status, row.attempts) if row else 1
+
+    async def subscribe(
+        self, job_id: str, offset: int = 0, attempt: Optional[int] = None
+    ) -> AsyncGenerator[Dict[str, Any], None]:
+        """
+        ジョブの出力を offset 文字目から購読
+
+        Args:
+            offset: 受信済みの文字数
+            attempt: offset がどの実行回の出力のものか（省略時は出力の長さだけで判定）
+
+        Yields:
+            {"type": "delta", "content": "..."}  出力の差分
+            {"type": "reset", "attempt": n}  再実行で出力が最初からになった（受信済みの出力は破棄する）
+            {"type": "finished", "status": ..., "result": ..., "error": ...}  完了時（最後に1回）
+
+        このプロセスで実行中ならメモリから、そうでなければ phase_executions を
+        poll_interval ごとに読んで配信する。
+        """
+        while True:
+            stream = self._streams.get(job_id)
+            if stream is not None:
+                if _restarted(attempt, offset, stream.attempt, stream.length):
+                    # 再実行された（受信済みの出力は前の実行のもの）
+                    yield {"type": "reset", "attempt": stream.attempt}
+                    offset = 0
+                attempt = stream.attempt
+                while True:
+                    text = stream.text_since(offset)
+                    if text:
+                        offset += len(text)
+                        yield {"type": "delta", "content": text}
+                    if stream.finished:
+                        yield {"type": "finished", "status": stream.status, "result": stream.result, "error": stream.error}
+                        return
+                    if self._streams.get(job_id) is not stream:
+                        # 実行が中断された（シャットダウンで pending に戻った）
+                        break
+                    await stream.wait(self.poll_interval)
+                continue
+
+            async with AsyncSessionLocal() as db:
+                row = (await db.execute(
+                    select(
+                        PhaseExecution.status,
+                        PhaseExecution.attempts,
+                        PhaseExecution.output,
+                        PhaseExecution.result,
+                        PhaseExecution.error,
+                    ).where(PhaseExecution.id == job_id)
+                )).first()
+            if row is None:
+                yield {"type": "finished", "status": JOB_FAILED, "result": None, "error": "ジョブが見つかりません"}
+                return
+            if job_id in self._streams:
+                # 読み込み中にこのプロセスで実行が始まった
+                continue
+
+            output = row.output or ""
+            row_attempt = _output_attempt(row.status, row.attempts)
+            if _restarted(attempt, offset, row_attempt, len(output)):
+                # 再実行された（pending に戻ると出力は空になる）
+                yield {"type": "reset", "attempt": row_attempt}
+                offset = 0
+            attempt = row_attempt
+            if len(output) > offset:
+                yield {"type": "delta", "content": output[offset:]}
+                offset = len(output)
+            if row.status in FINISHED_STATUSES:
+                yield {"type": "finished", "status": row.status, "result": row.result, "error": row.error}
+                return
+
+            changed = self._streams_changed
+            if changed is None:
+                await asyncio.sleep(self.poll_interval)
+            else:
+                try:
+                    await asyncio.wait_for(changed.wait(), self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+
+    # === ディスパッチャー ===
+
+    async def _dispatch_loop(self):
+        while not self._stopping:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            if self._stopping:
+                break
+            try:
+                now = asyncio.get_running_loop().time()
+                if now >= self._next_stale_check:
+                    await self._recover_stale_jobs()
+                    self._next_stale_check = now + settings.AGENT_JOB_STALE_SECONDS / 4
+                await self._claim_jobs()
+            except Exception as e:
+                print(f"❌ エージェントジョブの取り出しに失敗しました: {e}")
+
+    def _phase_limit(self, phase: int) -> int:
+        return self.phase_limits.get(phase, self.max_per_phase)
+
+    def _saturated(self):
+        """上限に達しているユーザー・Phase"""
+        users: Dict[str, int] = {}
+        phases: Dict[int, int] = {}
+        for job in self._running_jobs.values():
+            if job.user_id:
+                users[job.user_id] = users.get(job.user_id, 0) + 1
+            phases[job.phase] = phases.get(job.phase, 0) + 1
+        return (
+            {user for user, count in users.items() if count >= self.max_per_user},
+            {phase for phase, count in phases.items() if count >= self._phase_limit(phase)},
+            users,
+            phases,
+        )
+
+    async def _claim_jobs(self):
+        """空きワーカー分のpendingジョブを古い順に取り出して実行を開始"""
+        free = self.max_workers - len(self._running)
+        if free <= 0:
+            return
+
+        saturated_users, saturated_phases, users, phases = self._saturated()
+        query = select(
+            PhaseExecution.id,
+            PhaseExecution.project_id,
+            PhaseExecution.user_id,
+            PhaseExecution.phase,
+            PhaseExecution.task,
+            PhaseExecution.attempts,
+            User.response_cache_enabled,
+            User.custom_claude_api_key,
+        ).outerjoin(User, User.id == PhaseExecution.user_id).where(PhaseExecution.status == JOB_PENDING)
+        if saturated_users:
+            query = query.where(
+                PhaseExecution.user_id.is_(None) | PhaseExecution.user_id.notin_(saturated_users)
+            )
+        if saturated_phases:
+            query = query.where(PhaseExecution.phase.notin_(saturated_phases))
+        query = query.order_by(PhaseExecution.created_at).limit(free * 4)
+
+        async with AsyncSessionLocal() as db:
+            candidates = (await db.execute(query)).all()
+            for row in candidates:
+                if free <= 0:
+                    break
+                if row.user_id and users.get(row.user_id, 0) >= self.max_per_user:
+                    continue
+                if phases.get(row.phase, 0) >= self._phase_limit(row.phase):
+                    continue
+
+                now = datetime.utcnow()
+                claimed = await db.execute(
+                    update(PhaseExecution)
+                    .where(PhaseExecution.id == row.id, PhaseExecution.status == JOB_PENDING)
+                    .values(
+                        status=JOB_IN_PROGRESS,
+                        started_at=now,
+                        updated_at=now,
+                        output=None,
+                        attempts=PhaseExecution.attempts + 1,
+                    )
+                )
+                await db.commit()
+                if claimed.rowcount != 1:
+                    # 他のプロセスが先に取り出した
+                    continue
+
+                job = _RunningJob(
+                    id=row.id,
+                    project_id=row.project_id,
+                    user_id=row.user_id,
+                    phase=row.phase,
+                    task=row.task or {},
+                    response_cache=row.response_cache_enabled is not False,
+                    api_key=row.custom_claude_api_key,
+                    attempt=(row.attempts or 0) + 1,
+                )
+                self._start(job)
+                free -= 1
+                if job.user_id:
+                    users[job.user_id] = users.get(job.user_id, 0) + 1
+                phases[job.phase] = phases.get(job.phase, 0) + 1
+
+    def _start(self, job: _RunningJob):
+        self._streams[job.id] = JobStream(job.attempt)
+        self._running_jobs[job.id] = job
+        self._running[job.id] = asyncio.create_task(self._run(job))
+        # pending のジョブを購読しているリクエストにメモリ上の出力へ切り替えさせる
+        self._streams_changed.set()
+        self._streams_changed = asyncio.Event()
+
+    async def _recover_stale_jobs(self):
+        """更新の止まった実行中ジョブを pending に戻す（実行回数の上限に達したものは失敗にする）"""
+        cutoff = datetime.utcnow() - timedelta(seconds=settings.AGENT_JOB_STALE_SECONDS)
+        stale = (
+            (PhaseExecution.status == JOB_IN_PROGRESS)
+            & (PhaseExecution.updated_at < cutoff)
+            & PhaseExecution.id.notin_(list(self._running))
+        )
+        async with AsyncSessionLocal() as db:
+            await db.execute(
+                update(PhaseExecution)
+                .where(stale, PhaseExecution.attempts >= settings.AGENT_JOB_MAX_ATTEMPTS)
+                .values(status=JOB_FAILED, error="実行が中断されました", completed_at=datetime.utcnow())
+            )
+            requeued = await db.execute(
+                update(PhaseExecution)
+                .where(stale)
+                .values(status=JOB_PENDING, output=None, started_at=None)
+            )
+            await db.commit()
+        if requeued.rowcount:
+            print(f"⚠️ 中断されたエージェントジョブを再投入しました（{requeued.rowcount}件）")
+            self._wakeup.set()
+
+    # === 実行 ===
+
+    async def _run(self, job: _RunningJob):
+        stream = self._streams[job.id]
+        flusher = asyncio.create_task(self._flush_progress(job.id, stream))
+        status, result, error = JOB_FAILED, None, None
+        try:
+            if job.task.get("kind") == JOB_KIND_MESSAGE:
+                result = await self._run_message_job(job, stream)
+            elif job.task.get("kind") == JOB_KIND_PIPELINE:
+                result = await self._run_pipeline_job(job, stream)
+            else:
+                result = await self._run_agent_job(job, stream)
+            status = JOB_COMPLETED
+        except asyncio.CancelledError:
+            # シャットダウン: 最初から実行し直せるように pending に戻す
+            flusher.cancel()
+            await self._update(job.id, status=JOB_PENDING, output=None, started_at=None)
+            self._forget(job.id)
+            raise
+        except Exception as e:
+            error = f"エラーが発生しました: {str(e)}"
+            print(f"❌ エージェントジョブ {job.id} が失敗しました: {e}")
+        finally:
+            if not flusher.done():
+                flusher.cancel()
+
+        await self._update(
+            job.id,
+            status=status,
+            output=stream.text(),
+            result=result,
+            error=error,
+            completed_at=datetime.utcnow(),
+        )
+        stream.finish(status, result, error)
+        self._running.pop(job.id, None)
+        self._running_jobs.pop(job.id, None)
+        # 再接続に備えてしばらくメモリ上の出力を残す
+        asyncio.get_running_loop().call_later(
+            settings.AGENT_JOB_STREAM_RETENTION_SECONDS, self._streams.pop, job.id, None
+        )
+        self._wakeup.set()
+
+    def _forget(self, job_id: str):
+        self._running.pop(job_id, None)
+        self._running_jobs.pop(job_id, None)
+        self._streams.pop(job_id, None)
+
+    async def _update(self, job_id: str, **values):
+        try:
+            async with AsyncSessionLocal() as db:
+                await db.execute(
+                    update(PhaseExecution)
+                    .where(PhaseExecution.id == job_id)
+                    .values(updated_at=datetime.utcnow(), **values)
+                )
+                await db.commit()
+        except Exception as e:
+            print(f"❌ エージェントジョブ {job_id} の状態を保存できませんでした: {e}")
+
+    async def _flush_progress(self, job_id: str, stream: JobStream):
+        """実行中の出力と生存確認を一定間隔で書き込む"""
+        written = -1
+        while True:
+            await asyncio.sleep(settings.AGENT_JOB_PROGRESS_FLUSH_SECONDS)
+            if stream.length != written:
+                written = stream.length
+                await self._update(job_id, output=stream.text())
+            else:
+                await self._update(job_id)
+
+    async def _stream_agent(self, agent, agent_task: Dict[str, Any], stream: JobStream) -> Dict[str, Any]:
+        """エージェントをストリーミング実行し、差分を出力に追記して最終結果を返す"""
+        result: Dict[str, Any] = {}
+        async for event in agent.execute_stream(agent_task):
+            if event["type"] == "result":
+                result = event["result"]
+            else:
+                stream.append(event["content"])
+        return result
+
+    async def _run_message_job(self, job: _RunningJob, stream: JobStream) -> Dict[str, Any]:
+        """
+        プロジェクトのチャット: 履歴を読み込んでエージェントを実行し、応答と生成ファイルを保存
+        """
+        task = job.task
+        async with AsyncSessionLocal() as db:
+            user_message = await db.get(Message, task["message_id"])
+            if user_message is None:
+                raise ValueError("メッセージが見つかりません")
+
+            # 今回の発言より前の会話履歴（読み込み件数は上限付き。トークン予算への圧縮はエージェント側）
+            history, has_more = await message_service.list_messages(
+                db,
+                job.project_id,
+                settings.CONTEXT_MAX_HISTORY_MESSAGES,
+                phase=job.phase,
+                before=message_service.message_cursor(user_message),
+            )
+            history_offset = (
+                await message_service.count_messages(db, job.project_id, phase=job.phase) - len(history) - 1
+                if has_more else 0
+            )
+            conversation_history = [{"role": m.role, "content": m.content} for m in history]
+
+        # Phaseに応じてエージェントを選択（起動時に生成済みのシングルトン）
+        agent = AgentRegistry.get_phase_agent(job.phase) or AgentRegistry.get_phase_agent(1)
+
+        # このジョブ内のClaude API呼び出しをユーザー・プロジェクト・Phaseに紐付けて記録
+        usage_context.set(UsageContext(
+            user_id=job.user_id,
+            project_id=job.project_id,
+            phase=job.phase,
+            agent_name=agent.name,
+            response_cache=job.response_cache,
+            api_key=job.api_key,
+        ))
+
+        # Phase 2: 生成中に閉じたファイルから保存する
+        saver = None
+        if job.phase == 2:
+            saver = _GeneratedFileSaver(job.project_id)
+            code_block_sink.set(saver.put)
+        try:
+            result = await self._stream_agent(agent, {
+                "user_message": user_message.content,
+                "conversation_history": conversation_history,
+                "history_offset": history_offset,
+                "project_context": {
+                    "project_id": job.project_id,
+                    "project_name": task.get("project_name"),
+                },
+            }, stream)
+        except BaseException:
+            if saver is not None:
+                saver.cancel()
+            raise
+        if saver is not None:
+            await saver.close()
+
+        full_response = result.get("response", "応答がありませんでした。")
+        if not stream.length:
+            stream.append(full_response)
+
+        async with AsyncSessionLocal() as db:
+            # AIの応答をDBに保存
+            assistant_message = Message(
+                project_id=job.project_id,
+                phase=job.phase,
+                role="assistant",
+                content=full_response,
+            )
+            db.add(assistant_message)
+            await db.commit()
+            await db.refresh(assistant_message)
+
+            # Phase 2の場合、生成されたコードをProjectFileテーブルに自動保存
+            if job.phase == 2 and "generated_code" in result:
+                # 全ファイルを1回のUPSERTで保存（生成中に保存済み・内容が変わっていないファイルはスキップ）
+                await project_file_service.bulk_save_generated_files(
+                    db, job.project_id, result.get("generated_code", {})
+                )
+                await db.commit()
+
+        return {"message_id": assistant_message.id}
+
+    async def _run_agent_job(self, job: _RunningJob, stream: JobStream) -> Dict[str, Any]:
+        """エージェントの単体実行: 結果をそのままジョブの結果として保存"""
+        task = job.task
+        agent = AgentRegistry.get_phase_agent(job.phase)
+        if agent is None:
+            raise ValueError(f"無効なPhaseです: {job.phase}")
+
+        usage_context.set(UsageContext(
+            user_id=job.user_id,
+            project_id=job.project_id,
+            phase=job.phase,
+            agent_name=agent.name,
+            response_cache=job.response_cache,
+            api_key=job.api_key,
+        ))
+        return await self._stream_agent(agent, {
+            "user_message": task.get("user_message", ""),
+            "project_context": task.get("project_context") or {},
+            "conversation_history": task.get("conversation_history") or [],
+            "user_id": job.user_id,
+        }, stream)
+
+    async def _run_pipeline_job(self, job: _RunningJob, stream: JobStream) -> Dict[str, Any]:
+        """
+        パイプライン実行: 依存関係に沿って複数Phaseを実行し、Phase 2 の生成コードを保存
+
+        出力は各Phaseの進捗行。結果には Phaseごとの所要時間と全体の実行時間を含む。
+        """
+        task = job.task
+        agent = AgentRegistry.get_agent("orchestrator")
+
+        usage_context.set(UsageContext(
+            user_id=job.user_id,
+            project_id=job.project_id,
+            agent_name=agent.name,
+            response_cache=job.response_cache,
+            api_key=job.api_key,
+        ))
+        result = await self._stream_agent(agent, {
+            "mode": "pipeline",
+            "phases": task.get("phases"),
+            "max_concurrency": task.get("max_concurrency"),
+            "user_message": task.get("user_message", ""),
+            "project_context": task.get("project_context") or {},
+            "conversation_history": task.get("conversation_history") or [],
+        }, stream)
+
+        phases = result.get("phases", {})
+        phase2 = phases.get(2)
+        if phase2 and phase2["status"] == PHASE_COMPLETED and result.get("generated_code"):
+            async with AsyncSessionLocal() as db:
+                await project_file_service.bulk_save_generated_files(
+                    db, job.project_id, result["generated_code"]
+                )
+                await db.commit()
+
+        # 生成コードはファイルとして保存済みのため、Phase 2 の結果からも除く。
+        # JSON列に保存するためPhase番号のキーを文字列にする
+        if phase2 and isinstance(phase2.get("result"), dict):
+            phase2 = {
+                **phase2,
+                "result": {key: value for key, value in phase2["result"].items() if key != "generated_code"},
+            }
+            phases = {**phases, 2: phase2}
+        result = {key: value for key, value in result.items() if key != "generated_code"}
+        result["phases"] = {str(phase): entry for phase, entry in phases.items()}
+        return result
+
+    def stats(self) -> Dict[str, Any]:
+        """実行中のジョブ数（全体・ユーザー・Phaseごと）と相乗りした依頼の数"""
+        _, _, users, phases = self._saturated()
+        return {
+            "running": len(self._running),
+            "max_workers": self.max_workers,
+            "by_user": users,
+            "by_phase": phases,
+            "coalesced": self.coalesced,
+        }
+
+
+# シングルトンインスタンス
+_agent_job_queue: Optional[AgentJobQueue] = None
+
+
+def get_agent_job_queue() -> AgentJobQueue:
+    """
+    AgentJobQueueのシングルトンインスタンスを取得
+    """
+    global _agent_job_queue
+    if _agent_job_queue is None:
+        _agent_job_queue = AgentJobQueue()
+    return _agent_job_queue
@@ -0,0 +1,210 @@
+"""
+API使用量ログ書き込みサービス
+
+Claude API呼び出しごとの使用量をメモリ上のキューに積み、
+バックグラウンドタスクがまとめて api_logs に複数行INSERTし、集計テーブルも更新する。
+リクエスト処理中にDBへの書き込みは発生しない。
+"""
+import asyncio
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from datetime import datetime
+from decimal import Decimal
+from typing import Any, Dict, List, Optional
+from sqlalchemy import insert
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+from app.models.models import ApiLog, generate_uuid
+from app.services.usage_rollup_service import apply_rollups
+
+
+@dataclass(frozen=True)
+class UsageContext:
+    """使用量を誰の・どの実行に紐付けるか、どのAPIキーで呼び出すか（API呼び出しの呼び出し元が設定する）"""
+    user_id: str
+    project_id: Optional[str] = None
+    phase: Optional[int] = None
+    agent_name: Optional[str] = None
+    response_cache: bool = True  # Claude APIの応答キャッシュを使うか（users.response_cache_enabled）
+    # ユーザー独自のAPIキー（暗号化済み、users.custom_claude_api_key）。あればこのキーでAPIを呼び出す
+    api_key: Optional[str] = field(default=None, repr=False)
+
+
+# api_logs.cost（円）の保存単位（小数点以下6桁）
+COST_QUANTUM = Decimal("0.000001")
+
+
+# 実行中のリクエストの使用量の紐付け先（未設定の呼び出しは記録しない）
+usage_context: ContextVar[Optional[UsageContext]] = ContextVar("api_usage_context", default=None)
+
+
+class ApiLogWriter:
+    """
+    api_logs へのバッチ書き込み
+
+    - record() はキューに積むだけ（DBアクセスなし・ブロックしない）
+    - バックグラウンドタスクが batch_size 件または flush_interval 秒ごとに1文でINSERT
+    - stop() でキューに残った分をすべて書き込んでから終了する
+    """
+
+    def __init__(
+        self,
+        batch_size: Optional[int] = None,
+        flush_interval: Optional[float] = None,
+        max_queue_size: Optional[int] = None,
+    ):
+        self.batch_size = batch_size or settings.API_LOG_BATCH_SIZE
+        self.flush_interval = flush_interval or settings.API_LOG_FLUSH_INTERVAL_SECONDS
+        self.max_queue_size = max_queue_size or settings.API_LOG_MAX_QUEUE_SIZE
+
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self.written = 0
+        self.dropped = 0
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self):
+        """バックグラウンドの書き込みタスクを開始（lifespanの起動時）"""
+        if self.running:
+            return
+        self._queue = asyncio.Queue(maxsize=self.max_queue_size)
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """キューに残ったログを書き込んでから停止（lifespanのシャットダウン時）"""
+        if not self.running:
+            return
+        await self._queue.put(None)  # 終了の合図
+        await self._task
+        self._task = None
+
+    def record(self, row: Dict[str, Any]):
+        """ログ1件をキューに積む"""
+        if not self.running:
+            return
+        try:
+            self._queue.put_nowait(row)
+        except asyncio.QueueFull:
+            # DBが長時間書き込めない場合はリクエスト処理を止めずに捨てる
+            self.dropped += 1
+            if self.dropped % 1000 == 1:
+                print(f"⚠️ APIログのキューが満杯のため破棄しました（累計 {self.dropped}件）")
+
+    async def _run(self):
+        stopping = False
+        while not stopping:
+            batch: List[Dict[str, Any]] = []
+            item = await self._queue.get()
+            if item is None:
+                stopping = True
+            else:
+                batch.append(item)
+                deadline = asyncio.get_running_loop().time() + self.flush_interval
+                while len(batch) < self.batch_size:
+                    timeout = deadline - asyncio.get_running_loop().time()
+                    if timeout <= 0:
+                        break
+                    try:
+                        item = await asyncio.wait_for(self._queue.get(), timeout)
+                    except asyncio.TimeoutError:
+                        break
+                    if item is None:
+                        stopping = True
+                        break
+                    batch.append(item)
+
+            if stopping:
+                # 残りをすべて取り出す
+                while not self._queue.empty():
+                    item = self._queue.get_nowait()
+                    if item is not None:
+                        batch.append(item)
+
+            for start in range(0, len(batch), self.batch_size):
+                await self._flush(batch[start:start + self.batch_size])
+
+    async def _flush(self, rows: List[Dict[str, Any]]):
+        """複数行INSERTを1文で実行し、集計テーブルを更新（失敗時は1回だけ再試行）"""
+        if not rows:
+            return
+        for attempt in range(2):
+            try:
+                async with AsyncSessionLocal() as db:
+                    await db.execute(insert(ApiLog).values(rows))
+                    # 集計テーブルもログと同じトランザクションで加算
+                    await apply_rollups(db, rows)
+                    await db.commit()
+                self.written += len(rows)
+                return
+            except Exception as e:
+                if attempt == 0:
+                    await asyncio.sleep(1.0)
+                    continue
+                print(f"❌ APIログの書き込みに失敗しました（{len(rows)}件）: {e}")
+
+
+def usage_cost_yen(cost: Dict[str, Any]) -> Decimal:
+    """
+    estimate_cost（USD）を api_logs.cost（円）に換算
+
+    1回の呼び出しは1円未満のことが多いため、円単位に丸めずに保存する（丸めるのは表示時のみ）。
+    """
+    return Decimal(str(cost.get("total_cost", 0.0) * settings.USD_TO_JPY)).quantize(COST_QUANTUM)
+
+
+def record_usage(
+    usage: Optional[Dict[str, int]],
+    model: str,
+    cost: Dict[str, Any],
+    response_cached: bool = False,
+):
+    """
+    Claude API呼び出し1回分の使用量を記録（usage_context未設定なら何もしない）
+
+    Args:
+        usage: APIレスポンスの使用量
+        model: モデル名
+        cost: estimate_cost の結果
+        response_cached: 応答キャッシュから返した（API呼び出しなし）
+    """
+    context = usage_context.get()
+    if context is None or not usage:
+        return
+
+    input_tokens = usage.get("input_tokens", 0) or 0
+    output_tokens = usage.get("output_tokens", 0) or 0
+    cache_read_tokens = usage.get("cache_read_input_tokens", 0) or 0
+    get_api_log_writer().record({
+        "id": generate_uuid(),
+        "user_id": context.user_id,
+        "project_id": context.project_id,
+        "model": model,
+        "input_tokens": input_tokens,
+        "output_tokens": output_tokens,
+        "total_tokens": input_tokens + output_tokens,
+        "cost": usage_cost_yen(cost),
+        # 応答キャッシュのヒットのみ（プロンプトキャッシュの利用は cache_read_tokens / cache_creation_tokens）
+        "cached": response_cached,
+        "cache_creation_tokens": usage.get("cache_creation_input_tokens", 0) or 0,
+        "cache_read_tokens": cache_read_tokens,
+        "phase": context.phase,
+        "agent_name": context.agent_name,
+        "created_at": datetime.utcnow(),
+    })
+
+
+# シングルトンインスタンス
+_api_log_writer: Optional[ApiLogWriter] = None
+
+
+def get_api_log_writer() -> ApiLogWriter:
+    """
+    ApiLogWriterのシングルトンインスタンスを取得
+    """
+    global _api_log_writer
+    if _api_log_writer is None:
+        _api_log_writer = ApiLogWriter()
+    return _api_log_writer
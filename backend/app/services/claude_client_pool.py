@@ -0,0 +1,205 @@
+"""
+ユーザー独自APIキー用の Claude クライアントプール
+
+暗号化済みのAPIキーから AsyncAnthropic クライアントを引き当てて使い回す。
+- 復号は初回（と有効期限切れ後）だけ行い、復号済みキーはクライアント内にだけ保持する
+- 一定時間使われなかったクライアント、作成から一定時間経ったクライアントは破棄する
+- 件数が上限を超えたら最も長く使われていないものから破棄する（LRU）
+- 全クライアントで1つのHTTPコネクションプールを共有する
+  （APIキーはリクエストヘッダーなので接続はキーに依存せず、TLSハンドシェイクを使い回せる）
+"""
+import hashlib
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Callable, Dict, Optional
+import httpx
+from anthropic import AsyncAnthropic
+from app.core.config import settings
+from app.utils.encryption import decrypt_api_key
+
+
+# 期限切れのクライアントをまとめて破棄する間隔（秒）
+_SWEEP_INTERVAL_SECONDS = 1.0
+
+
+def _digest(value: str) -> str:
+    return hashlib.sha256(value.encode()).hexdigest()
+
+
+@dataclass
+class _PooledClient:
+    client: AsyncAnthropic
+    created_at: float
+    last_used_at: float
+
+
+class ClaudeClientPool:
+    """
+    APIキーごとの AsyncAnthropic クライアントプール
+
+    キーは平文ではなくSHA-256のフィンガープリントで管理する。
+    同じキーを別々に暗号化した値（ユーザーが同じキーを再登録した場合など）も同じクライアントを使う。
+    """
+
+    def __init__(
+        self,
+        max_entries: Optional[int] = None,
+        idle_timeout: Optional[float] = None,
+        max_lifetime: Optional[float] = None,
+        http_client: Optional[httpx.AsyncClient] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        """
+        Args:
+            max_entries: 保持するクライアントの最大数
+            idle_timeout: 使われないまま経過したら破棄する秒数
+            max_lifetime: 作成から経過したら破棄する秒数（復号済みキーを保持する上限）
+            http_client: 共有するHTTPクライアント（Noneの場合は初回利用時に作成）
+            clock: 現在時刻（秒）を返す関数
+        """
+        self.max_entries = max_entries or settings.CLAUDE_USER_CLIENT_MAX_ENTRIES
+        self.idle_timeout = idle_timeout or settings.CLAUDE_USER_CLIENT_IDLE_SECONDS
+        self.max_lifetime = max_lifetime or settings.CLAUDE_USER_CLIENT_MAX_LIFETIME_SECONDS
+        self._http_client = http_client
+        self._clock = clock
+
+        # キーのフィンガープリント → クライアント（LRU順）
+        self._clients: "OrderedDict[str, _PooledClient]" = OrderedDict()
+        # 暗号化済みキーのダイジェスト → キーのフィンガープリント（復号を省くため）
+        self._index: Dict[str, str] = {}
+        self._next_sweep = 0.0
+
+        self.hits = 0
+        self.created = 0
+        self.evicted = 0
+
+    def get(self, encrypted_key: str) -> Optional[AsyncAnthropic]:
+        """
+        暗号化済みAPIキーに対応するクライアントを取得（なければ復号して作成）
+
+        Returns:
+            AsyncAnthropic（復号できない場合はNone）
+        """
+        if not encrypted_key:
+            return None
+
+        now = self._clock()
+        if now >= self._next_sweep:
+            self._sweep(now)
+
+        lookup = _digest(encrypted_key)
+        fingerprint = self._index.get(lookup)
+        entry = self._clients.get(fingerprint) if fingerprint else None
+        if entry is not None and self._expired(entry, now):
+            self._drop(fingerprint)
+            entry = None
+
+        if entry is None:
+            api_key = decrypt_api_key(encrypted_key)
+            if not api_key:
+                return None
+            fingerprint = _digest(api_key)
+            entry = self._clients.get(fingerprint)
+            if entry is None:
+                entry = _PooledClient(client=self._create_client(api_key), created_at=now, last_used_at=now)
+                self._clients[fingerprint] = entry
+                self.created += 1
+            self._index[lookup] = fingerprint
+        else:
+            self.hits += 1
+
+        entry.last_used_at = now
+        self._clients.move_to_end(fingerprint)
+        while len(self._clients) > self.max_entries:
+            self._drop(next(iter(self._clients)))
+        return entry.client
+
+    def _create_client(self, api_key: str) -> AsyncAnthropic:
+        if self._http_client is None:
+            self._http_client = httpx.AsyncClient(
+                limits=httpx.Limits(
+                    max_connections=settings.CLAUDE_MAX_CONNECTIONS,
+                    max_keepalive_connections=settings.CLAUDE_MAX_KEEPALIVE_CONNECTIONS,
+                ),
+                timeout=httpx.Timeout(settings.CLAUDE_TIMEOUT_SECONDS, connect=10.0),
+            )
+        return AsyncAnthropic(
+            api_key=api_key,
+            http_client=self._http_client,
+            timeout=settings.CLAUDE_TIMEOUT_SECONDS,
+            max_retries=settings.CLAUDE_MAX_RETRIES,
+        )
+
+    def _expired(self, entry: _PooledClient, now: float) -> bool:
+        return (
+            now - entry.last_used_at >= self.idle_timeout
+            or now - entry.created_at >= self.max_lifetime
+        )
+
+    def _sweep(self, now: float):
+        """期限切れのクライアントを破棄"""
+        for fingerprint in [fp for fp, entry in self._clients.items() if self._expired(entry, now)]:
+            self._drop(fingerprint)
+        self._next_sweep = now + _SWEEP_INTERVAL_SECONDS
+
+    def _drop(self, fingerprint: str):
+        """
+        クライアントを破棄（参照がなくなれば復号済みキーもメモリから消える）
+
+        HTTPクライアントは共有しているため close() は呼ばない。
+        実行中のリクエストは手元の参照で最後まで完了する。
+        """
+        if self._clients.pop(fingerprint, None) is None:
+            return
+        for lookup in [lookup for lookup, fp in self._index.items() if fp == fingerprint]:
+            del self._index[lookup]
+        self.evicted += 1
+
+    def clear(self):
+        """すべてのクライアントを破棄"""
+        for fingerprint in list(self._clients):
+            self._drop(fingerprint)
+
+    async def aclose(self):
+        """クライアントを破棄し、共有のコネクションプールを閉じる（lifespanのシャットダウン時）"""
+        self.clear()
+        if self._http_client is not None:
+            await self._http_client.aclose()
+            self._http_client = None
+
+    def __len__(self) -> int:
+        return len(self._clients)
+
+    def stats(self) -> dict:
+        """件数・再利用回数・作成数・破棄数"""
+        return {
+            "entries": len(self._clients),
+            "hits": self.hits,
+            "created": self.created,
+            "evicted": self.evicted,
+        }
+
+
+# シングルトンインスタンス
+_claude_client_pool: Optional[ClaudeClientPool] = None
+
+
+def get_claude_client_pool() -> ClaudeClientPool:
+    """
+    ClaudeClientPoolのシングルトンインスタンスを取得
+    """
+    global _claude_client_pool
+    if _claude_client_pool is None:
+        _claude_client_pool = ClaudeClientPool()
+    return _claude_client_pool
+
+
+async def close_claude_client_pool():
+    """
+    シングルトンのクライアントプールを閉じる（lifespanのシャットダウン時）
+    """
+    global _claude_client_pool
+    if _claude_client_pool is not None:
+        await _claude_client_pool.aclose()
+        _claude_client_pool = None
@@ -7,7 +7,10 @@ import os
 from typing import AsyncGenerator, Optional
 from anthropic import Anthropic, AsyncAnthropic
 from app.core.config import settings
-from app.utils.encryption import decrypt_api_key
+from app.services.claude_client_pool import get_claude_client_pool
+from app.agents.claude_client import estimate_cost
+from app.agents.prompt_layout import build_prompt_request
+from app.services.api_log_service import record_usage
 
 
 class ClaudeService:
@@ -41,43 +44,26 @@ class ClaudeService:
             AIの応答テキスト（トークン単位）
         """
         try:
-            # ユーザー独自のAPIキーがある場合は使用
-            client = self.client
-            if user_api_key:
-                decrypted_key = decrypt_api_key(user_api_key)
-                if decrypted_key:
-                    client = AsyncAnthropic(api_key=decrypted_key)
+            client = self._client_for(user_api_key)
 
             # プロンプトキャッシング対応
-            # システムプロンプトをキャッシュブロックとして設定
-            system_blocks = [
-                {
-                    "type": "text",
-                    "text": system_prompt,
-                }
-            ]
-
-            # キャッシュを有効にする場合、cache_controlを追加
-            if use_cache and len(system_prompt) > 1024:  # 長いプロンプトのみキャッシュ
-                system_blocks[0]["cache_control"] = {"type": "ephemeral"}
-
-            # メッセージ履歴が長い場合、過去のメッセージもキャッシュ
-            processed_messages = messages.copy()
-            if use_cache and len(processed_messages) > 2:
-                # 最後から2番目のメッセージにキャッシュマーカーを追加
-                # （最新メッセージは変わるのでキャッシュしない）
-                if len(processed_messages) >= 2:
-                    processed_messages[-2]["cache_control"] = {"type": "ephemeral"}
+            # システムプロンプトと今回の発言より前の履歴（固定された接頭辞）にブレークポイントを置く
+            layout = build_prompt_request(system_prompt, messages, use_cache=use_cache, cache_history=True)
 
             # Claude APIにストリーミングリクエスト
             async with client.messages.stream(
                 model=self.model,
                 max_tokens=max_tokens,
-                system=system_blocks,
-                messages=processed_messages,
+                system=layout.system,
+                messages=layout.messages,
             ) as stream:
                 async for text in stream.text_stream:
                     yield text
+                final_message = await stream.get_final_message()
+
+            # 使用量をAPIログのキューに積む
+            usage = self.get_usage_info(final_message)
+            record_usage(usage, self.model, estimate_cost(usage))
 
         except Exception as e:
             # エラーハンドリング
@@ -105,20 +91,19 @@ class ClaudeService:
             AIの応答テキスト（完全版）
         """
         try:
-            # ユーザー独自のAPIキーがある場合は使用
-            client = self.client
-            if user_api_key:
-                decrypted_key = decrypt_api_key(user_api_key)
-                if decrypted_key:
-                    client = AsyncAnthropic(api_key=decrypted_key)
+            client = self._client_for(user_api_key)
+            layout = build_prompt_request(system_prompt, messages, cache_history=True)
 
             response = await client.messages.create(
                 model=self.model,
                 max_tokens=max_tokens,
-                system=system_prompt,
-                messages=messages,
+                system=layout.system,
+                messages=layout.messages,
             )
 
+            usage = self.get_usage_info(response)
+            record_usage(usage, self.model, estimate_cost(usage))
+
             # テキストコンテンツを抽出
             return response.content[0].text if response.content else ""
 
@@ -127,6 +112,16 @@ class ClaudeService:
             print(error_message)
             return f"[エラー: {error_message}]"
 
+    def _client_for(self, user_api_key: Optional[str]) -> AsyncAnthropic:
+        """
+        ユーザー独自のAPIキーがあればプールからそのキーのクライアントを、なければ共通のクライアントを返す
+        """
+        if user_api_key:
+            client = get_claude_client_pool().get(user_api_key)
+            if client is not None:
+                return client
+        return self.client
+
     def get_usage_info(self, response) -> dict:
         """
         API使用量情報を取得
@@ -141,6 +136,8 @@ class ClaudeService:
             return {
                 'input_tokens': response.usage.input_tokens,
                 'output_tokens': response.usage.output_tokens,
+                'cache_creation_input_tokens': getattr(response.usage, 'cache_creation_input_tokens', 0) or 0,
+                'cache_read_input_tokens': getattr(response.usage, 'cache_read_input_tokens', 0) or 0,
                 'model': self.model,
             }
         return {
@@ -0,0 +1,119 @@
+"""
+チャット履歴取得サービス
+
+(created_at, id) のキーセットページネーションでメッセージを取得する。
+件数が増えても1ページ分の行しか読まない。
+"""
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy import func, select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.models.models import Message
+from app.utils.pagination import decode_cursor, encode_cursor
+
+
+def message_cursor(message: Message) -> str:
+    """メッセージの位置を表すカーソル"""
+    return encode_cursor(message.created_at, message.id)
+
+
+async def list_messages(
+    db: AsyncSession,
+    project_id: str,
+    limit: int,
+    phase: Optional[int] = None,
+    before: Optional[str] = None,
+    since: Optional[str] = None,
+) -> Tuple[List[Message], bool]:
+    """
+    メッセージを1ページ取得（古い順で返す）
+
+    - since 指定時: カーソルより新しいメッセージを古い順に limit 件（差分更新用）
+    - それ以外: before（省略時は最新）より古いメッセージのうち新しい方から limit 件
+
+    Args:
+        db: DBセッション
+        project_id: プロジェクトID
+        limit: 1ページの件数
+        phase: Phaseで絞り込む場合に指定
+        before: このカーソルより古いページを取得
+        since: このカーソルより新しいメッセージを取得
+
+    Returns:
+        (メッセージ一覧, 続きがあるかどうか)
+
+    Raises:
+        ValueError: カーソルの形式が不正な場合
+    """
+    position = tuple_(Message.created_at, Message.id)
+    query = select(Message).where(Message.project_id == project_id)
+    if phase is not None:
+        query = query.where(Message.phase == phase)
+
+    if since:
+        query = query.where(position > tuple_(*decode_cursor(since)))
+        query = query.order_by(Message.created_at, Message.id)
+    else:
+        if before:
+            query = query.where(position < tuple_(*decode_cursor(before)))
+        query = query.order_by(Message.created_at.desc(), Message.id.desc())
+
+    # 1件多く読んで続きの有無を判定
+    messages = list((await db.scalars(query.limit(limit + 1))).all())
+    has_more = len(messages) > limit
+    messages = messages[:limit]
+    if not since:
+        messages.reverse()
+    return messages, has_more
+
+
+async def count_messages(db: AsyncSession, project_id: str, phase: Optional[int] = None) -> int:
+    """
+    メッセージ数を取得
+    """
+    query = select(func.count()).select_from(Message).where(Message.project_id == project_id)
+    if phase is not None:
+        query = query.where(Message.phase == phase)
+    return await db.scalar(query)
+
+
+async def message_phases(db: AsyncSession, project_id: str) -> List[int]:
+    """
+    メッセージのあるPhase（昇順）
+
+    再帰CTEで「次に大きいPhase」をインデックスから1件ずつ読む（ループするインデックススキャン）。
+    読む行数はメッセージ数ではなくPhase数に比例する。
+    """
+    def next_phase(after):
+        return (
+            select(func.min(Message.phase))
+            .where(Message.project_id == project_id, Message.phase > after)
+            .scalar_subquery()
+        )
+
+    phases = select(
+        select(func.min(Message.phase)).where(Message.project_id == project_id).scalar_subquery().label("phase")
+    ).cte("phases", recursive=True)
+    phases = phases.union_all(
+        select(next_phase(phases.c.phase).label("phase")).where(phases.c.phase.is_not(None))
+    )
+    return list((await db.scalars(select(phases.c.phase).where(phases.c.phase.is_not(None)))).all())
+
+
+async def latest_messages_by_phase(
+    db: AsyncSession,
+    project_id: str,
+    limit: int,
+) -> Dict[int, Tuple[List[Message], bool]]:
+    """
+    Phaseごとの最新ページを取得（プロジェクト詳細用）
+
+    Phaseごとに ORDER BY created_at DESC, id DESC LIMIT limit+1 で読むため、
+    履歴が増えても読む行数は (Phase数 × ページの件数) に収まる。
+
+    Returns:
+        {phase: (古い順のメッセージ一覧, より古いメッセージがあるかどうか)}
+    """
+    return {
+        phase: await list_messages(db, project_id, limit, phase=phase)
+        for phase in await message_phases(db, project_id)
+    }
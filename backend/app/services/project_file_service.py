@@ -0,0 +1,435 @@
+"""
+プロジェクトファイル保存サービス
+
+ファイル内容はSHA-256をキーにfile_blobsへ1件だけ保存し（重複排除）、
+ProjectFileはcontent_hashでそれを参照する。
+保存時はハッシュを比較し、内容が変わったファイルだけを書き込む。
+同じプロジェクトへの書き込みは projects の行ロックで直列化する
+（保存済みのハッシュを読んでから書き込むまでに他の保存が挟まると ref_count がずれるため）。
+blobはプロジェクト間で共有されるため、参照を増減するblobの行もハッシュ順にロックしてから読む
+（他のプロジェクトが参照を解放して削除したblobを、存在するものとして参照しないため）。
+"""
+import hashlib
+from collections import Counter
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+from sqlalchemy import delete, exists, func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload
+from app.core.config import settings
+from app.core.database import upsert_insert
+from app.models.models import FileBlob, Project, ProjectFile, generate_uuid
+
+try:
+    import zstandard
+except ImportError:  # 圧縮は任意（未インストールなら無圧縮で保存）
+    zstandard = None
+
+
+# 拡張子 → エディタの言語
+LANGUAGE_BY_EXTENSION = {
+    ".tsx": "typescript",
+    ".ts": "typescript",
+    ".jsx": "javascript",
+    ".js": "javascript",
+    ".css": "css",
+    ".json": "json",
+    ".html": "html",
+    ".py": "python",
+    ".txt": "plaintext",
+}
+
+
+def detect_language(file_path: str) -> Optional[str]:
+    """
+    ファイルパスの拡張子から言語を推定
+    """
+    for extension, language in LANGUAGE_BY_EXTENSION.items():
+        if file_path.endswith(extension):
+            return language
+    return None
+
+
+def compute_content_hash(content: str) -> str:
+    """
+    ファイル内容のSHA-256ハッシュ（blobのキー）
+    """
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+
+# === Blob encoding ===
+
+
+def _encode(content: str) -> Tuple[bytes, Optional[str]]:
+    """内容をblobに保存する形式に変換（圧縮した方が小さい場合のみ圧縮）"""
+    raw = content.encode("utf-8")
+    if (
+        settings.FILE_BLOB_COMPRESSION == "zstd"
+        and zstandard is not None
+        and len(raw) >= settings.FILE_BLOB_COMPRESSION_MIN_BYTES
+    ):
+        compressed = zstandard.ZstdCompressor(level=settings.FILE_BLOB_ZSTD_LEVEL).compress(raw)
+        if len(compressed) < len(raw):
+            return compressed, "zstd"
+    return raw, None
+
+
+def decode_blob(blob: FileBlob) -> str:
+    """blobの内容を文字列に戻す"""
+    if blob.compression == "zstd":
+        if zstandard is None:
+            raise RuntimeError("zstd圧縮されたファイルを読むには zstandard が必要です")
+        return zstandard.ZstdDecompressor().decompress(blob.data).decode("utf-8")
+    return blob.data.decode("utf-8")
+
+
+def read_content(file: ProjectFile) -> str:
+    """
+    ProjectFileの内容を取得（blobは joinedload(ProjectFile.blob) で読み込み済みであること）
+    """
+    if file.content_hash is None:
+        # file_blobs移行前の行
+        return file.legacy_content
+    return decode_blob(file.blob)
+
+
+# === Blob storage ===
+
+
+async def _lock_blobs(db: AsyncSession, hashes: Iterable[str]) -> Set[str]:
+    """
+    blobの行をコミットまでロックし（SELECT ... FOR UPDATE）、存在するハッシュを返す
+
+    デッドロックしないよう、1つのトランザクションで増減するblobはまとめてハッシュ順にロックする。
+    """
+    hashes = sorted(set(hashes))
+    if not hashes:
+        return set()
+    return set((await db.scalars(
+        select(FileBlob.hash).where(FileBlob.hash.in_(hashes)).order_by(FileBlob.hash).with_for_update()
+    )).all())
+
+
+async def _store_blobs(
+    db: AsyncSession,
+    contents: Dict[str, str],
+    references: Counter,
+    existing: Optional[Set[str]] = None,
+):
+    """
+    参照が増えるblobを保存し、ref_countを加算する
+
+    既存のblobはref_countの更新のみ。新しい内容だけをエンコードして挿入する。
+
+    Args:
+        existing: _lock_blobs でロック済みの場合、その結果（省略時はここでロックする）
+    """
+    hashes = list(references)
+    if existing is None:
+        existing = await _lock_blobs(db, hashes)
+
+    new_rows = []
+    for content_hash in hashes:
+        if content_hash in existing:
+            continue
+        data, compression = _encode(contents[content_hash])
+        new_rows.append({
+            "hash": content_hash,
+            "data": data,
+            "compression": compression,
+            "size": len(contents[content_hash].encode("utf-8")),
+            "ref_count": references[content_hash],
+            "created_at": datetime.utcnow(),
+        })
+
+    if new_rows:
+        statement = upsert_insert(db)(FileBlob).values(new_rows)
+        # 同時に同じ内容が保存された場合は参照数だけ加算
+        statement = statement.on_conflict_do_update(
+            index_elements=[FileBlob.hash],
+            set_={"ref_count": FileBlob.ref_count + statement.excluded.ref_count},
+        )
+        await db.execute(statement)
+
+    await _adjust_ref_counts(db, Counter({h: references[h] for h in hashes if h in existing}))
+
+
+async def _adjust_ref_counts(db: AsyncSession, deltas: Counter):
+    """
+    ref_countを増減する（増減量ごとに1文）。参照がなくなったblobは削除する
+    """
+    await _lock_blobs(db, [content_hash for content_hash, delta in deltas.items() if delta])
+    by_delta: Dict[int, List[str]] = {}
+    for content_hash, delta in deltas.items():
+        if delta:
+            by_delta.setdefault(delta, []).append(content_hash)
+
+    for delta, hashes in by_delta.items():
+        await db.execute(
+            update(FileBlob)
+            .where(FileBlob.hash.in_(hashes))
+            .values(ref_count=FileBlob.ref_count + delta)
+            .execution_options(synchronize_session=False)
+        )
+
+    released = [content_hash for content_hash, delta in deltas.items() if delta < 0]
+    if released:
+        await collect_unreferenced_blobs(db, released)
+
+
+async def collect_unreferenced_blobs(db: AsyncSession, hashes: Iterable[str]) -> int:
+    """
+    参照を解放したblobのうち、どのProjectFileからも参照されていないものを削除
+
+    Args:
+        db: DBセッション
+        hashes: 参照を解放したハッシュ（ref_count が0以下になったものだけ削除する）
+
+    Returns:
+        削除したblob数
+    """
+    result = await db.execute(
+        delete(FileBlob)
+        .where(
+            FileBlob.hash.in_(list(hashes)),
+            FileBlob.ref_count <= 0,
+            ~exists().where(ProjectFile.content_hash == FileBlob.hash),
+        )
+        .execution_options(synchronize_session=False)
+    )
+    return result.rowcount
+
+
+async def sweep_blobs(db: AsyncSession, batch_size: int = 1000) -> Tuple[int, int]:
+    """
+    全blobの ref_count を実際の参照数で数え直し、参照されていないblobを削除（メンテナンス用）
+
+    ユーザー・プロジェクトをORMのカスケードで削除すると ProjectFile だけが消え、
+    ref_count が減らされないblobが残るため、その掃除に使う（scripts/sweep_file_blobs.py）。
+    batch_size 件ずつハッシュ順にロックして処理し、バッチごとにコミットする
+    （保存・削除と同じロックを取るため、アプリケーションの稼働中に実行してよい）。
+
+    Returns:
+        (ref_count を直したblob数, 削除したblob数)
+    """
+    references = (
+        select(func.count(ProjectFile.id))
+        .where(ProjectFile.content_hash == FileBlob.hash)
+        .scalar_subquery()
+    )
+    fixed = deleted = 0
+    last_hash = ""
+    while True:
+        hashes = (await db.scalars(
+            select(FileBlob.hash).where(FileBlob.hash > last_hash).order_by(FileBlob.hash).limit(batch_size)
+        )).all()
+        if not hashes:
+            return fixed, deleted
+        last_hash = hashes[-1]
+
+        await _lock_blobs(db, hashes)
+        result = await db.execute(
+            update(FileBlob)
+            .where(FileBlob.hash.in_(hashes), FileBlob.ref_count != references)
+            .values(ref_count=references)
+            .execution_options(synchronize_session=False)
+        )
+        fixed += result.rowcount
+        deleted += await collect_unreferenced_blobs(db, hashes)
+        await db.commit()
+
+
+# === Project files ===
+
+
+async def _lock_project_files(db: AsyncSession, project_id: str):
+    """
+    プロジェクトのファイルへの書き込みをコミットまで排他する（SELECT ... FOR UPDATE）
+
+    ファイルの行ではなくプロジェクトの行をロックし、まだ存在しないパスへの保存も直列化する。
+    SQLiteでは FOR UPDATE は出力されない（排他されるのはPostgreSQLのみ）。
+    """
+    await db.execute(select(Project.id).where(Project.id == project_id).with_for_update())
+
+
+async def get_project_file(db: AsyncSession, project_id: str, file_path: str) -> Optional[ProjectFile]:
+    """
+    内容（blob）込みでファイルを1件取得
+    """
+    return await db.scalar(
+        select(ProjectFile)
+        .options(joinedload(ProjectFile.blob))
+        .where(
+            ProjectFile.project_id == project_id,
+            ProjectFile.file_path == file_path,
+        )
+    )
+
+
+async def save_file(
+    db: AsyncSession,
+    project_id: str,
+    file_path: str,
+    content: str,
+    language: Optional[str] = None,
+) -> Tuple[ProjectFile, bool]:
+    """
+    ファイルを1件保存（新規作成または更新）
+
+    内容のハッシュが保存済みのものと同じ場合はblobに触れない。
+    コミットは呼び出し側で行う。
+
+    Returns:
+        (ProjectFile, 新規作成したかどうか)
+    """
+    content_hash = compute_content_hash(content)
+    await _lock_project_files(db, project_id)
+    file = await db.scalar(
+        select(ProjectFile).where(
+            ProjectFile.project_id == project_id,
+            ProjectFile.file_path == file_path,
+        )
+    )
+
+    if file is None:
+        await _store_blobs(db, {content_hash: content}, Counter({content_hash: 1}))
+        file = ProjectFile(
+            project_id=project_id,
+            file_path=file_path,
+            content_hash=content_hash,
+            language=language,
+        )
+        db.add(file)
+        return file, True
+
+    if file.content_hash != content_hash:
+        existing = await _lock_blobs(db, [content_hash, file.content_hash] if file.content_hash else [content_hash])
+        await _store_blobs(db, {content_hash: content}, Counter({content_hash: 1}), existing)
+        previous_hash = file.content_hash
+        file.content_hash = content_hash
+        file.legacy_content = None
+        file.updated_at = datetime.utcnow()
+        await db.flush()
+        if previous_hash:
+            await _adjust_ref_counts(db, Counter({previous_hash: -1}))
+    if language and language != file.language:
+        file.language = language
+        file.updated_at = datetime.utcnow()
+    return file, False
+
+
+async def bulk_save_generated_files(
+    db: AsyncSession,
+    project_id: str,
+    generated_code: Dict[str, Dict[str, str]],
+) -> int:
+    """
+    生成されたファイルツリーを一括保存
+
+    保存済みのハッシュと比較し、変わったファイルだけを
+    INSERT ... ON CONFLICT (project_id, file_path) DO UPDATE の1文で書き込む。
+    コミットは呼び出し側で行う。
+
+    Args:
+        db: DBセッション
+        project_id: プロジェクトID
+        generated_code: {"frontend": {path: content}, "backend": {path: content}}
+
+    Returns:
+        新規作成または更新された行数
+    """
+    files: Dict[str, str] = {}
+    for section in ("frontend", "backend"):
+        for file_path, content in generated_code.get(section, {}).items():
+            files[f"{section}/{file_path}"] = content
+    if not files:
+        return 0
+
+    # 保存済みのハッシュとの差分から ref_count の増減を求めるため、読む前にロックする
+    await _lock_project_files(db, project_id)
+    saved_hashes = dict((await db.execute(
+        select(ProjectFile.file_path, ProjectFile.content_hash).where(
+            ProjectFile.project_id == project_id,
+            ProjectFile.file_path.in_(list(files)),
+        )
+    )).all())
+
+    now = datetime.utcnow()
+    rows: List[dict] = []
+    contents: Dict[str, str] = {}
+    references: Counter = Counter()
+    released: Counter = Counter()
+    for file_path, content in files.items():
+        content_hash = compute_content_hash(content)
+        previous_hash = saved_hashes.get(file_path)
+        if previous_hash == content_hash:
+            continue
+        contents[content_hash] = content
+        references[content_hash] += 1
+        if previous_hash:
+            released[previous_hash] -= 1
+        rows.append({
+            "id": generate_uuid(),
+            "project_id": project_id,
+            "file_path": file_path,
+            "content": None,
+            "content_hash": content_hash,
+            "language": detect_language(file_path),
+            "created_at": now,
+            "updated_at": now,
+        })
+
+    if not rows:
+        return 0
+
+    # 増やす・減らすblobをまとめてロックしてから書き込む
+    existing = await _lock_blobs(db, list(references) + list(released))
+    await _store_blobs(db, contents, references, existing)
+
+    statement = upsert_insert(db)(ProjectFile).values(rows)
+    statement = statement.on_conflict_do_update(
+        index_elements=[ProjectFile.project_id, ProjectFile.file_path],
+        set_={
+            "content": None,
+            "content_hash": statement.excluded.content_hash,
+            "language": statement.excluded.language,
+            "updated_at": statement.excluded.updated_at,
+        },
+    )
+    result = await db.execute(statement)
+
+    await _adjust_ref_counts(db, released)
+    return result.rowcount
+
+
+async def delete_file(db: AsyncSession, file: ProjectFile):
+    """
+    ファイルを削除し、blobの参照を解放する
+    """
+    await _lock_project_files(db, file.project_id)
+    # ロックを待つ間に他の保存で内容が変わっている場合がある
+    await db.refresh(file, attribute_names=["content_hash"])
+    content_hash = file.content_hash
+    await db.delete(file)
+    await db.flush()
+    if content_hash:
+        await _adjust_ref_counts(db, Counter({content_hash: -1}))
+
+
+async def delete_project_files(db: AsyncSession, project_id: str):
+    """
+    プロジェクトの全ファイルを削除し、blobの参照を解放する（プロジェクト削除前に呼ぶ）
+    """
+    await _lock_project_files(db, project_id)
+    rows = (await db.execute(
+        select(ProjectFile.content_hash, func.count())
+        .where(ProjectFile.project_id == project_id, ProjectFile.content_hash.isnot(None))
+        .group_by(ProjectFile.content_hash)
+    )).all()
+
+    await db.execute(
+        delete(ProjectFile)
+        .where(ProjectFile.project_id == project_id)
+        .execution_options(synchronize_session=False)
+    )
+    await _adjust_ref_counts(db, Counter({content_hash: -count for content_hash, count in rows}))
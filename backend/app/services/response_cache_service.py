@@ -0,0 +1,225 @@
+"""
+Claude API 応答キャッシュ
+
+同じ入力（モデル・Phase・システムプロンプト・会話履歴・temperature・max_tokens）に対する
+Claude APIの応答を保持し、API呼び出しを省略する。
+- 完全一致: 正規化（Unicode NFKC・空白の連続を1つに）した入力のハッシュで検索。ユーザー間で共有する
+- 類似一致（RESPONSE_CACHE_SIMILARITY_ENABLED）: 最後の発言以外が同じで、最後の発言の
+  文字n-gramのコサイン類似度がしきい値以上の応答を再利用する。他のユーザーの発言内容を
+  含む応答を返さないよう、同じユーザーの応答に限る
+- 件数上限（LRU）と有効期限付き。ユーザーごとに無効にできる（users.response_cache_enabled）
+"""
+import hashlib
+import json
+import math
+import re
+import time
+import unicodedata
+from collections import Counter, deque
+from dataclasses import dataclass
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+from app.core.config import settings
+from app.utils.cache import TTLCache
+
+
+NGRAM_SIZE = 3
+
+_WHITESPACE = re.compile(r"\s+")
+_NON_WORD = re.compile(r"[\W_]+")
+
+
+@dataclass(frozen=True)
+class CachedResponse:
+    """保持する応答"""
+    content: str
+    model: str
+    stop_reason: Optional[str]
+
+
+@dataclass(frozen=True)
+class ResponseCacheKey:
+    """1回のAPI呼び出しのキャッシュキー"""
+    exact: str  # 入力全体のハッシュ
+    context: str  # 最後の発言を除いた入力のハッシュ（類似一致の検索範囲）
+    last_message: str  # 正規化した最後の発言
+    user_id: Optional[str] = None
+
+
+def normalize_text(text: str) -> str:
+    """キャッシュキー用の正規化（全角・半角の統一、空白の連続を1つに）"""
+    return _WHITESPACE.sub(" ", unicodedata.normalize("NFKC", text)).strip()
+
+
+def _message_text(content: Any) -> str:
+    """
+    メッセージの content（文字列またはブロックのリスト）をキー用の文字列にする
+
+    テキストブロックは本文だけを使う（cache_control の位置が違っても同じ入力とみなす）。
+    """
+    if isinstance(content, str):
+        return normalize_text(content)
+    parts = []
+    for block in content:
+        if isinstance(block, dict) and block.get("type") == "text":
+            parts.append(normalize_text(block.get("text", "")))
+        else:
+            parts.append(json.dumps(block, ensure_ascii=False, sort_keys=True))
+    return "\n".join(parts)
+
+
+def _digest(*parts: Any) -> str:
+    return hashlib.sha256(json.dumps(parts, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+
+def _ngrams(text: str) -> Tuple[Counter, float]:
+    """文字n-gramの出現数とノルム（空白・句読点・記号は除く）"""
+    text = _NON_WORD.sub("", text.lower())
+    if len(text) < NGRAM_SIZE:
+        grams = Counter([text]) if text else Counter()
+    else:
+        grams = Counter(text[i:i + NGRAM_SIZE] for i in range(len(text) - NGRAM_SIZE + 1))
+    return grams, math.sqrt(sum(count * count for count in grams.values()))
+
+
+def similarity(left: Tuple[Counter, float], right: Tuple[Counter, float]) -> float:
+    """文字n-gramのコサイン類似度（0.0-1.0）"""
+    left_grams, left_norm = left
+    right_grams, right_norm = right
+    if not left_norm or not right_norm:
+        return 0.0
+    if len(left_grams) > len(right_grams):
+        left_grams, right_grams = right_grams, left_grams
+    dot = sum(count * right_grams.get(gram, 0) for gram, count in left_grams.items())
+    return dot / (left_norm * right_norm)
+
+
+class ResponseCache:
+    """
+    完全一致 + 類似一致の2段の応答キャッシュ
+    """
+
+    def __init__(
+        self,
+        max_entries: Optional[int] = None,
+        ttl: Optional[float] = None,
+        similarity_enabled: Optional[bool] = None,
+        similarity_threshold: Optional[float] = None,
+        similarity_candidates: Optional[int] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.enabled = settings.RESPONSE_CACHE_ENABLED
+        self.max_entries = settings.RESPONSE_CACHE_MAX_ENTRIES if max_entries is None else max_entries
+        self.ttl = settings.RESPONSE_CACHE_TTL_SECONDS if ttl is None else ttl
+        self.similarity_enabled = (
+            settings.RESPONSE_CACHE_SIMILARITY_ENABLED if similarity_enabled is None else similarity_enabled
+        )
+        self.similarity_threshold = similarity_threshold or settings.RESPONSE_CACHE_SIMILARITY_THRESHOLD
+        self.similarity_candidates = similarity_candidates or settings.RESPONSE_CACHE_SIMILARITY_CANDIDATES
+
+        # 完全一致: exact → 応答
+        self._exact: TTLCache[CachedResponse] = TTLCache(max_entries=self.max_entries, ttl=self.ttl, clock=clock)
+        # 類似一致: (ユーザー, context) → 直近の (exact, 最後の発言のn-gram)
+        self._similar: TTLCache[Deque[Tuple[str, Tuple[Counter, float]]]] = TTLCache(
+            max_entries=self.max_entries, ttl=self.ttl, clock=clock
+        )
+
+        self.exact_hits = 0
+        self.similar_hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.bypassed = 0  # ユーザーが無効にしていたため使わなかった回数
+
+    def make_key(
+        self,
+        model: str,
+        system_prompt: Optional[str],
+        messages: List[Dict[str, Any]],
+        temperature: float,
+        max_tokens: int,
+        phase: Optional[int] = None,
+        user_id: Optional[str] = None,
+    ) -> ResponseCacheKey:
+        """API呼び出しの入力からキャッシュキーを作る"""
+        history = [(message.get("role"), _message_text(message.get("content", ""))) for message in messages]
+        last_message = history[-1][1] if history else ""
+        context = _digest(
+            model, phase, normalize_text(system_prompt or ""), temperature, max_tokens, history[:-1]
+        )
+        return ResponseCacheKey(
+            exact=_digest(context, last_message),
+            context=context,
+            last_message=last_message,
+            user_id=user_id,
+        )
+
+    def get(self, key: ResponseCacheKey) -> Optional[CachedResponse]:
+        """キャッシュ済みの応答（完全一致 → 類似一致の順に検索）"""
+        response = self._exact.get(key.exact)
+        if response is not None:
+            self.exact_hits += 1
+            return response
+
+        if self.similarity_enabled and key.user_id is not None:
+            candidates = self._similar.get((key.user_id, key.context))
+            if candidates:
+                grams = _ngrams(key.last_message)
+                best_key, best_score = None, self.similarity_threshold
+                for exact, candidate_grams in candidates:
+                    score = similarity(grams, candidate_grams)
+                    if score >= best_score:
+                        best_key, best_score = exact, score
+                if best_key is not None:
+                    response = self._exact.get(best_key)
+                    if response is not None:
+                        self.similar_hits += 1
+                        return response
+
+        self.misses += 1
+        return None
+
+    def set(self, key: ResponseCacheKey, response: CachedResponse):
+        """応答を保持"""
+        self._exact.set(key.exact, response)
+        self.stores += 1
+        if self.similarity_enabled and key.user_id is not None:
+            similar_key = (key.user_id, key.context)
+            candidates = self._similar.get(similar_key)
+            if candidates is None:
+                candidates = deque(maxlen=self.similarity_candidates)
+                self._similar.set(similar_key, candidates)
+            candidates.append((key.exact, _ngrams(key.last_message)))
+
+    def record_bypass(self):
+        self.bypassed += 1
+
+    def clear(self):
+        """すべての応答を破棄（ヒット数等はそのまま）"""
+        self._exact.clear()
+        self._similar.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """件数・段ごとのヒット数・ヒット率"""
+        lookups = self.exact_hits + self.similar_hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "entries": len(self._exact),
+            "max_entries": self.max_entries,
+            "exact_hits": self.exact_hits,
+            "similar_hits": self.similar_hits,
+            "misses": self.misses,
+            "hit_rate": round((self.exact_hits + self.similar_hits) / lookups, 4) if lookups else 0.0,
+            "stores": self.stores,
+            "bypassed": self.bypassed,
+            "similarity_enabled": self.similarity_enabled,
+        }
+
+
+_response_cache: Optional[ResponseCache] = None
+
+
+def get_response_cache() -> ResponseCache:
+    """ResponseCacheのシングルトンインスタンスを取得"""
+    global _response_cache
+    if _response_cache is None:
+        _response_cache = ResponseCache()
+    return _response_cache
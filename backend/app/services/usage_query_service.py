@@ -0,0 +1,95 @@
+"""
+ユーザー別API使用量の取得サービス
+
+今日・今月・任意期間の使用量を api_logs の1回のスキャンで条件付き集計する。
+WHERE user_id = ? AND created_at >= ? の範囲条件なので
+(user_id, created_at) のインデックスが使える。
+結果はユーザーごとに短時間キャッシュし、画面のポーリングでDBを叩きすぎないようにする。
+"""
+from datetime import datetime
+from typing import Any, Dict, Optional
+from sqlalchemy import and_, case, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.config import settings
+from app.models.models import ApiLog
+from app.utils.cache import TTLCache
+
+
+_usage_cache: TTLCache[dict] = TTLCache(
+    max_entries=settings.API_USAGE_CACHE_MAX_ENTRIES,
+    ttl=settings.API_USAGE_CACHE_TTL_SECONDS,
+)
+
+
+def _window_columns(name: str, condition):
+    """期間条件に一致する行だけを合計する列"""
+    return [
+        func.sum(case((condition, ApiLog.input_tokens), else_=0)).label(f"{name}_input_tokens"),
+        func.sum(case((condition, ApiLog.output_tokens), else_=0)).label(f"{name}_output_tokens"),
+        func.sum(case((condition, ApiLog.cost), else_=0)).label(f"{name}_cost"),
+        func.sum(case((condition, 1), else_=0)).label(f"{name}_requests"),
+    ]
+
+
+def _window_result(row, name: str) -> Dict[str, Any]:
+    return {
+        "inputTokens": int(getattr(row, f"{name}_input_tokens") or 0),
+        "outputTokens": int(getattr(row, f"{name}_output_tokens") or 0),
+        "cost": float(getattr(row, f"{name}_cost") or 0),
+        "requests": int(getattr(row, f"{name}_requests") or 0),
+    }
+
+
+async def get_user_usage(
+    db: AsyncSession,
+    user_id: str,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+) -> Dict[str, Dict[str, Any]]:
+    """
+    ユーザーのAPI使用量を取得（UTC基準）
+
+    Args:
+        db: DBセッション
+        user_id: ユーザーID
+        since: 任意期間の開始（指定時のみ "window" を返す）
+        until: 任意期間の終了（省略時は現在まで）
+
+    Returns:
+        {"today": {...}, "thisMonth": {...}, "window": {...}（since指定時）}
+    """
+    cache_key = (user_id, since, until)
+    cached = _usage_cache.get(cache_key)
+    if cached is not None:
+        return cached
+
+    now = datetime.utcnow()
+    today_start = now.replace(hour=0, minute=0, second=0, microsecond=0)
+    month_start = today_start.replace(day=1)
+
+    columns = _window_columns("today", ApiLog.created_at >= today_start)
+    columns += _window_columns("month", ApiLog.created_at >= month_start)
+    scan_start = month_start
+    if since is not None:
+        window = ApiLog.created_at >= since
+        if until is not None:
+            window = and_(window, ApiLog.created_at < until)
+        columns += _window_columns("window", window)
+        scan_start = min(scan_start, since)
+
+    row = (await db.execute(
+        select(*columns).where(
+            ApiLog.user_id == user_id,
+            ApiLog.created_at >= scan_start,
+        )
+    )).one()
+
+    usage = {
+        "today": _window_result(row, "today"),
+        "thisMonth": _window_result(row, "month"),
+    }
+    if since is not None:
+        usage["window"] = _window_result(row, "window")
+
+    _usage_cache.set(cache_key, usage)
+    return usage
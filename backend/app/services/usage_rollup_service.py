@@ -0,0 +1,201 @@
+"""
+API使用量の集計テーブル（ロールアップ）サービス
+
+api_logs の書き込みと同じトランザクションで、日別の集計テーブルに加算する。
+管理画面の統計は api_logs ではなく集計テーブルから算出する。
+（統計の最小単位は「今日」のため、時間別の集計は持たない）
+"""
+from datetime import datetime
+from typing import Any, Dict, List, Tuple
+from sqlalchemy import case, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.database import upsert_insert
+from app.models.models import ApiUsageDaily, User
+
+
+# Phase不明のログを集計するときのPhase番号
+UNKNOWN_PHASE = 0
+
+_METRICS = (
+    "requests", "input_tokens", "output_tokens", "total_tokens", "cost", "cache_creation_tokens", "cache_read_tokens",
+)
+
+
+def _day_start(moment: datetime) -> datetime:
+    return moment.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def _aggregate(logs: List[Dict[str, Any]], bucket) -> List[Dict[str, Any]]:
+    """ログを (期間, ユーザー, Phase, キャッシュ有無) ごとに合計"""
+    totals: Dict[Tuple, Dict[str, Any]] = {}
+    for log in logs:
+        key = (bucket(log["created_at"]), log["user_id"], log.get("phase") or UNKNOWN_PHASE, bool(log["cached"]))
+        row = totals.get(key)
+        if row is None:
+            row = totals[key] = {
+                "bucket_start": key[0],
+                "user_id": key[1],
+                "phase": key[2],
+                "cached": key[3],
+                **{metric: 0 for metric in _METRICS},
+            }
+        row["requests"] += 1
+        for metric in _METRICS[1:]:
+            row[metric] += log[metric]
+    return list(totals.values())
+
+
+async def apply_rollups(db: AsyncSession, logs: List[Dict[str, Any]]):
+    """
+    書き込むログのバッチを日別の集計テーブルに加算（1文のUPSERT）
+    コミットは呼び出し側で行う。
+
+    Args:
+        db: DBセッション
+        logs: api_logs に挿入する行（created_at, user_id, phase, cached, トークン数, キャッシュのトークン数, cost）
+    """
+    if not logs:
+        return
+
+    statement = upsert_insert(db)(ApiUsageDaily).values(_aggregate(logs, _day_start))
+    statement = statement.on_conflict_do_update(
+        index_elements=[
+            ApiUsageDaily.bucket_start, ApiUsageDaily.user_id, ApiUsageDaily.phase, ApiUsageDaily.cached,
+        ],
+        set_={
+            metric: getattr(ApiUsageDaily, metric) + getattr(statement.excluded, metric)
+            for metric in _METRICS
+        },
+    )
+    await db.execute(statement)
+
+
+def _prompt_cache_hit_rate(stats: Dict[str, int], prefix: str = "") -> float:
+    """
+    プロンプトキャッシュのヒット率（%）: 入力トークンのうちキャッシュから読み込んだ割合
+
+    APIの input_tokens はキャッシュの書き込み・読み込み分を含まないので、3つの合計を分母にする。
+    """
+    read = stats[f"{prefix}cache_read_tokens"]
+    prompt_tokens = stats[f"{prefix}input_tokens"] + stats[f"{prefix}cache_creation_tokens"] + read
+    return round(read / prompt_tokens * 100, 2) if prompt_tokens > 0 else 0.0
+
+
+async def get_usage_summary(db: AsyncSession, top_users_limit: int = 10) -> Dict[str, Any]:
+    """
+    管理画面用の使用統計を日別集計テーブルから算出（2クエリ）
+
+    Returns:
+        admin /api-stats のレスポンス形式
+    """
+    today_start = _day_start(datetime.utcnow())
+    is_today = ApiUsageDaily.bucket_start >= today_start
+
+    # 1. Phase × キャッシュ有無ごとの累計と今日分（条件付き集計）
+    rows = (await db.execute(
+        select(
+            ApiUsageDaily.phase,
+            ApiUsageDaily.cached,
+            func.sum(ApiUsageDaily.requests).label("requests"),
+            func.sum(ApiUsageDaily.cost).label("cost"),
+            func.sum(ApiUsageDaily.total_tokens).label("tokens"),
+            func.sum(case((is_today, ApiUsageDaily.requests), else_=0)).label("today_requests"),
+            func.sum(case((is_today, ApiUsageDaily.cost), else_=0)).label("today_cost"),
+            func.sum(ApiUsageDaily.input_tokens).label("input_tokens"),
+            func.sum(ApiUsageDaily.cache_creation_tokens).label("cache_creation_tokens"),
+            func.sum(ApiUsageDaily.cache_read_tokens).label("cache_read_tokens"),
+            func.sum(case((is_today, ApiUsageDaily.input_tokens), else_=0)).label("today_input_tokens"),
+            func.sum(case((is_today, ApiUsageDaily.cache_creation_tokens), else_=0)).label("today_cache_creation_tokens"),
+            func.sum(case((is_today, ApiUsageDaily.cache_read_tokens), else_=0)).label("today_cache_read_tokens"),
+        ).group_by(ApiUsageDaily.phase, ApiUsageDaily.cached)
+    )).all()
+
+    # 2. トップユーザー（APIコール数でトップN）
+    top_users_query = (await db.execute(
+        select(
+            ApiUsageDaily.user_id,
+            User.name.label("user_name"),
+            func.sum(ApiUsageDaily.requests).label("total_requests"),
+            func.sum(ApiUsageDaily.cost).label("total_cost"),
+        )
+        .join(User, ApiUsageDaily.user_id == User.id)
+        .group_by(ApiUsageDaily.user_id, User.name)
+        .order_by(func.sum(ApiUsageDaily.requests).desc())
+        .limit(top_users_limit)
+    )).all()
+
+    totals = {
+        "requests": 0, "cost": 0, "tokens": 0, "today_requests": 0, "today_cost": 0,
+        "input_tokens": 0, "cache_creation_tokens": 0, "cache_read_tokens": 0,
+        "today_input_tokens": 0, "today_cache_creation_tokens": 0, "today_cache_read_tokens": 0,
+    }
+    cached = {"requests": 0, "today_requests": 0}
+    phases: Dict[int, Dict[str, Any]] = {}
+    for row in rows:
+        values = {key: int(getattr(row, key) or 0) for key in totals}
+        # 金額は1円未満の端数を含めて合計する（丸めるのは表示時）
+        values["cost"] = row.cost or 0
+        values["today_cost"] = row.today_cost or 0
+        for key, value in values.items():
+            totals[key] += value
+        if row.cached:
+            cached["requests"] += values["requests"]
+            cached["today_requests"] += values["today_requests"]
+        if row.phase != UNKNOWN_PHASE:
+            phase = phases.setdefault(row.phase, {key: 0 for key in totals})
+            for key, value in values.items():
+                phase[key] += value
+
+    cache_hit_rate = (cached["requests"] / totals["requests"] * 100) if totals["requests"] > 0 else 0.0
+    today_cache_hit_rate = (
+        (cached["today_requests"] / totals["today_requests"] * 100) if totals["today_requests"] > 0 else 0.0
+    )
+
+    return {
+        "total_requests": totals["requests"],
+        "total_cost": float(totals["cost"]),
+        "total_tokens": totals["tokens"],
+        "today_requests": totals["today_requests"],
+        "today_cost": float(totals["today_cost"]),
+        "top_users": [
+            {
+                "user_id": row.user_id,
+                "user_name": row.user_name,
+                "total_requests": int(row.total_requests or 0),
+                "total_cost": float(row.total_cost) if row.total_cost else 0.0,
+            }
+            for row in top_users_query
+        ],
+        "phase_stats": [
+            {
+                "phase": phase,
+                "total_requests": stats["requests"],
+                "total_cost": float(stats["cost"]),
+                "total_tokens": stats["tokens"],
+                "cache_creation_tokens": stats["cache_creation_tokens"],
+                "cache_read_tokens": stats["cache_read_tokens"],
+                "prompt_cache_hit_rate": _prompt_cache_hit_rate(stats),
+            }
+            for phase, stats in sorted(phases.items())
+        ],
+        "today_phase_stats": [
+            {
+                "phase": phase,
+                "requests": stats["today_requests"],
+                "cost": float(stats["today_cost"]),
+                "prompt_cache_hit_rate": _prompt_cache_hit_rate(stats, "today_"),
+            }
+            for phase, stats in sorted(phases.items())
+            if stats["today_requests"] > 0
+        ],
+        "cache_stats": {
+            "total_cached_requests": cached["requests"],
+            "total_cache_hit_rate": round(cache_hit_rate, 2),
+            "today_cached_requests": cached["today_requests"],
+            "today_cache_hit_rate": round(today_cache_hit_rate, 2),
+            "total_cache_read_tokens": totals["cache_read_tokens"],
+            "total_cache_creation_tokens": totals["cache_creation_tokens"],
+            "total_prompt_cache_hit_rate": _prompt_cache_hit_rate(totals),
+            "today_prompt_cache_hit_rate": _prompt_cache_hit_rate(totals, "today_"),
+        },
+    }
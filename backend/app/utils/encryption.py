@@ -3,10 +3,17 @@ APIキー暗号化ユーティリティ
 
 Fernetを使用した対称鍵暗号化を実装
 """
+from functools import lru_cache
 from cryptography.fernet import Fernet
 from app.core.config import settings
 
 
+@lru_cache(maxsize=4)
+def _fernet(key: str) -> Fernet:
+    """Fernetインスタンス（鍵ごとに使い回す）"""
+    return Fernet(key.encode())
+
+
 def encrypt_api_key(api_key: str) -> str:
     """
     APIキーを暗号化
@@ -20,7 +27,7 @@ def encrypt_api_key(api_key: str) -> str:
     if not api_key:
         return ""
 
-    f = Fernet(settings.ENCRYPTION_KEY.encode())
+    f = _fernet(settings.ENCRYPTION_KEY)
     return f.encrypt(api_key.encode()).decode()
 
 
@@ -38,7 +45,7 @@ def decrypt_api_key(encrypted_key: str) -> str:
         return ""
 
     try:
-        f = Fernet(settings.ENCRYPTION_KEY.encode())
+        f = _fernet(settings.ENCRYPTION_KEY)
         return f.decrypt(encrypted_key.encode()).decode()
     except Exception as e:
         # 暗号化キーが変更された場合や不正なデータの場合
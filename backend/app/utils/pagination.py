@@ -0,0 +1,38 @@
+"""
+キーセット（カーソル）ページネーションユーティリティ
+
+(created_at, id) の組を不透明なカーソル文字列に変換する
+"""
+import base64
+from datetime import datetime
+from typing import Tuple
+
+
+def encode_cursor(created_at: datetime, row_id: str) -> str:
+    """
+    (created_at, id) をカーソル文字列に変換
+
+    Args:
+        created_at: 行の作成日時
+        row_id: 行のID
+
+    Returns:
+        URLセーフなBase64文字列
+    """
+    raw = f"{created_at.isoformat()}|{row_id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, str]:
+    """
+    カーソル文字列を (created_at, id) に戻す
+
+    Raises:
+        ValueError: カーソルの形式が不正な場合
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_at, row_id = base64.urlsafe_b64decode(padded.encode()).decode().split("|", 1)
+        return datetime.fromisoformat(created_at), row_id
+    except Exception as e:
+        raise ValueError(f"不正なカーソルです: {cursor}") from e
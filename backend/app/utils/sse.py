@@ -0,0 +1,200 @@
+"""
+Server-Sent Events フレーム生成ユーティリティ
+
+トークン単位の差分をバイト数・経過時間でまとめて1フレームにし、
+フレームごとのJSONシリアライズと転送量のオーバーヘッドを抑える
+"""
+import asyncio
+import json
+from typing import Any, AsyncGenerator, AsyncIterator, Dict, List, Optional, Union
+from app.core.config import settings
+
+
+# 差分ストリームの終端を表す番兵
+_END = object()
+
+
+class _SourceError:
+    """差分ストリームで発生した例外をキュー経由で受け渡すためのラッパー"""
+
+    def __init__(self, error: Exception):
+        self.error = error
+
+
+class SSEEmitter:
+    """
+    SSEフレームのまとめ送りを行うエミッター
+
+    - トークンはバッファに溜め、max_bytes に達するか flush_interval 秒経過したら1フレームで送る
+    - 何も送らない時間が heartbeat_interval 秒続いたらコメント行（": ping"）で接続を維持する
+    - トークンフレームのエンベロープは事前に組み立て、本文のみをシリアライズする
+    - offset を指定すると、トークンフレームに送信済みの文字数を id として付ける
+      （再接続時に Last-Event-ID から続きを送るため）
+    """
+
+    HEARTBEAT_FRAME = ": ping\n\n"
+
+    def __init__(
+        self,
+        max_bytes: Optional[int] = None,
+        flush_interval: Optional[float] = None,
+        heartbeat_interval: Optional[float] = None,
+        offset: Optional[int] = None,
+    ):
+        """
+        Args:
+            max_bytes: 1フレームあたりのトークン本文の上限バイト数
+            flush_interval: バッファを送り出すまでの最大待ち時間（秒）
+            heartbeat_interval: ハートビートを送る無通信時間（秒、0以下で無効）
+            offset: 送信済みの文字数（指定時のみトークンフレームに id を付ける）
+        """
+        self.max_bytes = max_bytes or settings.SSE_MAX_FRAME_BYTES
+        self.flush_interval = flush_interval if flush_interval is not None else settings.SSE_FLUSH_INTERVAL_SECONDS
+        self.heartbeat_interval = (
+            heartbeat_interval if heartbeat_interval is not None else settings.SSE_HEARTBEAT_SECONDS
+        )
+
+        # {"type": "token", "content": ...} のうち本文以外を事前に用意
+        self._token_prefix = 'data: {"type": "token", "content": '
+        self._token_suffix = "}\n\n"
+
+        self.offset = offset
+
+        self._buffer: List[str] = []
+        self._buffered_bytes = 0
+        self._last_flush = 0.0
+        self._last_write = 0.0
+
+    def event(self, event_type: str, **fields) -> str:
+        """制御イベント（start/end/error等）のフレームを生成"""
+        self._last_write = self._now()
+        return f"data: {json.dumps({'type': event_type, **fields})}\n\n"
+
+    def control(self, event: Dict[str, Any]) -> str:
+        """
+        差分ストリームに混ざった制御イベントのフレームを生成
+
+        "reset"（出力が最初からやり直しになった）の場合は送信済みの文字数を0に戻し、id: 0 を付ける
+        """
+        fields = dict(event)
+        event_type = fields.pop("type")
+        frame = self.event(event_type, **fields)
+        if event_type == "reset" and self.offset is not None:
+            self.offset = 0
+            frame = "id: 0\n" + frame
+        return frame
+
+    def push(self, text: str) -> Optional[str]:
+        """トークンをバッファに追加し、バイト数の上限に達したらフレームを返す"""
+        if not text:
+            return None
+        self._buffer.append(text)
+        self._buffered_bytes += len(text.encode("utf-8"))
+        if self._buffered_bytes >= self.max_bytes:
+            return self.flush()
+        return None
+
+    def flush(self) -> Optional[str]:
+        """バッファ内のトークンを1フレームにまとめて返す（空ならNone）"""
+        now = self._now()
+        self._last_flush = now
+        if not self._buffer:
+            return None
+        content = "".join(self._buffer)
+        self._buffer.clear()
+        self._buffered_bytes = 0
+        self._last_write = now
+        frame = self._token_prefix + json.dumps(content, ensure_ascii=False) + self._token_suffix
+        if self.offset is not None:
+            self.offset += len(content)
+            frame = f"id: {self.offset}\n" + frame
+        return frame
+
+    def heartbeat(self) -> Optional[str]:
+        """無通信時間が heartbeat_interval を超えていればハートビートを返す"""
+        if self.heartbeat_interval <= 0:
+            return None
+        now = self._now()
+        if now - self._last_write >= self.heartbeat_interval:
+            self._last_write = now
+            return self.HEARTBEAT_FRAME
+        return None
+
+    async def frames(self, deltas: AsyncIterator[Union[str, Dict[str, Any]]]) -> AsyncGenerator[str, None]:
+        """
+        テキスト差分のストリームをSSEフレームのストリームに変換
+
+        dict は制御イベント（{"type": ...}）として、バッファ内のトークンを送り出してから送る。
+
+        差分は別タスクでキューに積み、届いている分はそのまま取り出す。
+        キューが空の間だけタイムアウト付きで待ち、フラッシュ期限とハートビートを処理する
+        """
+        now = self._now()
+        self._last_flush = now
+        self._last_write = now
+
+        queue: asyncio.Queue = asyncio.Queue()
+        pump = asyncio.create_task(self._pump(deltas, queue))
+        try:
+            while True:
+                if queue.empty():
+                    getter = asyncio.ensure_future(queue.get())
+                    done, _ = await asyncio.wait({getter}, timeout=self._next_deadline())
+                    if not done:
+                        # 差分待ちの間に期限が来た
+                        getter.cancel()
+                        frame = self.flush() if self._buffer else self.heartbeat()
+                        if frame:
+                            yield frame
+                        continue
+                    item = getter.result()
+                else:
+                    item = queue.get_nowait()
+
+                if item is _END:
+                    break
+                if isinstance(item, _SourceError):
+                    raise item.error
+                if isinstance(item, dict):
+                    frame = self.flush()
+                    if frame:
+                        yield frame
+                    yield self.control(item)
+                    continue
+
+                frame = self.push(item)
+                if frame is None and self._now() - self._last_flush >= self.flush_interval:
+                    frame = self.flush()
+                if frame:
+                    yield frame
+
+            frame = self.flush()
+            if frame:
+                yield frame
+        finally:
+            if not pump.done():
+                pump.cancel()
+
+    @staticmethod
+    async def _pump(deltas: AsyncIterator[Union[str, Dict[str, Any]]], queue: asyncio.Queue):
+        """差分のストリームを読み切ってキューに積む"""
+        try:
+            async for text in deltas:
+                queue.put_nowait(text)
+        except Exception as e:
+            queue.put_nowait(_SourceError(e))
+        else:
+            queue.put_nowait(_END)
+
+    def _next_deadline(self) -> Optional[float]:
+        """次にフラッシュまたはハートビートが必要になるまでの秒数"""
+        elapsed_since_flush = self._now() - self._last_flush
+        if self._buffer:
+            return max(0.0, self.flush_interval - elapsed_since_flush)
+        if self.heartbeat_interval > 0:
+            return max(0.0, self.heartbeat_interval - (self._now() - self._last_write))
+        return None
+
+    @staticmethod
+    def _now() -> float:
+        return asyncio.get_running_loop().time()
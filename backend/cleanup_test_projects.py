@@ -1,6 +1,7 @@
 #!/usr/bin/env python3
 """E2Eテストプロジェクトをクリーンアップするスクリプト"""
 
+import asyncio
 import sys
 import os
 
@@ -11,6 +12,7 @@ from sqlalchemy import create_engine
 from sqlalchemy.orm import Session
 from app.models.models import Project, User
 from app.core.config import settings
+from scripts.sweep_file_blobs import sweep
 
 def cleanup_test_projects():
     """E2Eテストユーザーの全プロジェクトを削除"""
@@ -39,6 +41,9 @@ def cleanup_test_projects():
 
             session.commit()
             print(f"✅ Successfully deleted {project_count} projects!")
+
+            # カスケードで消えたファイルの分、参照されなくなったファイル内容を削除
+            asyncio.run(sweep())
         else:
             print("❌ User e2etest@example.com not found in database")
 
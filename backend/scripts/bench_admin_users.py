@@ -0,0 +1,160 @@
+"""
+管理画面のユーザー一覧（/admin/users）ベンチマーク
+
+ベンチマーク用SQLiteにユーザーとプロジェクトを投入し、
+- 従来: 全ユーザーを読み込み、ユーザーごとのプロジェクトを selectinload して len() で数える
+- ページング: admin_user_service.list_users（件数 + 1ページ分、プロジェクト数はGROUP BYサブクエリ）
+のレイテンシと発行クエリ数を比較します。
+
+使い方:
+    python scripts/bench_admin_users.py --users 100000
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+import uuid
+from datetime import datetime, timedelta
+from pathlib import Path
+
+# プロジェクトルートをPythonパスに追加
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+parser = argparse.ArgumentParser(description="管理画面のユーザー一覧ベンチマーク")
+parser.add_argument("--users", type=int, default=100_000)
+parser.add_argument("--projects-per-user", type=int, default=3, help="1ユーザーあたりの平均プロジェクト数")
+parser.add_argument("--page-size", type=int, default=50)
+parser.add_argument("--repeat", type=int, default=5)
+parser.add_argument("--database-path", default="./bench_admin_users.db", help="ベンチマーク用SQLiteファイル（毎回作り直す）")
+args = parser.parse_args()
+
+# app の設定読み込み前に接続先を差し替える
+os.environ["DATABASE_URL"] = f"sqlite:///{args.database_path}"
+os.environ["DEBUG"] = "false"
+
+from sqlalchemy import event, insert, select, text
+from sqlalchemy.orm import selectinload
+from app.core.database import AsyncSessionLocal, Base, async_engine, engine
+from app.models.models import Project, User, UserStatus
+from app.services import admin_user_service
+
+BATCH_SIZE = 20_000
+STATUSES = ("approved", "approved", "approved", "pending", "suspended")
+
+query_count = 0
+
+
+@event.listens_for(async_engine.sync_engine, "before_cursor_execute")
+def _count_query(conn, cursor, statement, parameters, context, executemany):
+    global query_count
+    query_count += 1
+
+
+def seed():
+    """ユーザーとプロジェクトを投入（プロジェクト数はユーザーごとに0〜2倍でばらつかせる）"""
+    now = datetime.utcnow()
+    user_ids = [str(uuid.uuid4()) for _ in range(args.users)]
+    for start in range(0, args.users, BATCH_SIZE):
+        with engine.begin() as conn:
+            conn.execute(insert(User.__table__), [
+                {
+                    "id": user_ids[i],
+                    "email": f"bench{i}@example.com",
+                    "name": f"Bench User {i}",
+                    "hashed_password": "x",
+                    "role": "user",
+                    "status": STATUSES[i % len(STATUSES)],
+                    "self_expansion_mode": "manual",
+                    "created_at": now - timedelta(minutes=i),
+                    "last_login_at": now - timedelta(hours=i % 500) if i % 4 else None,
+                }
+                for i in range(start, min(start + BATCH_SIZE, args.users))
+            ])
+
+    projects = []
+    for i, user_id in enumerate(user_ids):
+        for n in range(i % (args.projects_per_user * 2 + 1)):
+            projects.append({
+                "id": str(uuid.uuid4()),
+                "name": f"Project {n}",
+                "status": "active",
+                "current_phase": 1,
+                "owner_id": user_id,
+                "created_at": now,
+            })
+    for start in range(0, len(projects), BATCH_SIZE):
+        with engine.begin() as conn:
+            conn.execute(insert(Project.__table__), projects[start:start + BATCH_SIZE])
+        print(f"  projects: {min(start + BATCH_SIZE, len(projects)):,}/{len(projects):,}", end="\r")
+    print()
+
+    with engine.begin() as conn:
+        conn.execute(text("ANALYZE"))
+    return len(projects)
+
+
+async def legacy_list(db):
+    """変更前の get_all_users と同じ読み込み方"""
+    users = (await db.scalars(select(User).options(selectinload(User.projects)))).all()
+    return [{"id": u.id, "projectCount": len(u.projects)} for u in users]
+
+
+async def timed(label, func):
+    """中央値（ミリ秒）と1回あたりのクエリ数を表示"""
+    global query_count
+    samples = []
+    queries = 0
+    for _ in range(args.repeat):
+        async with AsyncSessionLocal() as db:
+            query_count = 0
+            start = time.perf_counter()
+            result = await func(db)
+            samples.append((time.perf_counter() - start) * 1000)
+            queries = query_count
+    median = statistics.median(samples)
+    print(f"{label:<44} {median:>10.2f} ms  {queries:>4} queries")
+    return median, result
+
+
+async def measure(total_projects):
+    last_page = (args.users + args.page_size - 1) // args.page_size
+
+    def page(number, **kwargs):
+        return lambda db: admin_user_service.list_users(db, page=number, limit=args.page_size, **kwargs)
+
+    legacy, legacy_users = await timed("従来（全件 + selectinload）", legacy_list)
+    first, (users, total) = await timed("ページング 1ページ目（登録日順）", page(1))
+    await timed(f"ページング {last_page // 2}ページ目（登録日順）", page(last_page // 2))
+    await timed("ページング 1ページ目（status=approved）", page(1, status=UserStatus.approved))
+    await timed("ページング 1ページ目（検索 'User 99'）", page(1, search="User 99"))
+    await timed("ページング 1ページ目（プロジェクト数順）", page(1, sort="project_count"))
+
+    assert total == args.users, "総件数がユーザー数と一致しません"
+    assert sum(u["projectCount"] for u in legacy_users) == total_projects, "プロジェクト数の合計が一致しません"
+    expected = {u["id"]: u["projectCount"] for u in legacy_users}
+    assert all(expected[u["id"]] == u["projectCount"] for u in users), "ページのプロジェクト数が従来と一致しません"
+    return legacy, first
+
+
+def main():
+    """メイン処理"""
+    Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+
+    print("=" * 72)
+    print(f"データ投入中 (users={args.users:,}, projects/user≈{args.projects_per_user})")
+    print("=" * 72)
+    total_projects = seed()
+
+    legacy, first = asyncio.run(measure(total_projects))
+    print(f"改善（1ページ目）: {legacy / first:.1f}x")
+
+    Base.metadata.drop_all(engine)
+
+
+if __name__ == "__main__":
+    main()
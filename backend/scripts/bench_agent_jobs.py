@@ -0,0 +1,196 @@
+"""
+エージェント実行ジョブキュー（agent_job_service）ベンチマーク
+
+ベンチマーク用SQLiteにユーザーとプロジェクトを作り、Claude APIの応答時間を模した
+エージェント実行（--agent-seconds 秒でトークンを出力）のジョブを一度に投入して
+- 投入（enqueue）の所要時間（従来の /agents/execute はエージェントの実行が終わるまで応答しない）
+- 全ジョブの完了までの時間とスループット
+- 実行中のジョブ数の最大値（全体・ユーザーごと・Phaseごと）が上限を超えないこと
+- 実行途中の出力を offset から購読し直せること
+を確認します。停止時に実行中のジョブが pending に戻ることも確認します。
+
+使い方:
+    python scripts/bench_agent_jobs.py --jobs 60 --users 6 --workers 8
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+from pathlib import Path
+
+# プロジェクトルートをPythonパスに追加
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+parser = argparse.ArgumentParser(description="エージェント実行ジョブキューのベンチマーク")
+parser.add_argument("--jobs", type=int, default=60, help="投入するジョブ数")
+parser.add_argument("--users", type=int, default=6, help="ユーザー数")
+parser.add_argument("--workers", type=int, default=8, help="同時実行数の上限")
+parser.add_argument("--per-user", type=int, default=2, help="ユーザーあたりの同時実行数の上限")
+parser.add_argument("--agent-seconds", type=float, default=0.5, help="1ジョブの実行時間（Claude APIの応答時間の代わり）")
+parser.add_argument("--database-path", default="./bench_agent_jobs.db", help="ベンチマーク用SQLiteファイル（毎回作り直す）")
+args = parser.parse_args()
+
+# app の設定読み込み前に接続先を差し替える
+os.environ["DATABASE_URL"] = f"sqlite:///{args.database_path}"
+os.environ["DEBUG"] = "false"
+
+from app.core.database import AsyncSessionLocal, Base, SessionLocal, engine
+from app.models.models import PhaseExecution, Project, User, UserRole, UserStatus
+from app.services.agent_job_service import JOB_COMPLETED, JOB_KIND_AGENT, JOB_PENDING, AgentJobQueue
+
+# Phase 2・3 は上限 2、それ以外は 4（設定の既定値と同じ）
+PHASES = (1, 2, 3, 4)
+PHASE_LIMITS = {2: 2, 3: 2}
+TOKENS_PER_JOB = 10
+
+
+class BenchQueue(AgentJobQueue):
+    """エージェントの代わりに一定時間トークンを出力し、同時実行数を記録するキュー"""
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.peak = {"total": 0, "user": 0, "phase": {}}
+
+    def _record_peak(self):
+        stats = self.stats()
+        self.peak["total"] = max(self.peak["total"], stats["running"])
+        self.peak["user"] = max([self.peak["user"], *stats["by_user"].values()])
+        for phase, count in stats["by_phase"].items():
+            self.peak["phase"][phase] = max(self.peak["phase"].get(phase, 0), count)
+
+    async def _run_agent_job(self, job, stream):
+        self._record_peak()
+        for i in range(TOKENS_PER_JOB):
+            await asyncio.sleep(args.agent_seconds / TOKENS_PER_JOB)
+            stream.append(f"token{i} ")
+        return {"response": stream.text()}
+
+
+def seed():
+    """ユーザーとプロジェクトを作成"""
+    db = SessionLocal()
+    owners = []
+    for i in range(args.users):
+        user = User(
+            email=f"bench{i}@example.com",
+            name=f"Bench User {i}",
+            hashed_password="",
+            role=UserRole.user,
+            status=UserStatus.approved,
+        )
+        db.add(user)
+        db.flush()
+        project = Project(name=f"Bench Project {i}", owner_id=user.id)
+        db.add(project)
+        db.flush()
+        owners.append((user.id, project.id))
+    db.commit()
+    db.close()
+    return owners
+
+
+async def check_resume(queue, owners):
+    """実行途中で切断し、受信済みの位置から購読し直して出力が欠けないことを確認"""
+    user_id, project_id = owners[0]
+    async with AsyncSessionLocal() as db:
+        job = await queue.enqueue(db, project_id, user_id, 1, {"kind": JOB_KIND_AGENT})
+
+    received = ""
+    async for event in queue.subscribe(job.id):
+        if event["type"] == "delta":
+            received += event["content"]
+        if len(received) > 10:
+            break  # 切断
+    async for event in queue.subscribe(job.id, len(received)):
+        if event["type"] == "delta":
+            received += event["content"]
+        else:
+            assert event["status"] == JOB_COMPLETED, event
+    expected = "".join(f"token{i} " for i in range(TOKENS_PER_JOB))
+    assert received == expected, f"再購読後の出力が一致しません: {received!r}"
+    print("再購読 OK")
+
+
+async def check_shutdown(queue, owners):
+    """停止時に実行中のジョブが pending に戻り、再開後に最初から実行されることを確認"""
+    user_id, project_id = owners[0]
+    async with AsyncSessionLocal() as db:
+        job = await queue.enqueue(db, project_id, user_id, 1, {"kind": JOB_KIND_AGENT})
+
+    async for event in queue.subscribe(job.id):
+        break  # 最初の出力まで待つ
+    await queue.stop()
+    async with AsyncSessionLocal() as db:
+        stopped = await db.get(PhaseExecution, job.id)
+        assert stopped.status == JOB_PENDING and stopped.attempts == 1, (stopped.status, stopped.attempts)
+
+    queue.start()
+    async for event in queue.subscribe(job.id):
+        if event["type"] == "finished":
+            assert event["status"] == JOB_COMPLETED, event
+    print("停止時の再投入 OK")
+
+
+async def main():
+    """メイン処理"""
+    Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+    owners = seed()
+
+    queue = BenchQueue(
+        max_workers=args.workers,
+        max_per_user=args.per_user,
+        max_per_phase=4,
+        phase_limits=PHASE_LIMITS,
+        poll_interval=0.2,
+    )
+    queue.start()
+
+    enqueue_ms = []
+    job_ids = []
+    start = time.perf_counter()
+    async with AsyncSessionLocal() as db:
+        for i in range(args.jobs):
+            user_id, project_id = owners[i % len(owners)]
+            t = time.perf_counter()
+            job = await queue.enqueue(db, project_id, user_id, PHASES[i % len(PHASES)], {"kind": JOB_KIND_AGENT})
+            enqueue_ms.append((time.perf_counter() - t) * 1000)
+            job_ids.append(job.id)
+
+    async def wait(job_id):
+        async for event in queue.subscribe(job_id):
+            if event["type"] == "finished":
+                return event["status"]
+
+    statuses = await asyncio.gather(*(wait(job_id) for job_id in job_ids))
+    elapsed = time.perf_counter() - start
+    assert all(status == JOB_COMPLETED for status in statuses), statuses
+
+    ideal = args.jobs * args.agent_seconds / min(args.workers, args.users * args.per_user)
+    print("=" * 72)
+    print(f"ジョブ {args.jobs}件 / ユーザー {args.users}人 / 1ジョブ {args.agent_seconds}s")
+    print(f"上限: 全体 {args.workers} / ユーザー {args.per_user} / Phase {PHASE_LIMITS}（その他 4）")
+    print("=" * 72)
+    print(f"投入 p50 {statistics.median(enqueue_ms):.2f} ms / 最大 {max(enqueue_ms):.2f} ms"
+          f"（従来の同期実行は1件 {args.agent_seconds * 1000:.0f} ms 以上）")
+    print(f"全件完了 {elapsed:.2f}s（直列 {args.jobs * args.agent_seconds:.1f}s / 上限での理論値 {ideal:.2f}s）"
+          f"  {args.jobs / elapsed:.1f} jobs/s")
+    print(f"最大同時実行数: 全体 {queue.peak['total']} / ユーザー {queue.peak['user']} / Phase {queue.peak['phase']}")
+
+    assert queue.peak["total"] <= args.workers, "全体の上限を超えました"
+    assert queue.peak["user"] <= args.per_user, "ユーザーごとの上限を超えました"
+    for phase, count in queue.peak["phase"].items():
+        assert count <= PHASE_LIMITS.get(phase, 4), f"Phase {phase} の上限を超えました"
+
+    await check_resume(queue, owners)
+    await check_shutdown(queue, owners)
+    await queue.stop()
+    Base.metadata.drop_all(engine)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
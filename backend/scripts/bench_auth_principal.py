@@ -0,0 +1,117 @@
+"""
+認証済みユーザー情報キャッシュ（deps.get_current_user）ベンチマーク
+
+ベンチマーク用SQLiteにユーザーとプロジェクトを作り、認証付きエンドポイントを繰り返し呼び出して
+- キャッシュなし（毎回キャッシュを空にする = 従来どおり毎リクエスト users を読む）
+- キャッシュあり
+の1リクエストあたりのDBクエリ数とレイテンシを比較します。
+
+使い方:
+    python scripts/bench_auth_principal.py --requests 500
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+from pathlib import Path
+
+# プロジェクトルートをPythonパスに追加
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+parser = argparse.ArgumentParser(description="認証済みユーザー情報キャッシュのベンチマーク")
+parser.add_argument("--requests", type=int, default=500, help="エンドポイントごとのリクエスト数")
+parser.add_argument("--database-path", default="./bench_auth_principal.db", help="ベンチマーク用SQLiteファイル（毎回作り直す）")
+args = parser.parse_args()
+
+# app の設定読み込み前に接続先を差し替える
+os.environ["DATABASE_URL"] = f"sqlite:///{args.database_path}"
+os.environ["DEBUG"] = "false"
+
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+from app.core import deps
+from app.core.database import Base, SessionLocal, async_engine, engine
+from app.core.security import create_access_token, get_password_hash
+from app.main import app
+from app.models.models import Project, User, UserRole, UserStatus
+
+query_count = 0
+
+
+@event.listens_for(async_engine.sync_engine, "before_cursor_execute")
+def _count_query(conn, cursor, statement, parameters, context, executemany):
+    global query_count
+    query_count += 1
+
+
+def seed():
+    """承認済みユーザー1人とプロジェクト1件を作成"""
+    db = SessionLocal()
+    user = User(
+        email="bench@example.com",
+        name="Bench User",
+        hashed_password=get_password_hash("password123"),
+        role=UserRole.user,
+        status=UserStatus.approved,
+    )
+    db.add(user)
+    db.flush()
+    project = Project(name="Bench Project", owner_id=user.id)
+    db.add(project)
+    db.commit()
+    ids = user.id, project.id
+    db.close()
+    return ids
+
+
+def run(client, path, headers, use_cache):
+    """1リクエストあたりのクエリ数とレイテンシの中央値（ミリ秒）"""
+    global query_count
+    deps._principal_cache.clear()
+    samples = []
+    query_count = 0
+    for _ in range(args.requests):
+        if not use_cache:
+            deps._principal_cache.clear()
+        start = time.perf_counter()
+        response = client.get(path, headers=headers)
+        samples.append((time.perf_counter() - start) * 1000)
+        assert response.status_code == 200, response.text
+    return query_count / args.requests, statistics.median(samples)
+
+
+def main():
+    """メイン処理"""
+    Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+    user_id, project_id = seed()
+    headers = {"Authorization": f"Bearer {create_access_token({'sub': user_id})}"}
+
+    endpoints = [
+        "/api/v1/projects",
+        f"/api/v1/projects/{project_id}/messages",
+        "/api/v1/users/me/api-usage",
+    ]
+
+    print("=" * 84)
+    print(f"{'エンドポイント':<40} {'キャッシュなし':>18} {'キャッシュあり':>18}")
+    print("=" * 84)
+    with TestClient(app) as client:
+        for path in endpoints:
+            label = path.replace(project_id, "{id}")
+            before_queries, before_ms = run(client, path, headers, use_cache=False)
+            after_queries, after_ms = run(client, path, headers, use_cache=True)
+            print(
+                f"{label:<40} {before_queries:>5.2f} q / {before_ms:>6.2f} ms"
+                f"   {after_queries:>5.2f} q / {after_ms:>6.2f} ms"
+            )
+    print(f"キャッシュ: {deps.get_principal_cache_stats()}")
+
+    Base.metadata.drop_all(engine)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+"""
+ユーザー独自APIキー用クライアントプールのベンチマーク
+
+ローカルに Messages API 互換の簡易HTTPサーバー（keep-alive対応、TCP接続数を数える）を立て、
+ユーザー独自キーで messages.create を繰り返し呼び出して
+- 従来: 呼び出しごとにFernetで復号し、新しい AsyncAnthropic を作成
+- プール: ClaudeClientPool.get（共有コネクションプール）
+の1回あたりの所要時間と、開いたTCP接続数を比較します。
+実際のAPIでは接続ごとにTLSハンドシェイク（数十〜数百ms）が加わります。
+
+使い方:
+    python scripts/bench_claude_client_pool.py --users 20 --messages 10
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import time
+from pathlib import Path
+
+# プロジェクトルートをPythonパスに追加
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+parser = argparse.ArgumentParser(description="ユーザー独自APIキー用クライアントプールのベンチマーク")
+parser.add_argument("--users", type=int, default=20, help="独自キーを持つユーザー数")
+parser.add_argument("--messages", type=int, default=10, help="ユーザーあたりのメッセージ数")
+parser.add_argument("--port", type=int, default=18765)
+args = parser.parse_args()
+
+from cryptography.fernet import Fernet
+
+# app の設定読み込み前に差し替える
+os.environ["ENCRYPTION_KEY"] = Fernet.generate_key().decode()
+os.environ["ANTHROPIC_BASE_URL"] = f"http://127.0.0.1:{args.port}"
+os.environ["DEBUG"] = "false"
+
+from anthropic import AsyncAnthropic
+from app.services.claude_client_pool import ClaudeClientPool
+from app.utils.encryption import decrypt_api_key, encrypt_api_key
+
+RESPONSE = json.dumps({
+    "id": "msg_bench",
+    "type": "message",
+    "role": "assistant",
+    "model": "claude-bench",
+    "content": [{"type": "text", "text": "ok"}],
+    "stop_reason": "end_turn",
+    "stop_sequence": None,
+    "usage": {"input_tokens": 1, "output_tokens": 1},
+}).encode()
+
+connections = 0
+
+
+async def handle(reader, writer):
+    """keep-aliveでリクエストを処理し続ける（接続ごとに1回呼ばれる）"""
+    global connections
+    connections += 1
+    try:
+        while True:
+            head = await reader.readuntil(b"\r\n\r\n")
+            length = 0
+            for line in head.decode().split("\r\n"):
+                if line.lower().startswith("content-length:"):
+                    length = int(line.split(":", 1)[1])
+            await reader.readexactly(length)
+            writer.write(
+                b"HTTP/1.1 200 OK\r\ncontent-type: application/json\r\n"
+                + f"content-length: {len(RESPONSE)}\r\n\r\n".encode()
+                + RESPONSE
+            )
+            await writer.drain()
+    except (asyncio.IncompleteReadError, ConnectionResetError, asyncio.CancelledError):
+        pass
+    finally:
+        writer.close()
+
+
+async def send(client):
+    await client.messages.create(
+        model="claude-bench",
+        max_tokens=16,
+        messages=[{"role": "user", "content": "hi"}],
+    )
+
+
+async def legacy(encrypted_key):
+    """変更前の ClaudeService と同じく呼び出しごとに復号・クライアント作成"""
+    await send(AsyncAnthropic(api_key=decrypt_api_key(encrypted_key)))
+
+
+async def measure(label, call, keys):
+    global connections
+    connections = 0
+    samples = []
+    for _ in range(args.messages):
+        for key in keys:
+            start = time.perf_counter()
+            await call(key)
+            samples.append((time.perf_counter() - start) * 1000)
+    print(f"{label:<24} {statistics.median(samples):>8.2f} ms/回  TCP接続 {connections:>5}")
+
+
+def check_expiry(keys):
+    """アイドル・寿命・件数上限での破棄を確認"""
+    now = [0.0]
+    pool = ClaudeClientPool(max_entries=2, idle_timeout=10, max_lifetime=30, clock=lambda: now[0])
+    first = pool.get(keys[0])
+    assert pool.get(keys[0]) is first, "同じキーでクライアントが再利用されていません"
+    assert pool.get(encrypt_api_key(decrypt_api_key(keys[0]))) is first, "同じキーの再暗号化で別クライアントになりました"
+    now[0] = 11
+    assert pool.get(keys[0]) is not first, "アイドル時間を過ぎても破棄されていません"
+    for t in range(12, 45, 5):
+        now[0] = t
+        current = pool.get(keys[0])
+    assert current is not first and pool.created == 3, "寿命を過ぎても破棄されていません"
+    pool.get(keys[1])
+    pool.get(keys[2])
+    assert len(pool) == 2, "件数上限を超えています"
+    print(f"破棄の確認 OK: {pool.stats()}")
+
+
+async def main():
+    """メイン処理"""
+    server = await asyncio.start_server(handle, "127.0.0.1", args.port)
+    keys = [encrypt_api_key(f"sk-ant-bench-{i}") for i in range(args.users)]
+    pool = ClaudeClientPool()
+
+    print("=" * 64)
+    print(f"ユーザー {args.users}人 × {args.messages}メッセージ")
+    print("=" * 64)
+    await measure("従来（毎回作成）", legacy, keys)
+
+    async def pooled(encrypted_key):
+        await send(pool.get(encrypted_key))
+
+    await measure("プール", pooled, keys)
+    print(f"プール: {pool.stats()}")
+    await pool.aclose()
+
+    check_expiry(keys)
+    server.close()
+    await server.wait_closed()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,115 @@
+"""
+Claude API 同時実行ベンチマーク
+
+N件の同時リクエストを、旧実装（同期Anthropicクライアントをasync関数内で呼び出し）と
+新実装（AsyncAnthropic + 共有コネクションプール）で比較します。
+Claude APIへの通信はモックトランスポートで置き換え、1リクエストあたり固定の遅延を与えます。
+
+使い方:
+    python scripts/bench_claude_concurrency.py --requests 20 --latency 0.5
+"""
+
+import argparse
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+# プロジェクトルートをPythonパスに追加
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+import httpx
+from anthropic import Anthropic
+from app.agents.claude_client import ClaudeClient
+
+
+def _fake_message() -> dict:
+    """Messages APIのレスポンスを模したJSON"""
+    return {
+        "id": "msg_bench",
+        "type": "message",
+        "role": "assistant",
+        "model": "claude-sonnet-4-20250514",
+        "content": [{"type": "text", "text": "ok"}],
+        "stop_reason": "end_turn",
+        "stop_sequence": None,
+        "usage": {"input_tokens": 10, "output_tokens": 5},
+    }
+
+
+async def bench_blocking(requests: int, latency: float) -> float:
+    """旧実装: 同期クライアントがイベントループをブロックする"""
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        time.sleep(latency)
+        return httpx.Response(200, json=_fake_message())
+
+    client = Anthropic(
+        api_key="bench",
+        http_client=httpx.Client(transport=httpx.MockTransport(handler)),
+    )
+
+    async def call():
+        # 旧 ClaudeClient.generate_text と同じく async 関数内で同期呼び出し
+        client.messages.create(
+            model="claude-sonnet-4-20250514",
+            max_tokens=16,
+            messages=[{"role": "user", "content": "ping"}],
+        )
+
+    start = time.perf_counter()
+    await asyncio.gather(*(call() for _ in range(requests)))
+    elapsed = time.perf_counter() - start
+    client.close()
+    return elapsed
+
+
+async def bench_async(requests: int, latency: float) -> float:
+    """新実装: ClaudeClient（AsyncAnthropic + 共有プール）"""
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        await asyncio.sleep(latency)
+        return httpx.Response(200, json=_fake_message())
+
+    client = ClaudeClient(
+        api_key="bench",
+        http_client=httpx.AsyncClient(transport=httpx.MockTransport(handler)),
+    )
+
+    start = time.perf_counter()
+    results = await asyncio.gather(*(
+        client.generate_text(messages=[{"role": "user", "content": "ping"}], max_tokens=16)
+        for _ in range(requests)
+    ))
+    elapsed = time.perf_counter() - start
+    await client.aclose()
+
+    errors = [r["error"] for r in results if "error" in r]
+    if errors:
+        raise RuntimeError(f"ベンチマーク中にエラーが発生しました: {errors[0]}")
+    return elapsed
+
+
+def main():
+    """メイン処理"""
+    parser = argparse.ArgumentParser(description="Claude API 同時実行ベンチマーク")
+    parser.add_argument("--requests", type=int, default=20, help="同時リクエスト数")
+    parser.add_argument("--latency", type=float, default=0.5, help="1リクエストあたりの擬似レイテンシ（秒）")
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print(f"Claude API 同時実行ベンチマーク (N={args.requests}, latency={args.latency}s)")
+    print("=" * 60)
+
+    blocking = asyncio.run(bench_blocking(args.requests, args.latency))
+    non_blocking = asyncio.run(bench_async(args.requests, args.latency))
+
+    print(f"旧実装（同期クライアント）: {blocking:.2f}秒")
+    print(f"新実装（AsyncAnthropic）  : {non_blocking:.2f}秒")
+    print(f"1リクエストの理論値        : {args.latency:.2f}秒")
+    print(f"高速化率                   : {blocking / non_blocking:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
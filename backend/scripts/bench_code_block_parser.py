@@ -0,0 +1,123 @@
+"""
+生成コードのコードブロックパーサー（agents/code_blocks）ベンチマーク
+
+Phase 2 / 3 / 5 の応答形式（```filepath ブロック + コードブロック）のテキストを対象に、
+- 従来の正規表現（re.DOTALL + 最短一致 .+?）で応答全体をパース
+- CodeBlockParser で応答全体をパース
+- CodeBlockParser にストリーミングの差分（数文字ずつ）を流してパース
+の所要時間を比較します。あわせて、
+- 閉じられていない ```filepath が多数並ぶ応答（従来の正規表現が各位置からバックトラックする）
+- ストリーミング時に最初のファイルが取り出せるまでに必要な応答の割合
+を計測し、通常の応答で両者の結果が一致することを確認します。
+
+使い方:
+    python scripts/bench_code_block_parser.py --files 10 20 40 --lines 80 --chunk 4
+"""
+
+import argparse
+import os
+import re
+import sys
+import time
+from pathlib import Path
+
+# プロジェクトルートをPythonパスに追加
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+parser = argparse.ArgumentParser(description="コードブロックパーサーのベンチマーク")
+parser.add_argument("--files", type=int, nargs="+", default=[10, 20, 40], help="応答に含めるファイル数")
+parser.add_argument("--lines", type=int, default=80, help="1ファイルの行数")
+parser.add_argument("--chunk", type=int, default=4, help="ストリーミングの差分1つの文字数")
+parser.add_argument("--unclosed", type=int, nargs="+", default=[500, 1000, 2000], help="閉じられていない ```filepath の数")
+args = parser.parse_args()
+
+os.environ["DEBUG"] = "false"
+
+from app.agents.code_blocks import CodeBlockParser, group_generated_files, parse_code_blocks, to_file_map
+
+LEGACY_PATTERN = r'```filepath\s*\n(.+?)\s*\n```\s*\n```(\w+)\s*\n(.+?)\n```'
+
+
+def legacy_parse(response_text):
+    """従来の _parse_deployment_scripts / _parse_test_code"""
+    return {
+        filepath.strip(): code.strip()
+        for filepath, language, code in re.findall(LEGACY_PATTERN, response_text, re.DOTALL)
+    }
+
+
+def build_response(file_count):
+    """Phase 2 の応答に近いテキスト（説明文とファイルが交互に並ぶ）"""
+    parts = ["フルスタックアプリケーションのコードを生成しました。\n"]
+    for i in range(file_count):
+        side = "frontend/src/components" if i % 2 == 0 else "backend/app/api"
+        ext, language = ("tsx", "typescript") if i % 2 == 0 else ("py", "python")
+        body = "\n".join(f"    const value{line} = compute({line}, 'item-{i}');  // 行 {line}" for line in range(args.lines))
+        parts.append(f"\n### ファイル {i + 1}\n説明: 画面{i}の実装です。\n\n```filepath\n{side}/File{i}.{ext}\n```\n```{language}\n{body}\n```\n")
+    return "".join(parts)
+
+
+def measure(func, repeat=5):
+    """最短の所要時間（ミリ秒）"""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def stream(response_text):
+    """差分を数文字ずつ流してパース"""
+    stream_parser = CodeBlockParser()
+    chunk = args.chunk
+    for start in range(0, len(response_text), chunk):
+        stream_parser.feed(response_text[start:start + chunk])
+    stream_parser.close()
+    return stream_parser.blocks
+
+
+def first_block_ratio(response_text):
+    """ストリーミング時、最初のファイルが取り出せた時点までに受け取った応答の割合"""
+    stream_parser = CodeBlockParser()
+    chunk = args.chunk
+    for start in range(0, len(response_text), chunk):
+        if stream_parser.feed(response_text[start:start + chunk]):
+            return (start + chunk) / len(response_text)
+    return 1.0
+
+
+def main():
+    """メイン処理"""
+    print("=" * 80)
+    print(f"{'ファイル数':<8} {'文字数':>9} {'正規表現':>10} {'全体パース':>11} {'差分ごと':>10} {'最初のファイル':>14}")
+    print("=" * 80)
+    for file_count in args.files:
+        response_text = build_response(file_count)
+        blocks = parse_code_blocks(response_text)
+        assert to_file_map(blocks) == legacy_parse(response_text), "正規表現と結果が一致しません"
+        assert stream(response_text) == blocks, "差分ごとのパース結果が一致しません"
+        assert len(group_generated_files(blocks)["frontend"]) == (file_count + 1) // 2
+
+        legacy = measure(lambda: legacy_parse(response_text))
+        whole = measure(lambda: parse_code_blocks(response_text))
+        streamed = measure(lambda: stream(response_text))
+        print(
+            f"{file_count:<8} {len(response_text):>9} {legacy:>8.2f}ms {whole:>9.2f}ms {streamed:>8.2f}ms"
+            f" {first_block_ratio(response_text):>13.0%}"
+        )
+
+    print()
+    print("閉じられていない ```filepath が並ぶ応答（生成が途中で打ち切られた場合など）")
+    print(f"{'個数':<8} {'文字数':>9} {'正規表現':>10} {'全体パース':>11}")
+    for count in args.unclosed:
+        response_text = "```filepath\nsrc/file.py\n" * count
+        assert legacy_parse(response_text) == to_file_map(parse_code_blocks(response_text)) == {}
+        legacy = measure(lambda: legacy_parse(response_text), repeat=1)
+        whole = measure(lambda: parse_code_blocks(response_text))
+        print(f"{count:<8} {len(response_text):>9} {legacy:>8.2f}ms {whole:>9.2f}ms")
+
+
+if __name__ == "__main__":
+    main()
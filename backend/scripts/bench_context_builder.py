@@ -0,0 +1,67 @@
+"""
+会話コンテキストのトークン予算ベンチマーク
+
+長い会話を模擬し、ターンごとに
+- 従来（Phaseの全履歴をそのまま送信）の入力トークン数
+- ConversationContextBuilder で予算内に収めた入力トークン数
+- キャッシュされる接頭辞（要約＋残した履歴の先頭）が前のターンから変わったか
+を比較します。トークン数は context_builder.estimate_tokens による概算です。
+
+使い方:
+    python scripts/bench_context_builder.py --turns 300 --max-tokens 24000
+"""
+
+import argparse
+import sys
+from pathlib import Path
+
+# プロジェクトルートをPythonパスに追加
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from app.agents.context_builder import ConversationContextBuilder, estimate_tokens
+
+USER_TURN = "商品一覧ページに絞り込み検索を追加したいです。カテゴリと価格帯で絞り込めるようにしてください。"
+ASSISTANT_TURN = "承知しました。絞り込み条件について確認させてください。" * 20
+
+
+def main():
+    """メイン処理"""
+    parser = argparse.ArgumentParser(description="会話コンテキストのトークン予算ベンチマーク")
+    parser.add_argument("--turns", type=int, default=300, help="ユーザー発言の回数")
+    parser.add_argument("--max-tokens", type=int, default=24_000)
+    parser.add_argument("--trim-step", type=int, default=10)
+    args = parser.parse_args()
+
+    builder = ConversationContextBuilder(max_tokens=args.max_tokens, trim_step=args.trim_step)
+    history = []
+    full_total = bounded_total = prefix_changes = 0
+    previous_prefix = None
+
+    print(f"{'ターン':>6}{'全履歴':>12}{'予算内':>12}{'要約':>8}{'破棄':>8}")
+    for turn in range(1, args.turns + 1):
+        user_message = f"{turn}: {USER_TURN}"
+        full = sum(estimate_tokens(m["content"]) + 4 for m in history) + estimate_tokens(user_message) + 4
+        context = builder.build(history, user_message)
+        full_total += full
+        bounded_total += context.estimated_tokens
+
+        first = context.messages[0]["content"]
+        prefix = first[0]["text"] if isinstance(first, list) else first
+        if previous_prefix is not None and prefix != previous_prefix:
+            prefix_changes += 1
+        previous_prefix = prefix
+
+        if turn % max(1, args.turns // 10) == 0:
+            print(f"{turn:>6}{full:>12,}{context.estimated_tokens:>12,}{context.summarized_count:>8}{context.dropped_count:>8}")
+
+        history.append({"role": "user", "content": user_message})
+        history.append({"role": "assistant", "content": ASSISTANT_TURN})
+
+    print()
+    print(f"累計入力トークン: 全履歴 {full_total:,} / 予算内 {bounded_total:,} ({bounded_total / full_total * 100:.1f}%)")
+    print(f"接頭辞が変わったターン: {prefix_changes}/{args.turns - 1}（それ以外のターンはキャッシュ済みの接頭辞を再利用できる）")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""
+ファイル内容の重複排除ストレージ ベンチマーク
+
+Phase 2のテンプレート生成結果を多数のプロジェクトに保存し、
+従来のインライン保存（ProjectFile.contentに全文）と
+file_blobs（SHA-256で重複排除 + zstd圧縮）の保存バイト数を比較します。
+同じ内容を再保存した場合（ハッシュ比較のみ）の所要時間も計測します。
+
+使い方:
+    python scripts/bench_file_blobs.py --projects 1000
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+from pathlib import Path
+
+# プロジェクトルートをPythonパスに追加
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+parser = argparse.ArgumentParser(description="ファイル内容の重複排除ストレージ ベンチマーク")
+parser.add_argument("--projects", type=int, default=1000)
+parser.add_argument("--database-path", default="./bench_file_blobs.db", help="ベンチマーク用SQLiteファイル（毎回作り直す）")
+args = parser.parse_args()
+
+# app の設定読み込み前に接続先を差し替える
+os.environ["DATABASE_URL"] = f"sqlite:///{args.database_path}"
+os.environ["DEBUG"] = "false"
+
+from sqlalchemy import func, select
+from app.core.database import AsyncSessionLocal, Base, engine
+from app.models.models import FileBlob, Project, ProjectFile, User
+from app.agents.templates import generate_project_code
+from app.services import project_file_service
+from app.services.project_file_service import zstandard
+
+
+async def run():
+    """メイン処理"""
+    Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+
+    async with AsyncSessionLocal() as db:
+        user = User(email="bench@example.com", name="Bench", hashed_password="x")
+        db.add(user)
+        await db.flush()
+        projects = [Project(name=f"Bench Project {i}", owner_id=user.id) for i in range(args.projects)]
+        db.add_all(projects)
+        await db.commit()
+
+        inline_bytes = 0
+        start = time.perf_counter()
+        for project in projects:
+            code = generate_project_code(project.name, "ダッシュボードと一覧")
+            inline_bytes += sum(
+                len(content.encode("utf-8")) for section in code.values() for content in section.values()
+            )
+            await project_file_service.bulk_save_generated_files(db, project.id, code)
+            await db.commit()
+        first_save = time.perf_counter() - start
+
+        start = time.perf_counter()
+        for project in projects:
+            code = generate_project_code(project.name, "ダッシュボードと一覧")
+            await project_file_service.bulk_save_generated_files(db, project.id, code)
+            await db.commit()
+        resave = time.perf_counter() - start
+
+        files = await db.scalar(select(func.count()).select_from(ProjectFile))
+        blobs, blob_bytes = (await db.execute(
+            select(func.count(), func.sum(func.length(FileBlob.data)))
+        )).one()
+
+    print("=" * 60)
+    print(f"ファイル内容ストレージ ベンチマーク (projects={args.projects:,}, files={files:,})")
+    print(f"zstd圧縮: {'有効' if zstandard is not None else '無効（zstandard未インストール）'}")
+    print("=" * 60)
+    print(f"インライン保存（従来）: {inline_bytes / 1024 / 1024:>10.2f} MB")
+    print(f"file_blobs（重複排除）: {blob_bytes / 1024 / 1024:>10.2f} MB  (blob {blobs:,}件)")
+    print(f"削減率: {(1 - blob_bytes / inline_bytes) * 100:.1f}%")
+    print()
+    print(f"初回保存: {first_save / args.projects * 1000:.2f} ms/プロジェクト")
+    print(f"同一内容の再保存: {resave / args.projects * 1000:.2f} ms/プロジェクト（ハッシュ比較のみ）")
+
+    Base.metadata.drop_all(engine)
+
+
+if __name__ == "__main__":
+    asyncio.run(run())
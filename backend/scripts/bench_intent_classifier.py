@@ -0,0 +1,160 @@
+"""
+意図分類（agents/intent_classifier）ベンチマーク
+
+実際の利用に近いプロンプト（短い依頼文〜仕様書を貼り付けた長文、日本語・英語）を対象に、
+1リクエストで行うキーワード判定
+- Phase 1 のプロジェクトタイプ判定
+- Phase 2 のモックテンプレートの画面判定
+- Phase 4 の改善タイプ判定
+を、従来のキーワードごとに小文字化して走査する方法と、分類器で1回だけ走査する方法とで比較します。
+あわせて全プロンプトで両者の判定結果が一致することを確認します。
+
+使い方:
+    python scripts/bench_intent_classifier.py --number 2000 --spec-repeat 20
+"""
+
+import argparse
+import os
+import sys
+import timeit
+from pathlib import Path
+
+# プロジェクトルートをPythonパスに追加
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+parser = argparse.ArgumentParser(description="意図分類のベンチマーク")
+parser.add_argument("--number", type=int, default=2000, help="1回の計測で分類する回数")
+parser.add_argument("--spec-repeat", type=int, default=20, help="長文プロンプトで仕様書を繰り返す回数")
+args = parser.parse_args()
+
+os.environ["DEBUG"] = "false"
+
+from app.agents.intent_classifier import classify_intent
+
+SPEC = """## 画面一覧
+- ログイン画面: メールアドレスとパスワードで認証する。失敗時はメッセージを表示する。
+- 商品一覧画面: カテゴリで絞り込み、価格順・新着順で並び替えられること。
+- 商品詳細画面: 画像ギャラリー、在庫数、レビューを表示する。
+- 注文履歴画面: 過去の注文を月ごとにまとめて表示する。
+## 非機能要件
+- 同時接続 1,000 ユーザーで応答 500ms 以内
+- 個人情報は暗号化して保存する
+Users must be able to export their order history as CSV. Support Japanese and English UI.
+"""
+
+CORPUS = [
+    "ECサイトを作りたいです",
+    "ネット通販のショップを立ち上げたい。決済はStripeで。",
+    "社内向けのSNSを作りたい。部署ごとのコミュニティ機能が欲しい",
+    "売上を見える化する管理画面が欲しい",
+    "Build an analytics dashboard for our support team",
+    "I want a simple todo app with a list view and a detail view",
+    "商品一覧と詳細ページを作ってください",
+    "アプリの動作が遅いので速度を改善したい",
+    "ログイン時にエラーが出るバグを修正してほしい",
+    "セキュリティスキャンを実行して脆弱性を確認して",
+    "前回の変更をロールバックして元に戻す",
+    "新しい機能として通知を追加したい",
+    "Please fix the error on the settings page",
+    "Add dark mode support",
+    "Check the project for security vulnerabilities",
+    "予約管理システム。顧客一覧、予約詳細、スタッフのシフト表",
+    "こんにちは",
+    "会員制のオンラインサロンを作りたい。" + SPEC * args.spec_repeat,
+    "Here is the spec for our marketplace.\n" + SPEC * args.spec_repeat,
+]
+
+
+def legacy_project_type(user_message):
+    """従来の Phase 1 のプロジェクトタイプ判定"""
+    project_type = "general"
+    if any(kw in user_message.lower() for kw in ["ec", "ecommerce", "ショップ", "通販"]):
+        project_type = "ecommerce"
+    elif any(kw in user_message.lower() for kw in ["sns", "ソーシャル", "コミュニティ"]):
+        project_type = "social"
+    elif any(kw in user_message.lower() for kw in ["dashboard", "ダッシュボード", "管理", "管理画面"]):
+        project_type = "dashboard"
+    return project_type
+
+
+def legacy_features(user_requirements):
+    """従来の code_templates の画面判定"""
+    features = []
+    if any(kw in user_requirements.lower() for kw in ["一覧", "リスト", "list"]):
+        features.append("list")
+    if any(kw in user_requirements.lower() for kw in ["詳細", "detail"]):
+        features.append("detail")
+    if any(kw in user_requirements.lower() for kw in ["ダッシュボード", "dashboard"]):
+        features.append("dashboard")
+    if not features:
+        features = ["dashboard", "list", "detail"]
+    return tuple(features)
+
+
+def legacy_improvement_type(user_message):
+    """従来の Phase 4 の改善タイプ判定"""
+    msg_lower = user_message.lower()
+    if any(kw in msg_lower for kw in ["セキュリティ", "脆弱性", "security", "vulnerability", "スキャン", "scan"]):
+        return "security"
+    elif any(kw in msg_lower for kw in ["ロールバック", "rollback", "戻す", "revert"]):
+        return "rollback"
+    elif any(kw in msg_lower for kw in ["遅い", "重い", "パフォーマンス", "速度", "performance", "slow"]):
+        return "performance"
+    elif any(kw in msg_lower for kw in ["機能", "追加", "新しい", "feature", "add"]):
+        return "feature"
+    elif any(kw in msg_lower for kw in ["バグ", "エラー", "不具合", "bug", "error", "fix"]):
+        return "bug_fix"
+    return "general"
+
+
+def legacy(message):
+    """従来の1リクエスト分の判定（Phase 1 はモック・実APIの両経路で判定していた）"""
+    legacy_project_type(message)
+    legacy_project_type(message)
+    legacy_features(message)
+    legacy_improvement_type(message)
+
+
+def classified(message):
+    """分類器での1リクエスト分の判定"""
+    intent = classify_intent(message)
+    intent.project_type
+    intent.features_or_default
+    intent.improvement_type
+
+
+def measure(func, message):
+    """1回あたりの所要時間（マイクロ秒）"""
+    return min(timeit.repeat(lambda: func(message), number=args.number, repeat=5)) / args.number * 1e6
+
+
+def main():
+    """メイン処理"""
+    for message in CORPUS:
+        intent = classify_intent(message)
+        expected = (legacy_project_type(message), legacy_features(message), legacy_improvement_type(message))
+        actual = (intent.project_type, intent.features_or_default, intent.improvement_type)
+        assert actual == expected, f"判定結果が一致しません: {message[:40]!r} {actual} != {expected}"
+    print(f"判定結果の一致 OK（{len(CORPUS)}件）")
+
+    print("=" * 72)
+    print(f"{'プロンプト':<24} {'文字数':>8} {'従来':>10} {'分類器':>10} {'短縮':>7}")
+    print("=" * 72)
+    total_legacy = total_classified = 0.0
+    for message in CORPUS:
+        before = measure(legacy, message)
+        after = measure(classified, message)
+        total_legacy += before
+        total_classified += after
+        label = message.splitlines()[0][:12]
+        print(f"{label:<24} {len(message):>8} {before:>8.2f}us {after:>8.2f}us {before / after:>6.1f}x")
+    print("-" * 72)
+    print(
+        f"{'コーパス合計':<24} {sum(map(len, CORPUS)):>8} {total_legacy:>8.2f}us {total_classified:>8.2f}us"
+        f" {total_legacy / total_classified:>6.1f}x"
+    )
+
+
+if __name__ == "__main__":
+    main()
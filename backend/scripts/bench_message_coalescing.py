@@ -0,0 +1,141 @@
+"""
+同じメッセージの相乗り（agent_job_service の dedupe_key）ベンチマーク
+
+Claude APIを一定時間かけて応答をストリーミングする偽のクライアントに差し替え、
+リアルAIモードで1つのプロジェクトに同じメッセージを同時に複数回送る状況
+（ダブルクリック・フロントエンドの再送）で、
+- 相乗りなし（AGENT_JOB_COALESCE_MESSAGES=false 相当）
+- 相乗りあり
+のジョブ数・保存されたメッセージ数・Claude APIの呼び出し回数・全リクエストの所要時間を比較します。
+すべてのリクエストが同じ応答を受け取ることも確認します。
+
+使い方:
+    python scripts/bench_message_coalescing.py --duplicates 2 5 10 --latency 1.0
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+# プロジェクトルートをPythonパスに追加
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+parser = argparse.ArgumentParser(description="同じメッセージの相乗りのベンチマーク")
+parser.add_argument("--duplicates", type=int, nargs="+", default=[2, 5, 10], help="同時に送る同じメッセージの数")
+parser.add_argument("--latency", type=float, default=1.0, help="応答のストリーミングにかかる時間（秒）")
+args = parser.parse_args()
+
+db_path = Path(tempfile.mkdtemp()) / "bench_message_coalescing.db"
+os.environ["DATABASE_URL"] = f"sqlite:///{db_path}"
+os.environ["USE_REAL_AI"] = "true"
+os.environ["DEBUG"] = "false"
+os.environ.setdefault("CLAUDE_API_KEY", "bench")
+
+from fastapi.testclient import TestClient
+from app.agents import AgentRegistry
+from app.agents.claude_client import delta_sink
+from app.core.config import settings
+from app.core.database import SessionLocal, init_db
+from app.main import app
+from app.models.models import Message, PhaseExecution, User, UserStatus
+
+RESPONSE_CHUNKS = 20
+
+
+class FakeClaude:
+    """latency 秒かけて応答をストリーミングするクライアント"""
+
+    def __init__(self):
+        self.calls = 0
+
+    async def generate_text(self, **kwargs):
+        self.calls += 1
+        sink = delta_sink.get()
+        chunks = [f"要件{i}を確認しました。" for i in range(RESPONSE_CHUNKS)]
+        for chunk in chunks:
+            if sink is not None:
+                sink(chunk)
+            await asyncio.sleep(args.latency / RESPONSE_CHUNKS)
+        return {"content": "".join(chunks), "usage": {}}
+
+    def estimate_cost(self, usage):
+        return {}
+
+
+def token_content(body):
+    """SSEレスポンスからトークン本文を連結"""
+    events = [json.loads(line[6:]) for line in body.split("\n") if line.startswith("data: ")]
+    return "".join(event.get("content", "") for event in events if event["type"] == "token")
+
+
+def measure(client, headers, claude, coalesce, duplicates):
+    settings.AGENT_JOB_COALESCE_MESSAGES = coalesce
+    project_id = client.post("/api/v1/projects", json={"name": "P", "description": "d"}, headers=headers).json()["id"]
+    calls_before = claude.calls
+    bodies = []
+
+    def send():
+        response = client.post(
+            f"/api/v1/projects/{project_id}/messages",
+            json={"content": "ECサイトを作りたい", "phase": 1},
+            headers=headers,
+        )
+        bodies.append(response.text)
+
+    start = time.perf_counter()
+    threads = [threading.Thread(target=send) for _ in range(duplicates)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    db = SessionLocal()
+    jobs = db.query(PhaseExecution).filter(PhaseExecution.project_id == project_id).count()
+    messages = db.query(Message).filter(Message.project_id == project_id).count()
+    db.close()
+    same = len({token_content(body) for body in bodies}) == 1
+    label = "相乗りあり" if coalesce else "相乗りなし"
+    print(
+        f"{duplicates:>4}件 {label:<8} ジョブ {jobs:>3}  メッセージ {messages:>3}  API {claude.calls - calls_before:>3}回"
+        f"  所要時間 {elapsed:>5.2f}s  同じ応答 {'OK' if same else 'NG'}"
+    )
+
+
+def main():
+    """メイン処理"""
+    init_db()
+    claude = FakeClaude()
+    with TestClient(app) as client:
+        AgentRegistry.get_phase_agent(1).claude = claude
+        client.post(
+            "/api/v1/auth/register",
+            json={"name": "bench", "email": "bench@example.com", "password": "password123", "purpose": "x" * 25},
+        )
+        db = SessionLocal()
+        user = db.query(User).first()
+        user.status = UserStatus.approved
+        db.commit()
+        db.close()
+        token = client.post(
+            "/api/v1/auth/login", json={"email": "bench@example.com", "password": "password123"}
+        ).json()["access_token"]
+        headers = {"Authorization": f"Bearer {token}"}
+
+        print("=" * 96)
+        print(f"同じメッセージを同時に送信（応答 {args.latency}s、1ユーザーの同時実行数 {settings.AGENT_JOB_MAX_PER_USER}）")
+        print("=" * 96)
+        for duplicates in args.duplicates:
+            measure(client, headers, claude, False, duplicates)
+            measure(client, headers, claude, True, duplicates)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""
+オーケストレーターのパイプライン実行ベンチマーク
+
+Phase 2 と Phase 5-14 のエージェントを、Claude APIの応答時間を模して一定時間待つエージェントに差し替え、
+OrchestratorAgent.execute_pipeline を同時実行数の上限を変えて実行し、
+実行時間（wall-clock）と各Phaseの所要時間の合計を比較します。
+同時実行数 1 が従来の1Phaseずつの実行に相当します。
+
+使い方:
+    python scripts/bench_orchestrator_pipeline.py --scale 0.2 --concurrency 1 4 10
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+from pathlib import Path
+
+# プロジェクトルートをPythonパスに追加
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+parser = argparse.ArgumentParser(description="オーケストレーターのパイプライン実行ベンチマーク")
+parser.add_argument("--scale", type=float, default=0.2, help="各Phaseの所要時間の倍率（1.0で実APIに近い秒数）")
+parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 10], help="比較する同時実行数の上限")
+args = parser.parse_args()
+
+os.environ["DEBUG"] = "false"
+
+from app.agents import AgentRegistry
+from app.agents.base import AgentLevel, BaseAgent
+from app.agents.phase_agents import DEFAULT_PIPELINE_PHASES, OrchestratorAgent
+
+# Phaseごとの所要時間（秒、scale=1.0）: 生成量の多いPhaseほど長い
+PHASE_SECONDS = {
+    2: 20.0,
+    5: 12.0,
+    6: 10.0,
+    7: 6.0,
+    8: 6.0,
+    9: 8.0,
+    10: 5.0,
+    11: 5.0,
+    12: 6.0,
+    13: 8.0,
+    14: 5.0,
+}
+
+
+class SlowAgent(BaseAgent):
+    """一定時間待ってから結果を返すエージェント"""
+
+    def __init__(self, phase: int, seconds: float):
+        super().__init__(name=f"BenchPhase{phase}Agent", agent_type="bench", level=AgentLevel.WORKER)
+        self.phase = phase
+        self.seconds = seconds
+
+    async def execute(self, task):
+        await asyncio.sleep(self.seconds)
+        if self.phase != 2:
+            assert task["generated_code"] == {"backend": {"main.py": "app"}}, "Phase 2 の生成コードが渡されていません"
+            assert 2 in task["upstream_results"], "依存Phaseの結果が渡されていません"
+        return {
+            "status": "success",
+            "response": f"Phase {self.phase} done",
+            "generated_code": {"backend": {"main.py": "app"}} if self.phase == 2 else None,
+        }
+
+
+async def main():
+    """メイン処理"""
+    for phase, seconds in PHASE_SECONDS.items():
+        AgentRegistry.register(f"phase{phase}", SlowAgent(phase, seconds * args.scale))
+    orchestrator = OrchestratorAgent()
+
+    print("=" * 72)
+    print(f"Phase {', '.join(map(str, DEFAULT_PIPELINE_PHASES))}（所要時間の倍率 {args.scale}）")
+    print("=" * 72)
+    print(f"{'同時実行数':<10} {'実行時間':>10} {'Phase合計':>10} {'短縮':>8}")
+    for concurrency in args.concurrency:
+        progress = []
+        events = orchestrator.execute_stream({"mode": "pipeline", "max_concurrency": concurrency})
+        async for event in events:
+            if event["type"] == "delta":
+                progress.append(event["content"])
+            else:
+                result = event["result"]
+        assert result["status"] == "success", result["response"]
+        assert sum(line.count("▶") for line in progress) == len(DEFAULT_PIPELINE_PHASES), "進捗が配信されていません"
+        print(
+            f"{concurrency:<10} {result['wall_clock_seconds']:>9.2f}s {result['sum_of_phases_seconds']:>9.2f}s"
+            f" {result['speedup']:>7.1f}x"
+        )
+
+    # 依存Phaseが失敗した場合は後続Phaseを実行しない
+    AgentRegistry.register("phase2", SlowAgent(2, 0.0))
+    AgentRegistry.get_phase_agent(2).execute = _fail
+    result = await orchestrator.execute({"mode": "pipeline", "phases": [2, 5, 6]})
+    statuses = {phase: entry["status"] for phase, entry in result["phases"].items()}
+    assert statuses == {2: "failed", 5: "skipped", 6: "skipped"}, statuses
+    print(f"失敗時のスキップ OK: {statuses}")
+
+
+async def _fail(task):
+    raise RuntimeError("bench failure")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,121 @@
+"""
+ログイン時のパスワード検証（bcrypt）ベンチマーク
+
+同時に N 件のログイン（パスワード検証）を行いながら、10ms間隔のハートビートタスクで
+イベントループの遅延を測り、
+- 従来: コルーチン内で verify_password を直接実行（イベントループを止める）
+- スレッドプール: verify_and_update_password（security._run_in_hash_pool）
+のスループットとループ遅延を比較します。コスト係数変更時の再ハッシュも確認します。
+
+使い方:
+    python scripts/bench_password_hashing.py --logins 32 --rounds 12 --workers 4
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+from pathlib import Path
+
+# プロジェクトルートをPythonパスに追加
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+parser = argparse.ArgumentParser(description="パスワード検証のベンチマーク")
+parser.add_argument("--logins", type=int, default=32, help="同時ログイン数")
+parser.add_argument("--rounds", type=int, default=12, help="bcryptのコスト係数")
+parser.add_argument("--workers", type=int, default=4, help="ハッシュ用スレッド数")
+args = parser.parse_args()
+
+# app の設定読み込み前に差し替える
+os.environ["BCRYPT_ROUNDS"] = str(args.rounds)
+os.environ["PASSWORD_HASH_WORKERS"] = str(args.workers)
+os.environ["PASSWORD_HASH_MAX_PENDING"] = str(max(args.logins, 1))
+os.environ["DEBUG"] = "false"
+
+from passlib.context import CryptContext
+from app.core import security
+
+PASSWORD = "password123"
+HEARTBEAT_SECONDS = 0.01
+
+
+async def heartbeat(lags, stop):
+    """一定間隔で起き、予定より遅れた時間を記録（他の接続の応答遅延の目安）"""
+    loop = asyncio.get_running_loop()
+    while not stop.is_set():
+        expected = loop.time() + HEARTBEAT_SECONDS
+        await asyncio.sleep(HEARTBEAT_SECONDS)
+        lags.append((loop.time() - expected) * 1000)
+
+
+async def inline_login(hashed):
+    """変更前の auth.login と同じくイベントループ上で検証"""
+    await asyncio.sleep(0)  # DB読み込みの代わり
+    return security.verify_password(PASSWORD, hashed)
+
+
+async def pooled_login(hashed):
+    await asyncio.sleep(0)
+    valid, _ = await security.verify_and_update_password(PASSWORD, hashed)
+    return valid
+
+
+async def measure(login, hashed):
+    lags = []
+    stop = asyncio.Event()
+    beat = asyncio.create_task(heartbeat(lags, stop))
+    await asyncio.sleep(HEARTBEAT_SECONDS * 2)
+
+    start = time.perf_counter()
+    results = await asyncio.gather(*(login(hashed) for _ in range(args.logins)))
+    elapsed = time.perf_counter() - start
+
+    stop.set()
+    await beat
+    assert all(results), "パスワード検証に失敗しました"
+    lags.sort()
+    return {
+        "elapsed": elapsed,
+        "throughput": args.logins / elapsed,
+        "lag_p50": statistics.median(lags) if lags else 0.0,
+        "lag_max": lags[-1] if lags else 0.0,
+        "beats": len(lags),
+    }
+
+
+async def check_rehash():
+    """コスト係数の異なる既存ハッシュがログイン時に再ハッシュされることを確認"""
+    old_rounds = args.rounds - 2 if args.rounds > 5 else args.rounds + 2
+    old_hash = CryptContext(schemes=["bcrypt"], bcrypt__rounds=old_rounds).hash(PASSWORD)
+    valid, new_hash = await security.verify_and_update_password(PASSWORD, old_hash)
+    assert valid and new_hash, "再ハッシュされませんでした"
+    assert new_hash.split("$")[2] == f"{args.rounds:02d}", "新しいハッシュのコスト係数が設定と一致しません"
+    valid, again = await security.verify_and_update_password(PASSWORD, new_hash)
+    assert valid and again is None, "設定どおりのハッシュが再ハッシュされました"
+    print(f"再ハッシュ: cost {old_rounds} → {args.rounds} OK")
+
+
+async def main():
+    """メイン処理"""
+    hashed = security.get_password_hash(PASSWORD)
+
+    print("=" * 72)
+    print(f"同時ログイン {args.logins}件 (bcrypt cost={args.rounds}, workers={args.workers}, CPU={os.cpu_count()})")
+    print("=" * 72)
+    print(f"{'':<16} {'所要時間':>10} {'logins/s':>10} {'ループ遅延p50':>14} {'最大':>10} {'鼓動':>6}")
+    for label, login in (("従来（同期）", inline_login), ("スレッドプール", pooled_login)):
+        result = await measure(login, hashed)
+        print(
+            f"{label:<16} {result['elapsed']:>9.2f}s {result['throughput']:>10.1f}"
+            f" {result['lag_p50']:>12.1f}ms {result['lag_max']:>8.1f}ms {result['beats']:>6}"
+        )
+
+    await check_rehash()
+    security.shutdown_password_hasher()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
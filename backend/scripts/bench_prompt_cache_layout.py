@@ -0,0 +1,206 @@
+"""
+プロンプトキャッシュを考慮したリクエストの組み立て（agents/prompt_layout）ベンチマーク
+
+Claude APIのプロンプトキャッシュ（ブレークポイントまでの接頭辞単位・20ブロックまで遡って検索・
+最小1024トークン・書き込み1.25倍・読み込み0.1倍の料金）を模擬し、
+- Phase 2 のコード生成を同じプロジェクトで繰り返す（追加指示だけが変わる）
+- ClaudeService で会話を続ける（履歴が1往復ずつ伸びる）
+の2つのワークロードについて、従来の組み立てと build_prompt_request の
+入力トークンの内訳・プロンプトキャッシュのヒット率・推定コストを比較します。
+ヒット率は管理画面（usage_rollup_service）と同じ式で算出します。
+
+使い方:
+    python scripts/bench_prompt_cache_layout.py --projects 20 --iterations 5 --turns 20
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import sys
+from pathlib import Path
+
+# プロジェクトルートをPythonパスに追加
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+parser = argparse.ArgumentParser(description="プロンプトキャッシュのレイアウトのベンチマーク")
+parser.add_argument("--projects", type=int, default=20, help="プロジェクト数")
+parser.add_argument("--iterations", type=int, default=5, help="1プロジェクトあたりのPhase 2のコード生成回数")
+parser.add_argument("--turns", type=int, default=20, help="ClaudeServiceの会話の往復数")
+parser.add_argument("--requirement-lines", type=int, default=40, help="要件サマリーの行数")
+args = parser.parse_args()
+
+os.environ["DEBUG"] = "false"
+
+from app.agents.context_builder import estimate_tokens
+from app.agents.phase_agents import Phase2CodeGenerationAgent
+from app.agents.prompt_layout import build_prompt_request
+from app.services.usage_rollup_service import _prompt_cache_hit_rate
+
+MIN_CACHE_TOKENS = 1024
+LOOKBACK_BLOCKS = 20  # ブレークポイントから遡ってキャッシュを探すブロック数
+PRICE_INPUT, PRICE_WRITE, PRICE_READ = 3.0, 3.75, 0.30  # USD / MTok
+
+
+class PromptCacheSimulator:
+    """ブレークポイントまでの接頭辞をキーにしたプロンプトキャッシュ（有効期限は考えない）"""
+
+    def __init__(self):
+        self.cached = set()
+        self.usage = {"input_tokens": 0, "cache_creation_tokens": 0, "cache_read_tokens": 0}
+
+    def request(self, system, messages):
+        # (ブロックの内容, トークン数, ブレークポイントか) の並び
+        blocks = []
+        for block in system:
+            blocks.append((block["text"], estimate_tokens(block["text"]), "cache_control" in block))
+        for message in messages:
+            # メッセージ自体に付いた cache_control はAPIの仕様外（ブロックに付ける必要がある）
+            content = message["content"]
+            if isinstance(content, str):
+                content = [{"type": "text", "text": content}]
+            for block in content:
+                blocks.append((block["text"], estimate_tokens(block["text"]) + 4, "cache_control" in block))
+
+        total = sum(tokens for _, tokens, _ in blocks)
+        digest = hashlib.sha256()
+        boundaries = []  # ブロックの境界ごとの (接頭辞のキー, 接頭辞のトークン数)
+        breakpoints = []  # ブレークポイントの位置（boundaries の添字）
+        prefix = 0
+        for text, tokens, breakpoint in blocks:
+            digest.update(json.dumps(text).encode("utf-8"))
+            prefix += tokens
+            boundaries.append((digest.hexdigest(), prefix))
+            if breakpoint and prefix >= MIN_CACHE_TOKENS:
+                breakpoints.append(len(boundaries) - 1)
+
+        # 各ブレークポイントから最大20ブロック前まで遡って、キャッシュ済みの最長の接頭辞を探す
+        read = 0
+        for index in breakpoints:
+            for key, tokens in reversed(boundaries[max(index - LOOKBACK_BLOCKS + 1, 0):index + 1]):
+                if key in self.cached:
+                    read = max(read, tokens)
+                    break
+        # ブレークポイントまでの接頭辞を書き込む
+        written = 0
+        for index in breakpoints:
+            key, tokens = boundaries[index]
+            if tokens > read:
+                self.cached.add(key)
+                written = tokens
+        creation = max(written - read, 0)
+        self.usage["cache_read_tokens"] += read
+        self.usage["cache_creation_tokens"] += creation
+        self.usage["input_tokens"] += total - read - creation
+
+    def report(self, label):
+        usage = self.usage
+        cost = (
+            usage["input_tokens"] * PRICE_INPUT
+            + usage["cache_creation_tokens"] * PRICE_WRITE
+            + usage["cache_read_tokens"] * PRICE_READ
+        ) / 1_000_000
+        print(
+            f"{label:<10} 通常 {usage['input_tokens']:>9,}  書き込み {usage['cache_creation_tokens']:>9,}"
+            f"  読み込み {usage['cache_read_tokens']:>9,}  ヒット率 {_prompt_cache_hit_rate(usage):>6.2f}%  ${cost:.4f}"
+        )
+        return cost
+
+
+def requirements_summary(project):
+    return "\n".join(
+        f"- プロジェクト{project}の要件{line}: 一覧画面で商品を検索・絞り込みし、詳細画面からカートに追加できること"
+        for line in range(args.requirement_lines)
+    )
+
+
+def legacy_phase2(system_prompt, project, instruction):
+    """従来: システムプロンプトだけにブレークポイント、要件は毎回のユーザー発言に含める"""
+    prompt = f"""Phase 1の要件定義に基づいて、フルスタックアプリケーションのコードを生成してください。
+
+**プロジェクト名**: Project {project}
+
+**要件サマリー**:
+{requirements_summary(project)}
+
+**ユーザーの追加指示**:
+{instruction}"""
+    system = [{"type": "text", "text": system_prompt, "cache_control": {"type": "ephemeral"}}]
+    return system, [{"role": "user", "content": prompt}]
+
+
+def layout_phase2(system_prompt, project, instruction):
+    """新: プロジェクト名と要件サマリーを固定コンテキストとしてシステムプロンプトの後ろに置く"""
+    project_prompt = f"**プロジェクト名**: Project {project}\n\n**要件サマリー**:\n{requirements_summary(project)}"
+    layout = build_prompt_request(
+        system_prompt,
+        [{"role": "user", "content": f"**ユーザーの追加指示**:\n{instruction}"}],
+        stable_context=project_prompt,
+        min_cache_tokens=MIN_CACHE_TOKENS,
+    )
+    return layout.system, layout.messages
+
+
+def legacy_chat(system_prompt, messages):
+    """従来の ClaudeService.send_message_stream（messages[-2] 自体に cache_control を付ける）"""
+    system = [{"type": "text", "text": system_prompt}]
+    if len(system_prompt) > 1024:
+        system[0]["cache_control"] = {"type": "ephemeral"}
+    processed = messages.copy()
+    if len(processed) > 2:
+        processed[-2]["cache_control"] = {"type": "ephemeral"}
+    return system, processed
+
+
+def layout_chat(system_prompt, messages):
+    layout = build_prompt_request(system_prompt, messages, cache_history=True, min_cache_tokens=MIN_CACHE_TOKENS)
+    return layout.system, layout.messages
+
+
+def run_phase2(layout):
+    simulator = PromptCacheSimulator()
+    system_prompt = Phase2CodeGenerationAgent().system_prompt
+    for project in range(args.projects):
+        for iteration in range(args.iterations):
+            simulator.request(*layout(system_prompt, project, f"画面{iteration}のデザインを変更してください"))
+    return simulator
+
+
+def run_chat(layout):
+    simulator = PromptCacheSimulator()
+    system_prompt = "あなたは親切で有能なAIアシスタントです。"
+    messages = []
+    for turn in range(args.turns):
+        messages.append({"role": "user", "content": f"質問{turn}: " + "画面の構成について詳しく教えてください。" * 20})
+        simulator.request(*layout(system_prompt, messages))
+        messages.append({"role": "assistant", "content": f"回答{turn}: " + "一覧画面と詳細画面に分けて構成します。" * 40})
+    # 呼び出し元の履歴に残った cache_control（次のリクエストでもメッセージに付いたまま送られる）
+    mutated = sum(1 for message in messages if "cache_control" in message)
+    return simulator, mutated
+
+
+def main():
+    """メイン処理"""
+    print("=" * 104)
+    print(f"Phase 2 のコード生成: {args.projects}プロジェクト × {args.iterations}回（要件サマリー {args.requirement_lines}行）")
+    print("=" * 104)
+    legacy = run_phase2(legacy_phase2).report("従来")
+    new = run_phase2(layout_phase2).report("新")
+    print(f"コスト削減: {(1 - new / legacy) * 100:.1f}%")
+
+    print()
+    print("=" * 104)
+    print(f"ClaudeService の会話: {args.turns}往復")
+    print("=" * 104)
+    simulator, legacy_mutated = run_chat(legacy_chat)
+    legacy = simulator.report("従来")
+    simulator, new_mutated = run_chat(layout_chat)
+    new = simulator.report("新")
+    print(f"コスト削減: {(1 - new / legacy) * 100:.1f}%")
+    print(f"呼び出し元の履歴に残った cache_control: 従来 {legacy_mutated}件 / 新 {new_mutated}件")
+    assert new_mutated == 0
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,163 @@
+"""
+Claude API 応答キャッシュ（services/response_cache_service）ベンチマーク
+
+Anthropic APIを一定時間待ってから応答する偽のクライアントに差し替え、リアルAIモードの
+Phase 1 エージェントに、多数のユーザーがよく似た依頼（「ECサイトを作りたい」の表記ゆれ等）を送る状況で
+- キャッシュなし
+- 完全一致のみ
+- 完全一致 + 類似一致
+のAPI呼び出し回数・1依頼あたりの平均所要時間・推定コストを比較します。
+同じユーザーが直前の依頼を言い換えて送り直すケース（類似一致の対象）も含みます。
+
+使い方:
+    python scripts/bench_response_cache.py --users 50 --requests 4 --latency 0.2
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+# プロジェクトルートをPythonパスに追加
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+parser = argparse.ArgumentParser(description="Claude API 応答キャッシュのベンチマーク")
+parser.add_argument("--users", type=int, default=50, help="ユーザー数")
+parser.add_argument("--requests", type=int, default=4, help="1ユーザーあたりの依頼数")
+parser.add_argument("--latency", type=float, default=0.2, help="APIの応答時間（秒）")
+parser.add_argument("--threshold", type=float, default=0.9, help="類似一致のしきい値")
+args = parser.parse_args()
+
+os.environ["USE_REAL_AI"] = "true"
+os.environ["DEBUG"] = "false"
+os.environ.setdefault("CLAUDE_API_KEY", "bench")
+
+from app.agents import AgentRegistry
+from app.agents.claude_client import get_claude_client
+from app.services import response_cache_service
+from app.services.api_log_service import UsageContext, usage_context
+from app.services.response_cache_service import ResponseCache
+
+# よくある依頼とその表記ゆれ
+PROMPTS = [
+    ["ECサイトを作りたい", "ＥＣサイトを作りたい", "ECサイトを 作りたい", "ECサイトを作りたいです"],
+    ["社内SNSを作りたい", "社内ＳＮＳを作りたい", "社内SNSを作りたいです"],
+    ["売上の管理ダッシュボードが欲しい", "売上の管理ダッシュボードがほしい"],
+    ["予約管理システムを作りたい", "予約管理システムを作りたい。"],
+]
+UNIQUE_RATIO = 0.3  # 他の人と重ならない依頼の割合
+REPHRASE_RATIO = 0.3  # 直前の依頼を言い換えて送り直す割合
+REPHRASES = ["{}です", "{}。", "{}！", "{}です。よろしくお願いします"]
+
+
+class FakeMessages:
+    """一定時間待ってから応答する messages API"""
+
+    def __init__(self):
+        self.calls = 0
+
+    async def create(self, **request):
+        self.calls += 1
+        await asyncio.sleep(args.latency)
+        prompt = request["messages"][-1]["content"]
+        if not isinstance(prompt, str):
+            prompt = prompt[-1]["text"]
+        return SimpleNamespace(
+            content=[SimpleNamespace(text=f"「{prompt}」について、対象ユーザーと必要な画面を教えてください。")],
+            usage=SimpleNamespace(
+                input_tokens=1200, output_tokens=400, cache_creation_input_tokens=0, cache_read_input_tokens=0
+            ),
+            model=request["model"],
+            stop_reason="end_turn",
+        )
+
+
+def build_workload():
+    """(ユーザーID, 依頼) のリスト"""
+    random.seed(1)
+    workload = []
+    for user in range(args.users):
+        prompt = None
+        for i in range(args.requests):
+            if prompt is not None and random.random() < REPHRASE_RATIO:
+                prompt = random.choice(REPHRASES).format(prompt.rstrip("。"))
+            elif random.random() < UNIQUE_RATIO:
+                prompt = f"ユーザー{user}専用の業務アプリ{i}を作りたい"
+            else:
+                prompt = random.choice(random.choice(PROMPTS))
+            workload.append((f"user-{user}", prompt))
+    return workload
+
+
+async def request(agent, user_id, prompt):
+    """1依頼を実行し、所要時間（秒）を返す"""
+    usage_context.set(UsageContext(user_id=user_id, phase=1, agent_name=agent.name))
+    start = time.perf_counter()
+    result = await agent.execute({"user_message": prompt, "conversation_history": []})
+    assert result["status"] == "success", result
+    return time.perf_counter() - start
+
+
+async def measure(label, cache, workload):
+    response_cache_service._response_cache = cache
+    messages = FakeMessages()
+    get_claude_client().client = SimpleNamespace(messages=messages)
+    agent = AgentRegistry.get_phase_agent(1)
+
+    # 同じユーザーの依頼は順番に、ユーザー間は同時に送る
+    per_user = {}
+    for user_id, prompt in workload:
+        per_user.setdefault(user_id, []).append(prompt)
+    latencies = []
+
+    async def run_user(user_id, prompts):
+        for prompt in prompts:
+            latencies.append(await request(agent, user_id, prompt))
+
+    await asyncio.gather(*(run_user(user_id, prompts) for user_id, prompts in per_user.items()))
+
+    cost = messages.calls * (1200 * 3 + 400 * 15) / 1_000_000
+    stats = cache.stats()
+    print(
+        f"{label:<16} API {messages.calls:>4}回  平均 {statistics.mean(latencies) * 1000:>6.1f}ms  ${cost:>6.3f}"
+        f"  完全一致 {stats['exact_hits']:>4}  類似一致 {stats['similar_hits']:>4}  ヒット率 {stats['hit_rate']:.0%}"
+    )
+
+
+async def main():
+    """メイン処理"""
+    AgentRegistry.warm_up()
+    workload = build_workload()
+    print("=" * 96)
+    print(f"ユーザー {args.users} × {args.requests}依頼（API応答 {args.latency}s、類似一致のしきい値 {args.threshold}）")
+    print("=" * 96)
+
+    disabled = ResponseCache()
+    disabled.enabled = False
+    await measure("キャッシュなし", disabled, workload)
+    await measure("完全一致のみ", ResponseCache(similarity_enabled=False), workload)
+    await measure(
+        "完全一致+類似一致", ResponseCache(similarity_enabled=True, similarity_threshold=args.threshold), workload
+    )
+
+    # ユーザーが無効にしている場合はAPIを呼ぶ
+    cache = ResponseCache()
+    response_cache_service._response_cache = cache
+    messages = FakeMessages()
+    get_claude_client().client = SimpleNamespace(messages=messages)
+    agent = AgentRegistry.get_phase_agent(1)
+    for _ in range(2):
+        usage_context.set(UsageContext(user_id="opt-out", phase=1, response_cache=False))
+        await agent.execute({"user_message": "ECサイトを作りたい", "conversation_history": []})
+    assert messages.calls == 2 and cache.stats()["bypassed"] == 2
+    print("無効にしたユーザーはキャッシュを使わない OK")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,92 @@
+"""
+SSEフレーミング ベンチマーク
+
+10KB程度の応答を、旧実装（1文字ごとにJSONエンベロープを生成）と
+SSEEmitter（バイト数・時間でまとめ送り）でフレーム化し、
+フレーム生成速度・フレーム数・転送バイト数を比較します。
+
+使い方:
+    python scripts/bench_sse_framing.py --size 10000 --delta-chars 4
+"""
+
+import argparse
+import asyncio
+import json
+import sys
+import time
+from pathlib import Path
+
+# プロジェクトルートをPythonパスに追加
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from app.utils.sse import SSEEmitter
+
+
+def build_response(size: int) -> str:
+    """Phase 2の応答を模した日本語+コード混在のテキスト"""
+    unit = "✅ **コードを生成しました！**\n```typescript\nexport const App = () => <div>こんにちは</div>;\n```\n"
+    return (unit * (size // len(unit) + 1))[:size]
+
+
+def bench_per_character(text: str):
+    """旧実装: 1文字ごとに json.dumps したフレームを生成"""
+    start = time.perf_counter()
+    frames = [f"data: {json.dumps({'type': 'token', 'content': char})}\n\n" for char in text]
+    elapsed = time.perf_counter() - start
+    return len(frames), sum(len(f.encode("utf-8")) for f in frames), elapsed
+
+
+async def bench_emitter(text: str, delta_chars: int):
+    """新実装: モデルの差分（delta_chars文字ずつ）をSSEEmitterでまとめ送り"""
+
+    async def deltas():
+        for i in range(0, len(text), delta_chars):
+            yield text[i:i + delta_chars]
+
+    emitter = SSEEmitter()
+    start = time.perf_counter()
+    frames = [frame async for frame in emitter.frames(deltas())]
+    elapsed = time.perf_counter() - start
+
+    # 内容が欠落していないことを確認
+    restored = "".join(json.loads(f[len("data: "):])["content"] for f in frames if f.startswith("data: "))
+    assert restored == text, "フレームから復元した内容が元の応答と一致しません"
+
+    return len(frames), sum(len(f.encode("utf-8")) for f in frames), elapsed
+
+
+def main():
+    """メイン処理"""
+    parser = argparse.ArgumentParser(description="SSEフレーミング ベンチマーク")
+    parser.add_argument("--size", type=int, default=10_000, help="応答の文字数")
+    parser.add_argument("--delta-chars", type=int, default=4, help="モデル差分1件あたりの文字数")
+    parser.add_argument("--rounds", type=int, default=20, help="計測回数（平均を表示）")
+    args = parser.parse_args()
+
+    text = build_response(args.size)
+
+    old_frames = old_bytes = new_frames = new_bytes = 0
+    old_time = new_time = 0.0
+    for _ in range(args.rounds):
+        old_frames, old_bytes, elapsed = bench_per_character(text)
+        old_time += elapsed
+        new_frames, new_bytes, elapsed = asyncio.run(bench_emitter(text, args.delta_chars))
+        new_time += elapsed
+    old_time /= args.rounds
+    new_time /= args.rounds
+
+    print("=" * 60)
+    print(f"SSEフレーミング ベンチマーク (応答 {len(text)}文字 / {len(text.encode('utf-8'))}バイト)")
+    print("=" * 60)
+    print(f"{'':24}{'フレーム数':>10}{'転送バイト':>12}{'生成時間(ms)':>14}{'frames/s':>12}")
+    print(f"{'旧実装（1文字1フレーム）':20}{old_frames:>10}{old_bytes:>12}{old_time * 1000:>14.2f}{old_frames / old_time:>12.0f}")
+    print(f"{'SSEEmitter':24}{new_frames:>10}{new_bytes:>12}{new_time * 1000:>14.2f}{new_frames / new_time:>12.0f}")
+    print()
+    print(f"転送バイト削減率: {(1 - new_bytes / old_bytes) * 100:.1f}%")
+    print(f"応答あたりのフレーム化時間: {old_time / new_time:.1f}x 高速")
+    print("※ 旧実装は上記に加えて1文字ごとに asyncio.sleep(0.01) していた（10,000文字で100秒以上）")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""
+モックモードのテンプレート描画キャッシュ（templates/render_cache）ベンチマーク
+
+モックモードの Phase 2-14 エージェントの execute を多数同時に繰り返し呼び出し、
+- キャッシュなし（件数上限0 = 従来どおり毎回描画）
+- キャッシュあり
+の1回あたりの所要時間とスループットを比較します。
+モックモードのエージェントは await せずに描画するため、同時実行数が多いほど描画時間がそのまま待ち時間になります。
+あわせてキャッシュ対象のテンプレートごとに描画と取得の所要時間を比較します。
+
+使い方:
+    python scripts/bench_template_render_cache.py --concurrency 50 --rounds 20 --projects 5
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+import timeit
+from pathlib import Path
+
+# プロジェクトルートをPythonパスに追加
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+parser = argparse.ArgumentParser(description="テンプレート描画キャッシュのベンチマーク")
+parser.add_argument("--concurrency", type=int, default=50, help="同時に実行するリクエスト数")
+parser.add_argument("--rounds", type=int, default=20, help="繰り返し回数")
+parser.add_argument("--projects", type=int, default=5, help="プロジェクト名の種類")
+args = parser.parse_args()
+
+os.environ["USE_REAL_AI"] = "false"
+os.environ["DEBUG"] = "false"
+
+from app.agents import AgentRegistry
+from app.agents.templates import code_templates, deployment_templates, render_cache, test_templates
+
+PHASES = (2, 3, 5, 6, 7, 8, 9, 10, 11, 12, 13, 14)
+MESSAGES = ["商品一覧と詳細ページ", "管理ダッシュボード", "ECサイトを作りたい"]
+
+
+async def request(i):
+    """1リクエスト = いずれかのPhaseのエージェントを1回実行"""
+    phase = PHASES[i % len(PHASES)]
+    agent = AgentRegistry.get_phase_agent(phase)
+    start = time.perf_counter()
+    result = await agent.execute({
+        "user_message": MESSAGES[i % len(MESSAGES)],
+        "project_context": {"project_name": f"Bench Project {i % args.projects}"},
+        "generated_code": {},
+    })
+    assert result.get("status") != "error", result
+    return (time.perf_counter() - start) * 1000
+
+
+async def measure(label):
+    samples = []
+    start = time.perf_counter()
+    for round_no in range(args.rounds):
+        offset = round_no * args.concurrency
+        samples += await asyncio.gather(*(request(offset + i) for i in range(args.concurrency)))
+    elapsed = time.perf_counter() - start
+    print(
+        f"{label:<16} {statistics.median(samples):>8.3f} ms/回  p99 {sorted(samples)[int(len(samples) * 0.99)]:>8.3f} ms"
+        f"  {len(samples) / elapsed:>9.0f} req/s"
+    )
+
+
+def measure_templates():
+    """テンプレートごとの描画（キャッシュなし）と取得（キャッシュあり）の所要時間"""
+    templates = {
+        "project_code": (code_templates._render_project_code, ("Bench Project", ("dashboard", "list", "detail"))),
+        "deployment_scripts": (deployment_templates.generate_deployment_scripts, ("Bench Project",)),
+        "test_files": (test_templates.generate_test_files, ("Bench Project",)),
+    }
+    print(f"{'テンプレート':<20} {'描画':>10} {'キャッシュ':>10}")
+    for name, (func, call_args) in templates.items():
+        assert func(*call_args) == func.uncached(*call_args), f"{name}: キャッシュの内容が描画結果と一致しません"
+        uncached = min(timeit.repeat(lambda: func.uncached(*call_args), number=2000, repeat=5)) / 2000 * 1e6
+        cached = min(timeit.repeat(lambda: func(*call_args), number=2000, repeat=5)) / 2000 * 1e6
+        print(f"{name:<20} {uncached:>8.2f}us {cached:>8.2f}us")
+
+
+async def main():
+    """メイン処理"""
+    AgentRegistry.warm_up()
+    measure_templates()
+    print("=" * 72)
+    print(f"Phase {PHASES} × 同時 {args.concurrency} × {args.rounds}回（プロジェクト {args.projects}種類）")
+    print("=" * 72)
+
+    max_entries = render_cache._render_cache.max_entries
+    render_cache._render_cache.max_entries = 0
+    await measure("キャッシュなし")
+
+    render_cache._render_cache.max_entries = max_entries
+    render_cache.clear_render_cache()
+    await measure("キャッシュあり")
+
+    print(f"キャッシュ: {render_cache.get_render_cache_stats()}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,151 @@
+"""
+管理画面の使用統計（/admin/api-stats）ベンチマーク
+
+ベンチマーク用SQLiteに api_logs を投入し、
+- 従来: api_logs に対する約10本の集計クエリ
+- 集計テーブル: api_usage_daily からの2クエリ（usage_rollup_service.get_usage_summary）
+のレイテンシを比較します。
+
+使い方:
+    python scripts/bench_usage_rollups.py --api-logs 1000000
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+import uuid
+from datetime import datetime, timedelta
+from pathlib import Path
+
+# プロジェクトルートをPythonパスに追加
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+parser = argparse.ArgumentParser(description="管理画面の使用統計ベンチマーク")
+parser.add_argument("--api-logs", type=int, default=500_000)
+parser.add_argument("--users", type=int, default=1_000)
+parser.add_argument("--days", type=int, default=90, help="ログを分布させる日数")
+parser.add_argument("--repeat", type=int, default=10)
+parser.add_argument("--database-path", default="./bench_usage_rollups.db", help="ベンチマーク用SQLiteファイル（毎回作り直す）")
+args = parser.parse_args()
+
+# app の設定読み込み前に接続先を差し替える
+os.environ["DATABASE_URL"] = f"sqlite:///{args.database_path}"
+os.environ["DEBUG"] = "false"
+
+from sqlalchemy import insert, text
+from app.core.database import AsyncSessionLocal, Base, engine
+from app.models.models import ApiLog, User
+from app.services import usage_rollup_service
+
+BATCH_SIZE = 20_000
+LEGACY_QUERIES = [
+    "SELECT COUNT(id) FROM api_logs",
+    "SELECT SUM(cost) FROM api_logs",
+    "SELECT SUM(total_tokens) FROM api_logs",
+    "SELECT COUNT(id) FROM api_logs WHERE created_at >= :today",
+    "SELECT SUM(cost) FROM api_logs WHERE created_at >= :today",
+    "SELECT api_logs.user_id, users.name, COUNT(api_logs.id), SUM(api_logs.cost) FROM api_logs "
+    "JOIN users ON api_logs.user_id = users.id GROUP BY api_logs.user_id, users.name ORDER BY COUNT(api_logs.id) DESC LIMIT 10",
+    "SELECT phase, COUNT(id), SUM(cost), SUM(total_tokens) FROM api_logs WHERE phase IS NOT NULL GROUP BY phase ORDER BY phase",
+    "SELECT phase, COUNT(id), SUM(cost) FROM api_logs WHERE phase IS NOT NULL AND created_at >= :today GROUP BY phase ORDER BY phase",
+    "SELECT COUNT(id) FROM api_logs WHERE cached = 1",
+    "SELECT COUNT(id) FROM api_logs WHERE cached = 1 AND created_at >= :today",
+]
+
+
+def seed():
+    """ベンチマークデータを投入し、集計テーブルをマイグレーションと同じSQLで作成"""
+    now = datetime.utcnow()
+    user_ids = [str(uuid.uuid4()) for _ in range(args.users)]
+    with engine.begin() as conn:
+        conn.execute(insert(User.__table__), [
+            {
+                "id": user_id,
+                "email": f"bench{i}@example.com",
+                "name": f"Bench User {i}",
+                "hashed_password": "x",
+                "role": "user",
+                "status": "approved",
+                "self_expansion_mode": "manual",
+                "created_at": now,
+            }
+            for i, user_id in enumerate(user_ids)
+        ])
+
+    span = timedelta(days=args.days).total_seconds()
+    for start in range(0, args.api_logs, BATCH_SIZE):
+        with engine.begin() as conn:
+            conn.execute(insert(ApiLog.__table__), [
+                {
+                    "id": str(uuid.uuid4()),
+                    "user_id": user_ids[i % args.users],
+                    "model": "claude-sonnet-4-20250514",
+                    "input_tokens": 1000,
+                    "output_tokens": 500,
+                    "total_tokens": 1500,
+                    "cost": 3,
+                    "cached": i % 3 == 0,
+                    "phase": i % 14 + 1,
+                    "created_at": now - timedelta(seconds=span * i / args.api_logs),
+                }
+                for i in range(start, min(start + BATCH_SIZE, args.api_logs))
+            ])
+        print(f"  api_logs: {min(start + BATCH_SIZE, args.api_logs):,}/{args.api_logs:,}", end="\r")
+    print()
+
+    with engine.begin() as conn:
+        conn.execute(text("""
+            INSERT INTO api_usage_daily (bucket_start, user_id, phase, cached, requests, input_tokens, output_tokens, total_tokens, cost,
+                                         cache_creation_tokens, cache_read_tokens)
+            SELECT strftime('%Y-%m-%d 00:00:00', created_at), user_id, COALESCE(phase, 0), cached,
+                   COUNT(*), SUM(input_tokens), SUM(output_tokens), SUM(total_tokens), SUM(cost),
+                   SUM(cache_creation_tokens), SUM(cache_read_tokens)
+            FROM api_logs
+            GROUP BY strftime('%Y-%m-%d 00:00:00', created_at), user_id, COALESCE(phase, 0), cached
+        """))
+        conn.execute(text("ANALYZE"))
+
+
+async def measure():
+    """従来のクエリ群と集計テーブルの中央値（ミリ秒）"""
+    today = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
+    legacy, rollup = [], []
+    async with AsyncSessionLocal() as db:
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            for sql in LEGACY_QUERIES:
+                (await db.execute(text(sql), {"today": today})).all()
+            legacy.append((time.perf_counter() - start) * 1000)
+
+            start = time.perf_counter()
+            summary = await usage_rollup_service.get_usage_summary(db)
+            rollup.append((time.perf_counter() - start) * 1000)
+
+    assert summary["total_requests"] == args.api_logs, "集計テーブルの件数が api_logs と一致しません"
+    return statistics.median(legacy), statistics.median(rollup)
+
+
+def main():
+    """メイン処理"""
+    Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+
+    print("=" * 60)
+    print(f"データ投入中 (api_logs={args.api_logs:,}, users={args.users:,}, days={args.days})")
+    print("=" * 60)
+    seed()
+
+    legacy, rollup = asyncio.run(measure())
+    print(f"従来（api_logsに{len(LEGACY_QUERIES)}クエリ）: {legacy:>10.2f} ms")
+    print(f"集計テーブル（2クエリ）:       {rollup:>10.2f} ms")
+    print(f"改善: {legacy / rollup:.1f}x")
+
+    Base.metadata.drop_all(engine)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,42 @@
+"""
+ファイル内容（file_blobs）の掃除スクリプト
+
+ユーザー・プロジェクトをORMのカスケードで削除すると ProjectFile だけが消え、
+参照数（ref_count）が減らされないblobが残る。
+全blobの参照数を数え直し、どのファイルからも参照されていないblobを削除します。
+アプリケーションの稼働中に実行しても構いません。
+
+使い方:
+    python scripts/sweep_file_blobs.py --batch-size 1000
+"""
+
+import argparse
+import asyncio
+import sys
+from pathlib import Path
+
+# プロジェクトルートをPythonパスに追加
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from app.core.database import AsyncSessionLocal
+from app.services.project_file_service import sweep_blobs
+
+
+async def sweep(batch_size: int = 1000):
+    """全blobを掃除して結果を表示"""
+    async with AsyncSessionLocal() as db:
+        fixed, deleted = await sweep_blobs(db, batch_size=batch_size)
+    print(f"✅ 参照数を修正したblob: {fixed}件 / 削除したblob: {deleted}件")
+
+
+def main():
+    """メイン処理"""
+    parser = argparse.ArgumentParser(description="参照されていないファイル内容を削除")
+    parser.add_argument("--batch-size", type=int, default=1000, help="1回のトランザクションで処理するblob数")
+    args = parser.parse_args()
+    asyncio.run(sweep(args.batch_size))
+
+
+if __name__ == "__main__":
+    main()
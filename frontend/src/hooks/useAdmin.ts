@@ -1,7 +1,8 @@
 // マザーAI - 管理者フック
 
-import { useMutation, useQuery, useQueryClient } from '@tanstack/react-query';
+import { keepPreviousData, useMutation, useQuery, useQueryClient } from '@tanstack/react-query';
 import * as adminService from '../services/adminService';
+import { GetAllUsersParams } from '../types/api';
 
 /**
  * 審査待ちの申請一覧を取得するフック
@@ -54,13 +55,14 @@ export const useRejectApplication = () => {
 };
 
 /**
- * 全ユーザー一覧を取得するフック
+ * ユーザー一覧（ページ単位）を取得するフック
  */
-export const useAllUsers = () => {
+export const useAllUsers = (params: GetAllUsersParams = {}) => {
   return useQuery({
-    queryKey: ['allUsers'],
-    queryFn: () => adminService.getAllUsers(),
+    queryKey: ['allUsers', params],
+    queryFn: () => adminService.getAllUsers(params),
     staleTime: 1000 * 60 * 2, // 2分間キャッシュ
+    placeholderData: keepPreviousData, // ページ切り替え中は前のページを表示
   });
 };
 
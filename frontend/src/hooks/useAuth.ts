@@ -98,7 +98,7 @@ export const useUpdateProfile = () => {
   const queryClient = useQueryClient();
 
   return useMutation({
-    mutationFn: (data: { name?: string; custom_claude_api_key?: string }) =>
+    mutationFn: (data: { name?: string; custom_claude_api_key?: string; response_cache_enabled?: boolean }) =>
       authService.updateProfile(data),
     onSuccess: () => {
       // 現在のユーザー情報のキャッシュを無効化
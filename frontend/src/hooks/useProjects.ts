@@ -1,8 +1,9 @@
 // マザーAI - プロジェクトフック
 
+import { useCallback, useEffect, useState } from 'react';
 import { useMutation, useQuery, useQueryClient } from '@tanstack/react-query';
 import * as projectService from '../services/projectService';
-import { CreateProjectRequest } from '../types/api';
+import { CreateProjectRequest, MessageResponse, ProjectDetailResponse } from '../types/api';
 
 /**
  * プロジェクト一覧を取得するフック
@@ -27,6 +28,87 @@ export const useProject = (projectId: string) => {
   });
 };
 
+interface PhaseHistory {
+  // さかのぼって読み込んだ分を含む、このPhaseの表示中のメッセージ（古い順）
+  messages: MessageResponse[];
+  before: string | null;
+  hasMore: boolean;
+}
+
+// id で重複を除き、古い順に並べる
+const mergeMessages = (...lists: MessageResponse[][]): MessageResponse[] => {
+  const byId = new Map<string, MessageResponse>();
+  lists.forEach((list) => list.forEach((message) => byId.set(message.id, message)));
+  return Array.from(byId.values()).sort(
+    (a, b) => a.created_at.localeCompare(b.created_at) || a.id.localeCompare(b.id)
+  );
+};
+
+/**
+ * Phaseのメッセージ履歴フック
+ *
+ * プロジェクト詳細はPhaseごとの最新ページのみ返すため、より古いメッセージは
+ * loadOlder で before カーソルを使ってさかのぼって読み込む。
+ * 読み込んだ後にプロジェクト詳細が再取得された場合は、最新ページを読み込み済みの履歴に合流させる。
+ */
+export const usePhaseMessages = (
+  projectId: string,
+  phase: number,
+  project: ProjectDetailResponse | undefined
+) => {
+  const [histories, setHistories] = useState<Record<number, PhaseHistory>>({});
+  const [isLoadingOlder, setIsLoadingOlder] = useState(false);
+
+  // プロジェクトが変わったら読み込み済みの履歴を破棄
+  useEffect(() => {
+    setHistories({});
+  }, [projectId]);
+
+  const latestPage = project?.messages?.filter((message) => message.phase === phase) || [];
+  const pageInfo = project?.message_pages?.[String(phase)];
+
+  // 再取得された最新ページを読み込み済みの履歴に合流させる
+  useEffect(() => {
+    if (!project) return;
+    setHistories((current) => {
+      const next: Record<number, PhaseHistory> = {};
+      Object.entries(current).forEach(([key, history]) => {
+        const page = project.messages.filter((message) => message.phase === Number(key));
+        next[Number(key)] = { ...history, messages: mergeMessages(history.messages, page) };
+      });
+      return next;
+    });
+  }, [project]);
+
+  const history = histories[phase];
+  const messages = history ? history.messages : latestPage;
+  const hasMore = history ? history.hasMore : !!pageInfo?.has_more;
+
+  const loadOlder = useCallback(async () => {
+    const before = history ? history.before : pageInfo?.before;
+    if (!projectId || !before || isLoadingOlder) return;
+
+    setIsLoadingOlder(true);
+    try {
+      const page = await projectService.getMessages(projectId, { phase, before });
+      setHistories((current) => ({
+        ...current,
+        [phase]: {
+          messages: mergeMessages(page.messages, current[phase]?.messages || latestPage),
+          before: page.before,
+          hasMore: page.has_more,
+        },
+      }));
+    } catch (error) {
+      console.error('メッセージ履歴の取得エラー:', error);
+    } finally {
+      setIsLoadingOlder(false);
+    }
+  }, [projectId, phase, history, pageInfo, isLoadingOlder, latestPage]);
+
+  return { messages, hasMore, loadOlder, isLoadingOlder };
+};
+
 /**
  * 新規プロジェクト作成フック
  */
@@ -76,7 +158,8 @@ export const useSendMessage = () => {
       phase: number,
       onToken: (token: string) => void,
       onEnd: (messageId: string) => void,
-      onError: (error: string) => void
+      onError: (error: string) => void,
+      onReset?: () => void
     ) => {
       try {
         await projectService.sendMessageStream(
@@ -89,7 +172,8 @@ export const useSendMessage = () => {
             // メッセージ送信完了後、プロジェクト詳細のキャッシュを無効化
             queryClient.invalidateQueries({ queryKey: ['project', projectId] });
           },
-          onError
+          onError,
+          onReset
         );
       } catch (error) {
         console.error('メッセージ送信エラー:', error);
@@ -165,7 +165,7 @@ export default function ApiMonitorPage() {
             <CardContent>
               <Box sx={{ display: 'flex', alignItems: 'center', mb: 1 }}>
                 <Typography variant="subtitle2" color="text.secondary">
-                  キャッシュヒット率（全期間）
+                  応答キャッシュヒット率（全期間）
                 </Typography>
               </Box>
               <Typography variant="h4" fontWeight="bold" color="success.main">
@@ -174,6 +174,9 @@ export default function ApiMonitorPage() {
               <Typography variant="caption" color="text.secondary">
                 {stats.cache_stats.total_cached_requests.toLocaleString()} / {stats.total_requests.toLocaleString()} リクエスト
               </Typography>
+              <Typography variant="caption" color="text.secondary" display="block">
+                プロンプトキャッシュ {stats.cache_stats.total_prompt_cache_hit_rate.toFixed(2)}%
+              </Typography>
             </CardContent>
           </Card>
         </Grid>
@@ -183,7 +186,7 @@ export default function ApiMonitorPage() {
             <CardContent>
               <Box sx={{ display: 'flex', alignItems: 'center', mb: 1 }}>
                 <Typography variant="subtitle2" color="text.secondary">
-                  キャッシュヒット率（今日）
+                  応答キャッシュヒット率（今日）
                 </Typography>
               </Box>
               <Typography variant="h4" fontWeight="bold" color="success.main">
@@ -192,6 +195,9 @@ export default function ApiMonitorPage() {
               <Typography variant="caption" color="text.secondary">
                 {stats.cache_stats.today_cached_requests.toLocaleString()} / {stats.today_requests.toLocaleString()} リクエスト
               </Typography>
+              <Typography variant="caption" color="text.secondary" display="block">
+                プロンプトキャッシュ {stats.cache_stats.today_prompt_cache_hit_rate.toFixed(2)}%
+              </Typography>
             </CardContent>
           </Card>
         </Grid>
@@ -243,6 +249,7 @@ export default function ApiMonitorPage() {
                       <TableCell align="right">呼び出し数</TableCell>
                       <TableCell align="right">コスト（円）</TableCell>
                       <TableCell align="right">トークン数</TableCell>
+                      <TableCell align="right">プロンプトキャッシュ</TableCell>
                     </TableRow>
                   </TableHead>
                   <TableBody>
@@ -253,11 +260,12 @@ export default function ApiMonitorPage() {
                           <TableCell align="right">{phase.total_requests.toLocaleString()}</TableCell>
                           <TableCell align="right">¥{Math.round(phase.total_cost).toLocaleString()}</TableCell>
                           <TableCell align="right">{phase.total_tokens.toLocaleString()}</TableCell>
+                          <TableCell align="right">{phase.prompt_cache_hit_rate.toFixed(1)}%</TableCell>
                         </TableRow>
                       ))
                     ) : (
                       <TableRow>
-                        <TableCell colSpan={4} align="center">
+                        <TableCell colSpan={5} align="center">
                           <Typography color="text.secondary">データがありません</Typography>
                         </TableCell>
                       </TableRow>
@@ -282,6 +290,7 @@ export default function ApiMonitorPage() {
                       <TableCell>Phase</TableCell>
                       <TableCell align="right">呼び出し数</TableCell>
                       <TableCell align="right">コスト（円）</TableCell>
+                      <TableCell align="right">プロンプトキャッシュ</TableCell>
                     </TableRow>
                   </TableHead>
                   <TableBody>
@@ -291,11 +300,12 @@ export default function ApiMonitorPage() {
                           <TableCell>Phase {phase.phase}</TableCell>
                           <TableCell align="right">{phase.requests.toLocaleString()}</TableCell>
                           <TableCell align="right">¥{Math.round(phase.cost).toLocaleString()}</TableCell>
+                          <TableCell align="right">{phase.prompt_cache_hit_rate.toFixed(1)}%</TableCell>
                         </TableRow>
                       ))
                     ) : (
                       <TableRow>
-                        <TableCell colSpan={3} align="center">
+                        <TableCell colSpan={4} align="center">
                           <Typography color="text.secondary">データがありません</Typography>
                         </TableCell>
                       </TableRow>
@@ -13,13 +13,41 @@ import {
   IconButton,
   CircularProgress,
   Alert,
+  TablePagination,
+  TableSortLabel,
+  TextField,
+  MenuItem,
+  Stack,
 } from '@mui/material'
+import { useState } from 'react'
 import BlockIcon from '@mui/icons-material/Block'
 import CheckCircleIcon from '@mui/icons-material/CheckCircle'
 import { useAllUsers, useSuspendUser, useActivateUser } from '../../hooks/useAdmin'
+import { AdminUserSortField } from '../../types/api'
+import { UserStatus } from '../../types'
+
+const SORTABLE_COLUMNS: { field: AdminUserSortField; label: string }[] = [
+  { field: 'name', label: '氏名' },
+  { field: 'email', label: 'メール' },
+]
 
 export default function UsersManagementPage() {
-  const { data: users, isLoading, error } = useAllUsers()
+  const [page, setPage] = useState(0)
+  const [rowsPerPage, setRowsPerPage] = useState(50)
+  const [sort, setSort] = useState<AdminUserSortField>('created_at')
+  const [order, setOrder] = useState<'asc' | 'desc'>('desc')
+  const [status, setStatus] = useState<UserStatus | ''>('')
+  const [search, setSearch] = useState('')
+
+  const { data, isLoading, error } = useAllUsers({
+    page: page + 1,
+    limit: rowsPerPage,
+    sort,
+    order,
+    status: status || undefined,
+    search: search.trim() || undefined,
+  })
+  const users = data?.users
   const suspendMutation = useSuspendUser()
   const activateMutation = useActivateUser()
 
@@ -35,6 +63,28 @@ export default function UsersManagementPage() {
     }
   }
 
+  const handleSort = (field: AdminUserSortField) => {
+    if (sort === field) {
+      setOrder(order === 'asc' ? 'desc' : 'asc')
+    } else {
+      setSort(field)
+      setOrder(field === 'name' || field === 'email' ? 'asc' : 'desc')
+    }
+    setPage(0)
+  }
+
+  const sortableHeader = (field: AdminUserSortField, label: string) => (
+    <TableCell key={field} sortDirection={sort === field ? order : false}>
+      <TableSortLabel
+        active={sort === field}
+        direction={sort === field ? order : 'asc'}
+        onClick={() => handleSort(field)}
+      >
+        {label}
+      </TableSortLabel>
+    </TableCell>
+  )
+
   const getStatusChip = (status: string) => {
     switch (status) {
       case 'approved':
@@ -74,22 +124,50 @@ export default function UsersManagementPage() {
 
       <Card>
         <CardContent>
+          <Stack direction="row" spacing={2} sx={{ mb: 2 }}>
+            <TextField
+              size="small"
+              label="氏名・メールで検索"
+              value={search}
+              onChange={(e) => {
+                setSearch(e.target.value)
+                setPage(0)
+              }}
+            />
+            <TextField
+              select
+              size="small"
+              label="ステータス"
+              value={status}
+              onChange={(e) => {
+                setStatus(e.target.value as UserStatus | '')
+                setPage(0)
+              }}
+              sx={{ minWidth: 140 }}
+            >
+              <MenuItem value="">すべて</MenuItem>
+              <MenuItem value="approved">承認済み</MenuItem>
+              <MenuItem value="pending">審査中</MenuItem>
+              <MenuItem value="rejected">却下</MenuItem>
+              <MenuItem value="suspended">停止中</MenuItem>
+            </TextField>
+          </Stack>
+
           {users && users.length > 0 ? (
             <TableContainer>
               <Table>
                 <TableHead>
                   <TableRow>
-                    <TableCell>氏名</TableCell>
-                    <TableCell>メール</TableCell>
+                    {SORTABLE_COLUMNS.map(({ field, label }) => sortableHeader(field, label))}
                     <TableCell>ロール</TableCell>
-                    <TableCell>ステータス</TableCell>
-                    <TableCell>プロジェクト数</TableCell>
-                    <TableCell>最終ログイン</TableCell>
+                    {sortableHeader('status', 'ステータス')}
+                    {sortableHeader('project_count', 'プロジェクト数')}
+                    {sortableHeader('last_login_at', '最終ログイン')}
                     <TableCell>操作</TableCell>
                   </TableRow>
                 </TableHead>
                 <TableBody>
-                  {users.map((user: any) => (
+                  {users.map((user) => (
                   <TableRow key={user.id}>
                     <TableCell>{user.name}</TableCell>
                     <TableCell>{user.email}</TableCell>
@@ -117,6 +195,19 @@ export default function UsersManagementPage() {
                 ))}
               </TableBody>
             </Table>
+            <TablePagination
+              component="div"
+              count={data?.total ?? 0}
+              page={page}
+              onPageChange={(_, newPage) => setPage(newPage)}
+              rowsPerPage={rowsPerPage}
+              onRowsPerPageChange={(e) => {
+                setRowsPerPage(parseInt(e.target.value, 10))
+                setPage(0)
+              }}
+              rowsPerPageOptions={[25, 50, 100]}
+              labelRowsPerPage="表示件数"
+            />
           </TableContainer>
           ) : (
             <Box sx={{ textAlign: 'center', py: 4 }}>
@@ -10,6 +10,8 @@ import {
   Divider,
   Alert,
   CircularProgress,
+  FormControlLabel,
+  Switch,
 } from '@mui/material'
 import { useCurrentUser, useUpdateProfile } from '../../hooks/useAuth'
 
@@ -20,6 +22,7 @@ export default function ProfilePage() {
     name: '',
     email: '',
     claudeApiKey: '',
+    responseCacheEnabled: true,
   })
 
   // ユーザー情報が読み込まれたらフォームに設定
@@ -29,6 +32,7 @@ export default function ProfilePage() {
         name: user.name || '',
         email: user.email || '',
         claudeApiKey: '',
+        responseCacheEnabled: user.responseCacheEnabled ?? true,
       })
     }
   }, [user])
@@ -42,6 +46,7 @@ export default function ProfilePage() {
       await updateProfileMutation.mutateAsync({
         name: formData.name,
         custom_claude_api_key: formData.claudeApiKey || undefined,
+        response_cache_enabled: formData.responseCacheEnabled,
       })
     } catch (error) {
       console.error('プロフィール更新エラー:', error)
@@ -127,6 +132,16 @@ export default function ProfilePage() {
                 helperText="独自のAPIキーを使用する場合のみ設定"
                 sx={{ mb: 2 }}
               />
+              <FormControlLabel
+                control={
+                  <Switch
+                    checked={formData.responseCacheEnabled}
+                    onChange={(e) => setFormData({ ...formData, responseCacheEnabled: e.target.checked })}
+                  />
+                }
+                label="同じ依頼への応答を再利用する（応答キャッシュ）"
+                sx={{ mb: 2 }}
+              />
               <Alert severity="info">
                 <Typography variant="body2">
                   APIキーを設定すると、あなた自身のClaude APIを使用します。
@@ -14,6 +14,7 @@ import {
   Divider,
   CircularProgress,
   Alert,
+  Button,
 } from '@mui/material'
 import CheckCircleIcon from '@mui/icons-material/CheckCircle'
 import RadioButtonUncheckedIcon from '@mui/icons-material/RadioButtonUnchecked'
@@ -32,7 +33,14 @@ import ApiIcon from '@mui/icons-material/Api'
 import PaletteIcon from '@mui/icons-material/Palette'
 import RefreshIcon from '@mui/icons-material/Refresh'
 import MonitorHeartIcon from '@mui/icons-material/MonitorHeart'
-import { useProject, useSendMessage, useProjectFile, useProjectFiles, useSaveFile } from '../../hooks/useProjects'
+import {
+  useProject,
+  usePhaseMessages,
+  useSendMessage,
+  useProjectFile,
+  useProjectFiles,
+  useSaveFile,
+} from '../../hooks/useProjects'
 import CodeEditor from '../../components/CodeEditor'
 import FileTree, { FileNode } from '../../components/FileTree'
 
@@ -230,6 +238,12 @@ export default function ProjectDetailPage() {
   const messagesEndRef = useRef<HTMLDivElement>(null)
 
   const { data: project, isLoading, error } = useProject(id!)
+  const {
+    messages: phaseMessages,
+    hasMore: hasOlderMessages,
+    loadOlder: loadOlderMessages,
+    isLoadingOlder,
+  } = usePhaseMessages(id!, selectedPhase, project)
   const { sendMessage } = useSendMessage()
   const { data: projectFilesData } = useProjectFiles(id!)
   const { data: fileData } = useProjectFile(id!, selectedFile?.path || null)
@@ -282,6 +296,10 @@ export default function ProjectDetailPage() {
           setIsStreaming(false)
           setStreamingMessage('')
           console.error('メッセージエラー:', error)
+        },
+        () => {
+          // ジョブが最初から再実行された時
+          setStreamingMessage('')
         }
       )
     } catch (error) {
@@ -382,9 +400,6 @@ export default function ProjectDetailPage() {
     )
   }
 
-  // 選択したPhaseのメッセージをフィルタ
-  const phaseMessages = project.messages?.filter((msg) => msg.phase === selectedPhase) || []
-
   return (
     <Box>
       <Typography variant="h4" component="h1" fontWeight="bold" gutterBottom>
@@ -513,6 +528,15 @@ export default function ProjectDetailPage() {
               borderRadius: 1,
             }}
           >
+            {/* より古いメッセージ（プロジェクト詳細にはPhaseごとの最新ページのみ含まれる） */}
+            {hasOlderMessages && (
+              <Box sx={{ display: 'flex', justifyContent: 'center', mb: 2 }}>
+                <Button size="small" onClick={loadOlderMessages} disabled={isLoadingOlder}>
+                  {isLoadingOlder ? <CircularProgress size={16} /> : '過去のメッセージを読み込む'}
+                </Button>
+              </Box>
+            )}
+
             {phaseMessages.length === 0 && !streamingMessage && (
               <Typography variant="body2" color="text.secondary" textAlign="center">
                 メッセージがありません。最初のメッセージを送信してください。
@@ -4,8 +4,9 @@ import apiClient from '../lib/axios';
 import {
   ApplicationResponse,
   APIMonitorStatsResponse,
+  GetAllUsersParams,
+  UserListResponse,
 } from '../types/api';
-import { User } from '../types';
 
 const BASE_PATH = '/api/v1/admin';
 
@@ -42,10 +43,10 @@ export const rejectApplication = async (
 };
 
 /**
- * 全ユーザー一覧を取得
+ * ユーザー一覧をページ単位で取得（並び替え・絞り込み対応）
  */
-export const getAllUsers = async (): Promise<User[]> => {
-  const response = await apiClient.get<User[]>(`${BASE_PATH}/users`);
+export const getAllUsers = async (params: GetAllUsersParams = {}): Promise<UserListResponse> => {
+  const response = await apiClient.get<UserListResponse>(`${BASE_PATH}/users`, { params });
   return response.data;
 };
 
@@ -92,6 +93,10 @@ export const getAPIStats = async (): Promise<APIMonitorStatsResponse> => {
       total_cache_hit_rate: 0,
       today_cached_requests: 0,
       today_cache_hit_rate: 0,
+      total_cache_read_tokens: 0,
+      total_cache_creation_tokens: 0,
+      total_prompt_cache_hit_rate: 0,
+      today_prompt_cache_hit_rate: 0,
     },
   };
 };
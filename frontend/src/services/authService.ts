@@ -119,6 +119,7 @@ export const handleOAuthCallback = (token: string): void => {
 export const updateProfile = async (data: {
   name?: string;
   custom_claude_api_key?: string;
+  response_cache_enabled?: boolean;
 }): Promise<User> => {
   const response = await apiClient.put<{ data: any; message: string }>('/users/me', data);
 
@@ -5,8 +5,11 @@ import {
   CreateProjectRequest,
   ProjectResponse,
   ProjectDetailResponse,
+  MessagePageResponse,
+  GetMessagesParams,
   SendMessageRequest,
   SSEEvent,
+  JobResponse,
 } from '../types/api';
 
 const BASE_PATH = '/projects';
@@ -37,6 +40,21 @@ export const getProject = async (projectId: string): Promise<ProjectDetailRespon
   return response.data;
 };
 
+/**
+ * メッセージ履歴をページ単位で取得
+ *
+ * before: より古いページ / since: 前回取得以降の新着メッセージ
+ */
+export const getMessages = async (
+  projectId: string,
+  params: GetMessagesParams = {}
+): Promise<MessagePageResponse> => {
+  const response = await apiClient.get<MessagePageResponse>(`${BASE_PATH}/${projectId}/messages`, {
+    params,
+  });
+  return response.data;
+};
+
 /**
  * プロジェクトを削除
  */
@@ -44,15 +62,128 @@ export const deleteProject = async (projectId: string): Promise<void> => {
   await apiClient.delete(`${BASE_PATH}/${projectId}`);
 };
 
+// ストリームが途中で切れた場合に続きから受信し直す回数
+const MAX_STREAM_RESUMES = 3;
+
+interface StreamState {
+  jobId?: string;
+  // offset がジョブの何回目の実行の出力か（再実行されると出力は最初からになる）
+  attempt?: number;
+  // サーバーが id として付ける受信済みの文字数
+  offset: number;
+  finished: boolean;
+}
+
+/**
+ * SSEレスポンスを読み取り、イベントごとにコールバックを呼ぶ
+ */
+const readEventStream = async (
+  response: Response,
+  state: StreamState,
+  onToken: (token: string) => void,
+  onEnd: (messageId: string) => void,
+  onError: (error: string) => void,
+  onReset?: () => void
+): Promise<void> => {
+  const reader = response.body?.getReader();
+  const decoder = new TextDecoder();
+
+  if (!reader) {
+    throw new Error('ストリームが取得できませんでした');
+  }
+
+  // フレームが読み取り単位をまたぐ場合に備えて、末尾の未完成の行を持ち越す
+  let buffer = '';
+
+  while (true) {
+    const { done, value } = await reader.read();
+
+    if (done) {
+      break;
+    }
+
+    // SSEデータをデコード
+    buffer += decoder.decode(value, { stream: true });
+    const lines = buffer.split('\n');
+    buffer = lines.pop() ?? '';
+
+    for (const line of lines) {
+      if (line.startsWith('id: ')) {
+        const offset = Number(line.substring(4));
+        if (!Number.isNaN(offset)) {
+          state.offset = offset;
+        }
+      } else if (line.startsWith('data: ')) {
+        const data = line.substring(6);
+
+        try {
+          const event: SSEEvent = JSON.parse(data);
+
+          switch (event.type) {
+            case 'start':
+              // ストリーム開始（再接続用にジョブIDを保持）
+              if (event.jobId) {
+                state.jobId = event.jobId;
+              }
+              if (event.attempt) {
+                state.attempt = event.attempt;
+              }
+              break;
+
+            case 'reset':
+              // ジョブが最初から再実行された（受信済みの出力を破棄）
+              state.offset = 0;
+              if (event.attempt) {
+                state.attempt = event.attempt;
+              }
+              onReset?.();
+              break;
+
+            case 'token':
+              // トークン受信
+              if (event.content) {
+                onToken(event.content);
+              }
+              break;
+
+            case 'end':
+              // ストリーム完了
+              state.finished = true;
+              if (event.messageId) {
+                onEnd(event.messageId);
+              }
+              break;
+
+            case 'error':
+              // エラー発生
+              state.finished = true;
+              if (event.message) {
+                onError(event.message);
+              }
+              break;
+          }
+        } catch (parseError) {
+          console.error('SSEイベントのパースエラー:', parseError);
+        }
+      }
+    }
+  }
+};
+
 /**
  * メッセージを送信（SSEストリーミング）
  *
+ * 応答はサーバー側のジョブで生成されるため、接続が途中で切れた場合は
+ * /jobs/{jobId}/events から受信済みの位置の続きを受け取る。
+ * ジョブが最初から再実行された場合は onReset の後に最初から受け取り直す。
+ *
  * @param projectId プロジェクトID
  * @param content メッセージ内容
  * @param phase Phaseナンバー
  * @param onToken トークン受信時のコールバック
  * @param onEnd 完了時のコールバック
  * @param onError エラー時のコールバック
+ * @param onReset 受信済みの出力を破棄する時のコールバック
  */
 export const sendMessageStream = async (
   projectId: string,
@@ -60,10 +191,12 @@ export const sendMessageStream = async (
   phase: number,
   onToken: (token: string) => void,
   onEnd: (messageId: string) => void,
-  onError: (error: string) => void
+  onError: (error: string) => void,
+  onReset?: () => void
 ): Promise<void> => {
   const backendUrl = import.meta.env.VITE_API_BASE_URL || 'http://localhost:8572';
   const token = localStorage.getItem('auth_token');
+  const state: StreamState = { offset: 0, finished: false };
 
   // fetchを使用してSSEストリーミング
   try {
@@ -84,63 +217,34 @@ export const sendMessageStream = async (
       throw new Error(errorData.detail || 'メッセージ送信に失敗しました');
     }
 
-    // SSEストリームを読み取り
-    const reader = response.body?.getReader();
-    const decoder = new TextDecoder();
-
-    if (!reader) {
-      throw new Error('ストリームが取得できませんでした');
-    }
-
-    while (true) {
-      const { done, value } = await reader.read();
+    for (let attempt = 0; ; attempt++) {
+      try {
+        const stream =
+          attempt === 0
+            ? response
+            : await fetch(
+                `${backendUrl}/api/v1/jobs/${state.jobId}/events?offset=${state.offset}` +
+                  (state.attempt ? `&attempt=${state.attempt}` : ''),
+                { headers: { Authorization: `Bearer ${token}` } }
+              );
+        if (!stream.ok) {
+          throw new Error('応答の受信を再開できませんでした');
+        }
+        await readEventStream(stream, state, onToken, onEnd, onError, onReset);
+      } catch (streamError) {
+        if (!state.jobId || attempt >= MAX_STREAM_RESUMES) {
+          throw streamError;
+        }
+      }
 
-      if (done) {
+      if (state.finished) {
         break;
       }
-
-      // SSEデータをデコード
-      const chunk = decoder.decode(value);
-      const lines = chunk.split('\n');
-
-      for (const line of lines) {
-        if (line.startsWith('data: ')) {
-          const data = line.substring(6);
-
-          try {
-            const event: SSEEvent = JSON.parse(data);
-
-            switch (event.type) {
-              case 'start':
-                // ストリーム開始
-                break;
-
-              case 'token':
-                // トークン受信
-                if (event.content) {
-                  onToken(event.content);
-                }
-                break;
-
-              case 'end':
-                // ストリーム完了
-                if (event.messageId) {
-                  onEnd(event.messageId);
-                }
-                break;
-
-              case 'error':
-                // エラー発生
-                if (event.message) {
-                  onError(event.message);
-                }
-                break;
-            }
-          } catch (parseError) {
-            console.error('SSEイベントのパースエラー:', parseError);
-          }
-        }
+      if (!state.jobId || attempt >= MAX_STREAM_RESUMES) {
+        throw new Error('応答の受信が中断されました');
       }
+      // 少し待ってから続きを受信
+      await new Promise((resolve) => setTimeout(resolve, 1000 * (attempt + 1)));
     }
   } catch (error) {
     if (error instanceof Error) {
@@ -151,6 +255,14 @@ export const sendMessageStream = async (
   }
 };
 
+/**
+ * ジョブの状態を取得
+ */
+export const getJob = async (jobId: string): Promise<JobResponse> => {
+  const response = await apiClient.get<JobResponse>(`/jobs/${jobId}`);
+  return response.data;
+};
+
 /**
  * プロジェクトのファイル一覧を取得
  */
@@ -201,6 +313,7 @@ export default {
   getProject,
   deleteProject,
   sendMessageStream,
+  getJob,
   getProjectFiles,
   getProjectFile,
   saveProjectFile,
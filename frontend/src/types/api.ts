@@ -52,14 +52,33 @@ export interface ProjectResponse {
   created_at: string;
 }
 
+export interface MessageResponse {
+  id: string;
+  role: string;
+  content: string;
+  phase: number;
+  created_at: string;
+}
+
 export interface ProjectDetailResponse extends ProjectResponse {
-  messages: Array<{
-    id: string;
-    role: string;
-    content: string;
-    phase: number;
-    created_at: string;
-  }>;
+  // Phaseごとの最新ページのみ（古い履歴は getMessages で取得）
+  messages: MessageResponse[];
+  message_pages: Record<string, { has_more: boolean; before: string }>;
+  latest_cursor: string | null;
+}
+
+export interface MessagePageResponse {
+  messages: MessageResponse[];
+  has_more: boolean;
+  before: string | null;
+  latest_cursor: string | null;
+}
+
+export interface GetMessagesParams {
+  phase?: number;
+  limit?: number;
+  before?: string;
+  since?: string;
 }
 
 export interface SendMessageRequest {
@@ -68,13 +87,35 @@ export interface SendMessageRequest {
 }
 
 // SSEイベント型
-export type SSEEventType = 'start' | 'token' | 'end' | 'error';
+export type SSEEventType = 'start' | 'token' | 'reset' | 'end' | 'error';
 
 export interface SSEEvent {
   type: SSEEventType;
   content?: string;
   messageId?: string;
   message?: string;
+  jobId?: string;
+  // 何回目の実行の出力か（start / reset）
+  attempt?: number;
+}
+
+// エージェント実行ジョブ
+export type JobStatus = 'pending' | 'in_progress' | 'completed' | 'failed';
+
+export interface JobResponse {
+  id: string;
+  project_id: string;
+  phase: number;
+  kind: 'message' | 'agent' | null;
+  status: JobStatus;
+  output_length: number;
+  result: Record<string, any> | null;
+  error: string | null;
+  attempts: number;
+  created_at: string;
+  started_at: string | null;
+  completed_at: string | null;
+  queue_position?: number;
 }
 
 // ================================
@@ -91,9 +132,40 @@ export interface RejectApplicationRequest {
   reason: string;
 }
 
+export interface AdminUserListItem {
+  id: string;
+  name: string;
+  email: string;
+  role: User['role'];
+  status: User['status'];
+  projectCount: number;
+  last_login: string | null;
+  created_at: string;
+}
+
 export interface UserListResponse {
-  users: User[];
+  users: AdminUserListItem[];
   total: number;
+  page: number;
+  limit: number;
+}
+
+export type AdminUserSortField =
+  | 'created_at'
+  | 'last_login_at'
+  | 'name'
+  | 'email'
+  | 'status'
+  | 'project_count';
+
+export interface GetAllUsersParams {
+  page?: number;
+  limit?: number;
+  sort?: AdminUserSortField;
+  order?: 'asc' | 'desc';
+  status?: User['status'];
+  role?: User['role'];
+  search?: string;
 }
 
 export interface PhaseStats {
@@ -101,12 +173,16 @@ export interface PhaseStats {
   total_requests: number;
   total_cost: number;
   total_tokens: number;
+  cache_creation_tokens: number;
+  cache_read_tokens: number;
+  prompt_cache_hit_rate: number; // 入力トークンのうちプロンプトキャッシュから読み込んだ割合（%）
 }
 
 export interface TodayPhaseStats {
   phase: number;
   requests: number;
   cost: number;
+  prompt_cache_hit_rate: number;
 }
 
 export interface CacheStats {
@@ -114,6 +190,10 @@ export interface CacheStats {
   total_cache_hit_rate: number;
   today_cached_requests: number;
   today_cache_hit_rate: number;
+  total_cache_read_tokens: number;
+  total_cache_creation_tokens: number;
+  total_prompt_cache_hit_rate: number;
+  today_prompt_cache_hit_rate: number;
 }
 
 export interface APIMonitorStatsResponse {
@@ -142,6 +222,7 @@ export interface APIMonitorStatsResponse {
 export interface UpdateUserProfileRequest {
   name?: string;
   custom_claude_api_key?: string;
+  response_cache_enabled?: boolean;
 }
 
 export interface UserAPIUsageResponse {
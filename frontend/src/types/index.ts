@@ -15,6 +15,7 @@ export interface User {
   role: UserRole
   status: UserStatus
   avatar?: string
+  responseCacheEnabled?: boolean
   createdAt: string
   updatedAt?: string
 }